@@ -0,0 +1,61 @@
+"""Admin API routes for model versions."""
+import hmac
+from fastapi import APIRouter, Depends, Header, HTTPException, Query, status
+from app.concurrency import run_model
+from app.config import settings
+from app.ml.recommender import get_recommender
+from typing import Optional
+
+router = APIRouter(prefix="/admin", tags=["admin"])
+
+
+def require_admin(x_admin_token: Optional[str] = Header(None)):
+    """Check the X-Admin-Token header against ADMIN_TOKEN."""
+    if not settings.ADMIN_TOKEN:
+        raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="Admin endpoints are disabled")
+    if not x_admin_token or not hmac.compare_digest(x_admin_token, settings.ADMIN_TOKEN):
+        raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="Invalid admin token")
+
+
+@router.get("/model", dependencies=[Depends(require_admin)])
+async def get_model_status():
+    """Active and previous model versions, with reload counters."""
+    registry = get_recommender().registry
+    return await run_model(registry.stats)
+
+
+@router.post("/model/reload", dependencies=[Depends(require_admin)])
+async def reload_model(version: Optional[str] = Query(None, description="Artifact version (default: latest)")):
+    """
+    Load, warm and swap in a model version without a restart.
+
+    In-flight requests finish on the model they started with; the version
+    being replaced is kept for rollback.
+
+    - **version**: Artifact version directory name (default: latest)
+    """
+    registry = get_recommender().registry
+    try:
+        model = await run_model(registry.reload, version)
+    except FileNotFoundError as e:
+        raise HTTPException(status_code=404, detail=str(e))
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Model reload failed: {str(e)}")
+    return {
+        "active": model.summary(),
+        "previous_version": registry.previous.version if registry.previous is not None else None
+    }
+
+
+@router.post("/model/rollback", dependencies=[Depends(require_admin)])
+async def rollback_model():
+    """Swap the previous model version back in."""
+    registry = get_recommender().registry
+    try:
+        model = registry.rollback()
+    except LookupError as e:
+        raise HTTPException(status_code=409, detail=str(e))
+    return {
+        "active": model.summary(),
+        "previous_version": registry.previous.version if registry.previous is not None else None
+    }
@@ -1,6 +1,7 @@
 """Authentication API routes."""
 from fastapi import APIRouter, Depends, HTTPException, status
 from sqlalchemy.orm import Session
+from app.concurrency import run_db
 from app.database import get_db
 from app.models.user import User
 from app.schemas.user import UserCreate, UserLogin, UserResponse, Token
@@ -18,6 +19,11 @@ async def register(user_data: UserCreate, db: Session = Depends(get_db)):
     - **email**: User email (optional)
     - **password**: User password (required)
     """
+    return await run_db(_register, db, user_data)
+
+
+def _register(db: Session, user_data: UserCreate) -> User:
+    """Create a user; password hashing is CPU-bound (blocking)."""
     # Check if username already exists
     existing_user = db.query(User).filter(User.username == user_data.username).first()
     if existing_user:
@@ -58,6 +64,11 @@ async def login(credentials: UserLogin, db: Session = Depends(get_db)):
     - **username**: Username
     - **password**: Password
     """
+    return await run_db(_login, db, credentials)
+
+
+def _login(db: Session, credentials: UserLogin) -> dict:
+    """Check credentials and issue a token; bcrypt is CPU-bound (blocking)."""
     # Find user
     user = db.query(User).filter(User.username == credentials.username).first()
     
@@ -82,6 +93,11 @@ async def login(credentials: UserLogin, db: Session = Depends(get_db)):
 @router.get("/me", response_model=UserResponse)
 async def get_current_user(token: str, db: Session = Depends(get_db)):
     """Get current user profile from token."""
+    return await run_db(_get_current_user, db, token)
+
+
+def _get_current_user(db: Session, token: str) -> User:
+    """Resolve a token to its user (blocking)."""
     from app.utils.auth import decode_access_token
     
     payload = decode_access_token(token)
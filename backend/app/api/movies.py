@@ -1,10 +1,12 @@
 """Movie API routes."""
 from fastapi import APIRouter, Depends, HTTPException, Query
 from sqlalchemy.orm import Session
-from sqlalchemy import or_, func
+from app.catalog import get_catalog
+from app.concurrency import run_db
 from app.database import get_db
 from app.models.movie import Movie
 from app.schemas.movie import MovieResponse, MovieListResponse
+from app.utils.pagination import decode_cursor, encode_cursor
 from typing import List, Optional
 
 router = APIRouter(prefix="/movies", tags=["movies"])
@@ -15,56 +17,80 @@ async def get_movies(
     page: int = Query(1, ge=1, description="Page number"),
     limit: int = Query(20, ge=1, le=100, description="Items per page"),
     search: Optional[str] = Query(None, description="Search query"),
-    genre: Optional[str] = Query(None, description="Filter by genre"),
-    db: Session = Depends(get_db)
+    genre: Optional[str] = Query(None, description="Filter by genre (exact name; comma-separated for several)"),
+    cursor: Optional[str] = Query(None, description="next_cursor of the previous page (replaces page)")
 ):
     """
     Get paginated list of movies with optional search and filters.
     
     - **page**: Page number (default: 1)
     - **limit**: Items per page (default: 20, max: 100)
-    - **search**: Search in movie title
+    - **search**: Search in title, summary, director, actors and tags
+      (word prefixes match; results ordered by relevance)
     - **genre**: Filter by genre
+    - **cursor**: Continue after the previous page; constant-time however deep
     """
-    query = db.query(Movie)
-    
-    # Apply search filter
+    return await run_db(_list_movies, page, limit, search, genre, cursor)
+
+
+def _list_movies(page: int, limit: int, search: Optional[str], genre: Optional[str],
+                 cursor: Optional[str] = None) -> dict:
+    """Build a page of the movie listing (blocking; loads the catalog on first use)."""
+    # Served from the in-memory catalog; no database round trip
+    catalog = get_catalog().snapshot
     if search:
-        query = query.filter(Movie.title.ilike(f"%{search}%"))
-    
-    # Apply genre filter
-    if genre:
-        query = query.filter(Movie.genres.like(f"%{genre}%"))
+        matches = catalog.filter(search=search, genre=genre)
+    else:
+        # Sorted once per genre filter and cached with its count
+        listing = catalog.listing(genre)
+        matches = listing.positions
     
     # Get total count
-    total = query.count()
+    total = len(matches)
     
-    # Apply pagination
+    # Apply pagination: keyset on (avg_rating, movie_id) for the listing;
+    # search results are ranked per query, so their cursor holds an offset
     offset = (page - 1) * limit
-    movies = query.order_by(Movie.avg_rating.desc()).offset(offset).limit(limit).all()
+    if cursor:
+        try:
+            position = decode_cursor(cursor, 'o' if search else 'm')
+            offset = int(position['o']) if search else listing.start_after(position.get('r'), int(position['m']))
+        except (TypeError, ValueError):
+            raise HTTPException(status_code=400, detail="Invalid cursor")
     
     # Format genres as lists and use local image_url
     movies_data = []
-    for movie in movies:
+    page_positions = matches[offset:offset + limit].tolist()
+    for pos in page_positions:
+        avg_rating = catalog.avg_rating(pos)
         movie_dict = {
-            "movie_id": movie.movie_id,
-            "title": movie.title,
-            "release_date": movie.release_date,
-            "genres": movie.genres.split(',') if movie.genres else [],
-            "avg_rating": round(movie.avg_rating, 2) if movie.avg_rating else 0.0,
-            "rating_count": movie.rating_count or 0,
-            "poster_url": movie.image_url, # Use local Netflix image
-            "image_url": movie.image_url,
-            "summary": movie.summary,
-            "imdb_score": movie.imdb_score
+            "movie_id": int(catalog.movie_ids[pos]),
+            "title": catalog.titles[pos],
+            "release_date": catalog.release_dates[pos],
+            "genres": list(catalog.genre_lists[pos]),
+            "avg_rating": round(avg_rating, 2) if avg_rating else 0.0,
+            "rating_count": int(catalog.rating_counts[pos]),
+            "poster_url": catalog.image_urls[pos], # Use local Netflix image
+            "image_url": catalog.image_urls[pos],
+            "summary": catalog.summaries[pos],
+            "imdb_score": catalog.imdb_scores[pos]
         }
         movies_data.append(MovieResponse(**movie_dict))
     
+    next_cursor = None
+    if offset + limit < total and page_positions:
+        last = page_positions[-1]
+        next_cursor = encode_cursor(
+            {'o': offset + limit} if search
+            else {'r': catalog.avg_rating(last), 'm': int(catalog.movie_ids[last])}
+        )
+    
     return {
         "movies": movies_data,
         "total": total,
         "page": page,
-        "limit": limit
+        "limit": limit,
+        "next_cursor": next_cursor
     }
 
 
@@ -75,6 +101,11 @@ async def get_movie(movie_id: int, db: Session = Depends(get_db)):
     
     - **movie_id**: Movie ID
     """
+    return await run_db(_get_movie, db, movie_id)
+
+
+def _get_movie(db: Session, movie_id: int) -> MovieResponse:
+    """Load one movie with all its details (blocking)."""
     movie = db.query(Movie).filter(Movie.movie_id == movie_id).first()
     
     if not movie:
@@ -103,8 +134,7 @@ async def get_movie(movie_id: int, db: Session = Depends(get_db)):
 @router.get("/popular/list", response_model=List[MovieResponse])
 async def get_popular_movies(
     limit: int = Query(10, ge=1, le=50, description="Number of movies"),
-    min_ratings: int = Query(50, ge=1, description="Minimum number of ratings"),
-    db: Session = Depends(get_db)
+    min_ratings: int = Query(50, ge=1, description="Minimum number of ratings")
 ):
     """
     Get popular movies based on average rating and rating count.
@@ -112,20 +142,21 @@ async def get_popular_movies(
     - **limit**: Number of movies to return
     - **min_ratings**: Minimum number of ratings required
     """
-    movies = db.query(Movie)\
-        .filter(Movie.rating_count >= min_ratings)\
-        .order_by(Movie.avg_rating.desc(), Movie.rating_count.desc())\
-        .limit(limit)\
-        .all()
+    return await run_db(_popular_movies, limit, min_ratings)
+
+
+def _popular_movies(limit: int, min_ratings: int) -> List[MovieResponse]:
+    """Top-rated movies from the catalog (blocking; loads the catalog on first use)."""
+    catalog = get_catalog().snapshot
     
     return [
         MovieResponse(
-            movie_id=movie.movie_id,
-            title=movie.title,
-            release_date=movie.release_date,
-            genres=movie.genres.split(',') if movie.genres else [],
-            avg_rating=round(movie.avg_rating, 2) if movie.avg_rating else 0.0,
-            rating_count=movie.rating_count or 0
+            movie_id=int(catalog.movie_ids[pos]),
+            title=catalog.titles[pos],
+            release_date=catalog.release_dates[pos],
+            genres=list(catalog.genre_lists[pos]),
+            avg_rating=round(catalog.avg_rating(pos), 2) if catalog.avg_rating(pos) else 0.0,
+            rating_count=int(catalog.rating_counts[pos])
         )
-        for movie in movies
+        for pos in catalog.popular(limit, min_ratings).tolist()
     ]
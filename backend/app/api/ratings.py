@@ -1,30 +1,48 @@
 """Rating API routes."""
-from fastapi import APIRouter, Depends, HTTPException, Query, status
+from fastapi import APIRouter, Depends, HTTPException, Query, Response, status
 from sqlalchemy.orm import Session
-from sqlalchemy import func
+from sqlalchemy import String, func, or_, tuple_, type_coerce
+from app.catalog import get_catalog
+from app.concurrency import run_db
+from app.config import settings
 from app.database import get_db
 from app.models.rating import Rating
 from app.models.movie import Movie
 from app.models.user import User
+from app.movie_stats import apply_rating_change
+from app.rating_queue import get_rating_queue
+from app.rating_writes import apply_ratings, publish_ratings, refresh_user_models
 from app.schemas.rating import (
-    RatingCreate, RatingUpdate, RatingResponse,
-    UserRatingResponse, RatingListResponse
+    RatingCreate, RatingUpdate, RatingResponse, RatingBulkCreate,
+    RatingBulkResponse, UserRatingResponse, RatingListResponse
 )
-from typing import List
+from app.utils.pagination import decode_cursor, encode_cursor
+from typing import Dict, List, Optional, Tuple
 from datetime import datetime, timezone
 
 router = APIRouter(prefix="/ratings", tags=["ratings"])
 
 
 @router.post("", response_model=RatingResponse, status_code=status.HTTP_201_CREATED)
-async def create_rating(rating_data: RatingCreate, db: Session = Depends(get_db)):
+async def create_rating(rating_data: RatingCreate, response: Response, db: Session = Depends(get_db)):
     """
     Create a new rating for a movie.
     
     - **user_id**: User ID
     - **movie_id**: Movie ID
     - **rating**: Rating value (1-5)
+    
+    With write-behind enabled the rating is queued and the response is
+    202 Accepted, without a rating_id until the queue has written it.
     """
+    if settings.RATING_WRITE_BEHIND:
+        response.status_code = status.HTTP_202_ACCEPTED
+        return await run_db(_queue_rating, db, rating_data)
+    return await run_db(_create_rating, db, rating_data)
+
+
+def _create_rating(db: Session, rating_data: RatingCreate) -> Rating:
+    """Insert a rating and refresh movie stats and the user model (blocking)."""
     # Check if user exists
     user = db.query(User).filter(User.user_id == rating_data.user_id).first()
     if not user:
@@ -56,20 +74,152 @@ async def create_rating(rating_data: RatingCreate, db: Session = Depends(get_db)
     )
     
     db.add(new_rating)
+    # Movie statistics change in the same transaction
+    stats = apply_rating_change(db, rating_data.movie_id, rating_data.rating, 1)
     db.commit()
     db.refresh(new_rating)
     
-    # Update movie statistics
-    _update_movie_stats(db, rating_data.movie_id)
+    _publish_movie_stats(rating_data.movie_id, stats)
+    _refresh_user_model(db, rating_data.user_id)
     
     return new_rating
 
 
+def _queue_rating(db: Session, rating_data: RatingCreate) -> dict:
+    """Validate a new rating and queue it for the write-behind writer (blocking)."""
+    user = db.query(User.user_id).filter(User.user_id == rating_data.user_id).first()
+    if not user:
+        raise HTTPException(status_code=404, detail="User not found")
+    
+    movie = db.query(Movie.movie_id).filter(Movie.movie_id == rating_data.movie_id).first()
+    if not movie:
+        raise HTTPException(status_code=404, detail="Movie not found")
+    
+    # A queued write is newer than what the database shows
+    rating_queue = get_rating_queue()
+    queued, pending = rating_queue.pending_rating(rating_data.user_id, rating_data.movie_id)
+    if queued:
+        exists = pending is not None
+    else:
+        exists = db.query(Rating.rating_id).filter(
+            Rating.user_id == rating_data.user_id,
+            Rating.movie_id == rating_data.movie_id
+        ).first() is not None
+    if exists:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Rating already exists. Use PUT to update."
+        )
+    
+    rating_queue.append([(rating_data.user_id, rating_data.movie_id, rating_data.rating)])
+    return {
+        "rating_id": None,
+        "user_id": rating_data.user_id,
+        "movie_id": rating_data.movie_id,
+        "rating": rating_data.rating,
+        "timestamp": datetime.now(timezone.utc)
+    }
+
+
+@router.post("/bulk", response_model=RatingBulkResponse)
+async def bulk_upsert_ratings(bulk_data: RatingBulkCreate, response: Response,
+                              db: Session = Depends(get_db)):
+    """
+    Create or update many ratings in one transaction.
+    
+    - **ratings**: Up to 1000 ratings (user_id, movie_id, rating); existing
+      ratings of a user for a movie are updated, and the last one wins when
+      a pair repeats. Nothing is written if any user or movie does not exist.
+    
+    With write-behind enabled the batch is queued (202 Accepted).
+    """
+    if settings.RATING_WRITE_BEHIND:
+        response.status_code = status.HTTP_202_ACCEPTED
+        return await run_db(_queue_bulk_ratings, db, bulk_data.ratings)
+    return await run_db(_bulk_upsert_ratings, db, bulk_data.ratings)
+
+
+def _validate_rating_batch(db: Session, items: List[RatingCreate]) -> Dict[Tuple[int, int], float]:
+    """Last rating per (user_id, movie_id) of a batch; 404 if a user or movie does not exist."""
+    ratings_by_pair: Dict[Tuple[int, int], float] = {}
+    for item in items:
+        ratings_by_pair[(item.user_id, item.movie_id)] = item.rating
+    user_ids = {user_id for user_id, _ in ratings_by_pair}
+    movie_ids = {movie_id for _, movie_id in ratings_by_pair}
+    
+    # One lookup per table for the whole batch
+    found_users = {user_id for (user_id,) in db.query(User.user_id).filter(User.user_id.in_(user_ids))}
+    if len(found_users) < len(user_ids):
+        raise HTTPException(status_code=404, detail=f"Users not found: {sorted(user_ids - found_users)}")
+    found_movies = {movie_id for (movie_id,) in db.query(Movie.movie_id).filter(Movie.movie_id.in_(movie_ids))}
+    if len(found_movies) < len(movie_ids):
+        raise HTTPException(status_code=404, detail=f"Movies not found: {sorted(movie_ids - found_movies)}")
+    return ratings_by_pair
+
+
+def _bulk_upsert_ratings(db: Session, items: List[RatingCreate]) -> dict:
+    """Upsert a batch of ratings with set-based queries (blocking)."""
+    ratings_by_pair = _validate_rating_batch(db, items)
+    timestamp = datetime.now(timezone.utc)
+    ratings, created, stats = apply_ratings(
+        db, {pair: (value, timestamp) for pair, value in ratings_by_pair.items()}
+    )
+    # Rows are flushed: build the response before committing expires them
+    response = [RatingResponse.model_validate(rating) for rating in ratings]
+    db.commit()
+    
+    publish_ratings(db, stats, {user_id for user_id, _ in ratings_by_pair})
+    
+    return {
+        "created": created,
+        "updated": len(ratings) - created,
+        "ratings": response
+    }
+
+
+def _queue_bulk_ratings(db: Session, items: List[RatingCreate]) -> dict:
+    """Validate a batch of ratings and queue it for the write-behind writer (blocking)."""
+    ratings_by_pair = _validate_rating_batch(db, items)
+    rating_ids = {
+        (user_id, movie_id): rating_id
+        for user_id, movie_id, rating_id in db.query(Rating.user_id, Rating.movie_id, Rating.rating_id).filter(
+            tuple_(Rating.user_id, Rating.movie_id).in_(list(ratings_by_pair))
+        )
+    }
+    
+    rating_queue = get_rating_queue()
+    timestamp = datetime.now(timezone.utc)
+    ratings, created = [], 0
+    for (user_id, movie_id), value in ratings_by_pair.items():
+        rating_id = rating_ids.get((user_id, movie_id))
+        queued, pending = rating_queue.pending_rating(user_id, movie_id)
+        if queued and pending is None:
+            # Deleted by a queued write: the row is gone once it applies
+            rating_id = None
+        if not (pending is not None if queued else rating_id is not None):
+            created += 1
+        ratings.append({
+            "rating_id": rating_id,
+            "user_id": user_id,
+            "movie_id": movie_id,
+            "rating": value,
+            "timestamp": timestamp
+        })
+    rating_queue.append([(user_id, movie_id, value) for (user_id, movie_id), value in ratings_by_pair.items()])
+    
+    return {
+        "created": created,
+        "updated": len(ratings) - created,
+        "ratings": ratings
+    }
+
+
 @router.get("/user/{user_id}", response_model=RatingListResponse)
 async def get_user_ratings(
     user_id: int,
     page: int = Query(1, ge=1),
     limit: int = Query(20, ge=1, le=100),
+    cursor: Optional[str] = Query(None, description="next_cursor of the previous page (replaces page)"),
     db: Session = Depends(get_db)
 ):
     """
@@ -78,24 +228,55 @@ async def get_user_ratings(
     - **user_id**: User ID
     - **page**: Page number
     - **limit**: Items per page
+    - **cursor**: Continue after the previous page; constant-time however deep
     """
+    return await run_db(_get_user_ratings, db, user_id, page, limit, cursor)
+
+
+def _get_user_ratings(db: Session, user_id: int, page: int, limit: int,
+                      cursor: Optional[str] = None) -> dict:
+    """Page through a user's ratings, newest first (blocking)."""
     # Check if user exists
     user = db.query(User).filter(User.user_id == user_id).first()
     if not user:
         raise HTTPException(status_code=404, detail="User not found")
     
-    # Get total count
-    total = db.query(Rating).filter(Rating.user_id == user_id).count()
-    
-    # Get ratings with movie details
-    offset = (page - 1) * limit
-    ratings = db.query(Rating, Movie)\
+    # Compare timestamps as stored: rows written by the import scripts and
+    # by the ORM use different text formats, and ORDER BY sorts the raw text.
+    # Undated rows (NULL) sort after every dated one, so the keyset handles them apart
+    timestamp = type_coerce(Rating.timestamp, String)
+    query = db.query(Rating, Movie, timestamp)\
         .join(Movie, Rating.movie_id == Movie.movie_id)\
         .filter(Rating.user_id == user_id)\
-        .order_by(Rating.timestamp.desc())\
-        .offset(offset)\
-        .limit(limit)\
-        .all()
+        .order_by(Rating.timestamp.desc(), Rating.rating_id.desc())
+    
+    if cursor:
+        # Keyset: seek past the last (timestamp, rating_id) on the
+        # ix_ratings_user_timestamp index; the total is carried along
+        try:
+            position = decode_cursor(cursor, 't', 'i', 'n')
+            total = int(position['n'])
+            last_id = int(position['i'])
+            if position['t'] is None:
+                # Past the newest rows: only undated ones are left, which sort last
+                query = query.filter(Rating.timestamp.is_(None), Rating.rating_id < last_id)
+            elif isinstance(position['t'], str):
+                query = query.filter(or_(
+                    tuple_(timestamp, Rating.rating_id) < tuple_(position['t'], last_id),
+                    Rating.timestamp.is_(None)
+                ))
+            else:
+                raise ValueError("Invalid cursor")
+        except (TypeError, ValueError):
+            raise HTTPException(status_code=400, detail="Invalid cursor")
+    else:
+        total = db.query(func.count(Rating.rating_id)).filter(Rating.user_id == user_id).scalar()
+        query = query.offset((page - 1) * limit)
+    # One extra row tells whether there is a next page
+    rows = query.limit(limit + 1).all()
+    has_more = len(rows) > limit
+    rows = rows[:limit]
+    ratings = [(rating, movie) for rating, movie, _ in rows]
     
     ratings_data = [
         UserRatingResponse(
@@ -108,10 +289,16 @@ async def get_user_ratings(
         for rating, movie in ratings
     ]
     
+    next_cursor = None
+    if has_more:
+        last_rating, _, last_timestamp = rows[-1]
+        next_cursor = encode_cursor({'t': last_timestamp, 'i': last_rating.rating_id, 'n': total})
+    
     return {
         "ratings": ratings_data,
         "total": total,
-        "page": page
+        "page": page,
+        "next_cursor": next_cursor
     }
 
 
@@ -127,21 +314,42 @@ async def update_rating(
     - **rating_id**: Rating ID
     - **rating**: New rating value (1-5)
     """
+    if settings.RATING_WRITE_BEHIND:
+        return await run_db(_queue_rating_update, db, rating_id, rating_data)
+    return await run_db(_update_rating, db, rating_id, rating_data)
+
+
+def _update_rating(db: Session, rating_id: int, rating_data: RatingUpdate) -> Rating:
+    """Change a rating and refresh movie stats and the user model (blocking)."""
     rating = db.query(Rating).filter(Rating.rating_id == rating_id).first()
     
     if not rating:
         raise HTTPException(status_code=404, detail="Rating not found")
     
+    stats = apply_rating_change(db, rating.movie_id, rating_data.rating - rating.rating, 0)
     rating.rating = rating_data.rating
     db.commit()
     db.refresh(rating)
     
-    # Update movie statistics
-    _update_movie_stats(db, rating.movie_id)
+    _publish_movie_stats(rating.movie_id, stats)
+    _refresh_user_model(db, rating.user_id)
     
     return rating
 
 
+def _queue_rating_update(db: Session, rating_id: int, rating_data: RatingUpdate) -> dict:
+    """Queue a rating change for the write-behind writer (blocking)."""
+    rating = _find_queued_rating(db, rating_id)
+    get_rating_queue().append([(rating.user_id, rating.movie_id, rating_data.rating)])
+    return {
+        "rating_id": rating.rating_id,
+        "user_id": rating.user_id,
+        "movie_id": rating.movie_id,
+        "rating": rating_data.rating,
+        "timestamp": rating.timestamp
+    }
+
+
 @router.delete("/{rating_id}", status_code=status.HTTP_200_OK)
 async def delete_rating(rating_id: int, db: Session = Depends(get_db)):
     """
@@ -149,30 +357,51 @@ async def delete_rating(rating_id: int, db: Session = Depends(get_db)):
     
     - **rating_id**: Rating ID
     """
+    if settings.RATING_WRITE_BEHIND:
+        return await run_db(_queue_rating_delete, db, rating_id)
+    return await run_db(_delete_rating, db, rating_id)
+
+
+def _delete_rating(db: Session, rating_id: int) -> dict:
+    """Delete a rating and refresh movie stats and the user model (blocking)."""
     rating = db.query(Rating).filter(Rating.rating_id == rating_id).first()
     
     if not rating:
         raise HTTPException(status_code=404, detail="Rating not found")
     
     movie_id = rating.movie_id
+    user_id = rating.user_id
     db.delete(rating)
+    stats = apply_rating_change(db, movie_id, -rating.rating, -1)
     db.commit()
     
-    # Update movie statistics
-    _update_movie_stats(db, movie_id)
+    _publish_movie_stats(movie_id, stats)
+    _refresh_user_model(db, user_id)
     
     return {"success": True, "message": "Rating deleted successfully"}
 
 
-def _update_movie_stats(db: Session, movie_id: int):
-    """Update average rating and rating count for a movie."""
-    stats = db.query(
-        func.avg(Rating.rating).label('avg_rating'),
-        func.count(Rating.rating_id).label('count')
-    ).filter(Rating.movie_id == movie_id).first()
-    
-    movie = db.query(Movie).filter(Movie.movie_id == movie_id).first()
-    if movie:
-        movie.avg_rating = stats.avg_rating if stats.avg_rating else 0.0
-        movie.rating_count = stats.count if stats.count else 0
-        db.commit()
+def _queue_rating_delete(db: Session, rating_id: int) -> dict:
+    """Queue a rating deletion for the write-behind writer (blocking)."""
+    rating = _find_queued_rating(db, rating_id)
+    get_rating_queue().append([(rating.user_id, rating.movie_id, None)])
+    return {"success": True, "message": "Rating deletion queued"}
+
+
+def _find_queued_rating(db: Session, rating_id: int) -> Rating:
+    """A rating in the database that no queued write has deleted; 404 otherwise."""
+    rating = db.query(Rating).filter(Rating.rating_id == rating_id).first()
+    if not rating or get_rating_queue().pending_rating(rating.user_id, rating.movie_id) == (True, None):
+        raise HTTPException(status_code=404, detail="Rating not found")
+    return rating
+
+
+def _publish_movie_stats(movie_id: int, stats):
+    """Apply a movie's committed average rating and count to the in-memory catalog."""
+    if stats is not None:
+        get_catalog().update_movie_stats(movie_id, stats.avg_rating, stats.rating_count)
+
+
+def _refresh_user_model(db: Session, user_id: int):
+    """Fold the user's ratings into the recommender so the next request reflects them."""
+    refresh_user_models(db, [user_id])
@@ -1,5 +1,8 @@
 """Recommendation API routes."""
 from fastapi import APIRouter, HTTPException, Query
+from app.concurrency import run_model
+from app.metrics import recommendation_errors, recommendation_fallbacks
+from app.ml.batching import get_batcher
 from app.ml.recommender import get_recommender
 from app.schemas.movie import MovieRecommendation
 from typing import List
@@ -19,30 +22,38 @@ async def get_user_recommendations(
     - **limit**: Number of recommendations (1-50)
     """
     try:
-        recommender = get_recommender()
-        recommendations = recommender.get_recommendations(user_id, n=limit)
+        # Cache misses are coalesced with concurrent requests and scored
+        # together on the model executor
+        recommendations = await get_batcher().submit(user_id, limit)
         
         if not recommendations:
             # Return popular movies if no personalized recommendations available
-            recommendations = recommender.get_popular_movies(n=limit)
-            # Convert to recommendation format
-            recommendations = [
-                {
-                    **rec,
-                    "predicted_rating": rec.get("avg_rating", 0.0)
-                }
-                for rec in recommendations
-            ]
+            recommendation_fallbacks.inc(reason='no_recommendations')
+            recommendations = await run_model(_popular_recommendations, limit)
         
         return recommendations
     
     except Exception as e:
+        recommendation_errors.inc(stage='request')
         raise HTTPException(
             status_code=500,
             detail=f"Error generating recommendations: {str(e)}"
         )
 
 
+def _popular_recommendations(limit: int) -> List[dict]:
+    """Popular movies in recommendation format (blocking)."""
+    recommendations = get_recommender().get_popular_movies(n=limit)
+    # Convert to recommendation format
+    return [
+        {
+            **rec,
+            "predicted_rating": rec.get("avg_rating", 0.0)
+        }
+        for rec in recommendations
+    ]
+
+
 @router.get("/similar/{movie_id}", response_model=List[MovieRecommendation])
 async def get_similar_movies(
     movie_id: int,
@@ -55,8 +66,7 @@ async def get_similar_movies(
     - **limit**: Number of similar movies
     """
     try:
-        recommender = get_recommender()
-        similar = recommender.get_similar_movies(movie_id, n=limit)
+        similar = await run_model(lambda: get_recommender().get_similar_movies(movie_id, n=limit))
         
         if not similar:
             raise HTTPException(
@@ -0,0 +1,387 @@
+"""In-memory snapshot of the movie catalog for the read paths."""
+import threading
+import time
+import numpy as np
+from typing import Dict, List, Optional, Sequence, Tuple
+from app.config import settings
+from app.database import SQLitePool, engine
+from app.search import TOKEN_PATTERN, SearchIndex
+
+CATALOG_QUERY = """
+SELECT movie_id, title, release_date, genres, avg_rating, rating_count,
+       image_url, summary, imdb_score, director, actors, tags
+FROM movies
+ORDER BY movie_id
+"""
+
+
+class CatalogSnapshot:
+    """
+    Columnar copy of the movies table.
+
+    One array per column, aligned by position and sorted by movie id, plus
+    the genres parsed once: a list per movie, a bitmask over the genre
+    vocabulary (``genre_bits``, one uint64 word per 64 genres) and the
+    genre ids in listed order (``genre_positions``, padded with -1).
+    Text search goes through an inverted index (``search_index``) built
+    on first use.
+    """
+
+    def __init__(self, rows: Sequence[Tuple]):
+        """
+        Build the snapshot from ``CATALOG_QUERY`` rows.
+
+        Args:
+            rows: (movie_id, title, release_date, genres, avg_rating,
+                rating_count, image_url, summary, imdb_score, director,
+                actors, tags) tuples
+        """
+        n_movies = len(rows)
+        columns = list(zip(*rows)) if rows else [()] * 12
+        self.movie_ids = np.array(columns[0], dtype=np.int64)
+        self.titles = np.array(columns[1], dtype=object)
+        self.release_dates = np.array(columns[2], dtype=object)
+        self.genres = np.array(columns[3], dtype=object)
+        self.avg_ratings = np.array([np.nan if v is None else v for v in columns[4]], dtype=np.float64)
+        self.rating_counts = np.array([v or 0 for v in columns[5]], dtype=np.int64)
+        self.image_urls = np.array(columns[6], dtype=object)
+        self.has_image = np.array([v is not None for v in columns[6]], dtype=bool)
+        self.summaries = np.array(columns[7], dtype=object)
+        self.imdb_scores = np.array(columns[8], dtype=object)
+        self.directors = np.array(columns[9], dtype=object)
+        self.actors = np.array(columns[10], dtype=object)
+        self.tags = np.array(columns[11], dtype=object)
+        self.titles_lower = [title.lower() if title else '' for title in columns[1]]
+        self.loaded_at = time.monotonic()
+        self._search_index: Optional[SearchIndex] = None
+        self._search_lock = threading.Lock()
+        # Sorted listings per genre filter; dropped when ratings change
+        self._listings: Dict[Optional[str], 'CatalogListing'] = {}
+        # Rating writes change avg_ratings and rating_counts together under this lock
+        self._stats_lock = threading.Lock()
+
+        # Parse every genre string once
+        self.genre_lists: List[List[str]] = []
+        self.genre_names: List[str] = []
+        genre_index: Dict[str, int] = {}
+        parsed = []
+        for genres in columns[3]:
+            tokens = genres.split(',') if genres else []
+            self.genre_lists.append(tokens)
+            parsed.append([genre_index.setdefault(token.strip(), len(genre_index)) for token in tokens])
+        self.genre_names = list(genre_index)
+        self._genre_index = genre_index
+        # Case-insensitive exact lookup for the genre filter
+        self._genre_lookup = {name.lower(): genre_id for name, genre_id in genre_index.items()}
+
+        n_words = max(1, (len(genre_index) + 63) // 64)
+        width = max((len(ids) for ids in parsed), default=0)
+        self.genre_bits = np.zeros((n_movies, n_words), dtype=np.uint64)
+        self.genre_positions = np.full((n_movies, max(width, 1)), -1, dtype=np.int32)
+        for pos, ids in enumerate(parsed):
+            for slot, genre in enumerate(ids):
+                self.genre_bits[pos, genre // 64] |= np.uint64(1 << (genre % 64))
+                self.genre_positions[pos, slot] = genre
+
+    def __len__(self) -> int:
+        return len(self.movie_ids)
+
+    @property
+    def search_index(self) -> SearchIndex:
+        """Inverted index over title, summary, director, actors and tags, built on first access."""
+        if self._search_index is None:
+            with self._search_lock:
+                if self._search_index is None:
+                    self._search_index = SearchIndex({
+                        'title': self.titles,
+                        'summary': self.summaries,
+                        'director': self.directors,
+                        'actors': self.actors,
+                        'tags': self.tags
+                    })
+        return self._search_index
+
+    def positions(self, movie_ids) -> np.ndarray:
+        """Positions of movie ids in the snapshot (-1 for unknown ids)."""
+        movie_ids = np.asarray(movie_ids, dtype=np.int64)
+        if len(self.movie_ids) == 0:
+            return np.full(movie_ids.shape, -1, dtype=np.int64)
+        pos = np.minimum(np.searchsorted(self.movie_ids, movie_ids), len(self.movie_ids) - 1)
+        return np.where(self.movie_ids[pos] == movie_ids, pos, -1)
+
+    def genre_mask(self, genre_ids: Sequence[int]) -> np.ndarray:
+        """Movies tagged with any of the given genre ids."""
+        return self.genre_mask_at(genre_ids, slice(None))
+
+    def genre_mask_at(self, genre_ids: Sequence[int], positions) -> np.ndarray:
+        """Whether each movie at ``positions`` is tagged with any of the given genre ids."""
+        bits = self.genre_bits[positions]
+        mask = np.zeros(len(bits), dtype=bool)
+        for genre in genre_ids:
+            mask |= (bits[:, genre // 64] & np.uint64(1 << (genre % 64))) != 0
+        return mask
+
+    def genre_boost(self, boost: Dict[str, float], positions: Optional[np.ndarray] = None) -> np.ndarray:
+        """
+        Sum the boost of every genre each movie is listed with.
+
+        Adds one genre slot at a time, i.e. in the order the genres are
+        listed, so the float sums match walking each movie's genre list.
+
+        Args:
+            boost: Boost per (stripped) genre name
+            positions: Movies to compute the boost for (all by default)
+
+        Returns:
+            Boost per movie, aligned with ``positions``
+        """
+        slots = self.genre_positions if positions is None else self.genre_positions[positions]
+        total = np.zeros(len(slots))
+        if not boost:
+            return total
+        # Lookup table over genre ids, with a trailing 0 for the -1 padding
+        weights = np.zeros(len(self.genre_names) + 1)
+        for genre, value in boost.items():
+            genre_id = self._genre_index.get(genre)
+            if genre_id is not None:
+                weights[genre_id] = value
+        for slot in range(slots.shape[1]):
+            total += weights[slots[:, slot]]
+        return total
+
+    def avg_rating(self, pos: int) -> Optional[float]:
+        """Average rating of the movie at ``pos``, None if unset."""
+        value = self.avg_ratings[pos]
+        return None if np.isnan(value) else float(value)
+
+    def popular(self, n: int, min_ratings: int, require_image: bool = False) -> np.ndarray:
+        """
+        Positions of the top-rated movies with at least ``min_ratings`` ratings.
+
+        Ordered by average rating, then rating count, both descending.
+        """
+        mask = self.rating_counts >= min_ratings
+        if require_image:
+            mask &= self.has_image
+        candidates = np.flatnonzero(mask)
+        return candidates[self._order_by_rating(candidates, by_count=True)[:n]]
+
+    def filter(self, search: Optional[str] = None, genre: Optional[str] = None) -> np.ndarray:
+        """
+        Positions matching a text search and a genre filter.
+
+        The search matches every word against the title, summary, director,
+        actors and tags through ``search_index`` (whole words or word
+        prefixes) and orders by relevance, then by rating. Without a search,
+        movies are ordered best rated first. The genre filter matches genre
+        names exactly (case-insensitive); a comma-separated list requires
+        every listed genre.
+        """
+        if not search:
+            return self.listing(genre).positions
+        scores = None
+        if TOKEN_PATTERN.search(search):
+            candidates, scores = self.search_index.search(search)
+        else:
+            # No words to look up (e.g. punctuation only); match titles as before
+            needle = search.lower()
+            candidates = np.flatnonzero(np.fromiter(
+                (needle in title for title in self.titles_lower), dtype=bool, count=len(self)
+            ))
+        if genre:
+            keep = self._genre_filter(candidates, genre)
+            candidates = candidates[keep]
+            if scores is not None:
+                scores = scores[keep]
+        if scores is None:
+            return candidates[self._order_by_rating(candidates)]
+        ratings = self.avg_ratings[candidates]
+        ratings = np.where(np.isnan(ratings), -np.inf, ratings)
+        return candidates[np.lexsort((-ratings, -scores))]
+
+    def listing(self, genre: Optional[str] = None) -> 'CatalogListing':
+        """
+        All movies (or those of a genre filter), best rated first.
+
+        Sorted once and cached until a movie's rating stats change, so
+        listing requests and their total counts cost no sort; pages are cut
+        with ``CatalogListing.start_after``.
+        """
+        key = genre.lower() if genre else None
+        # A listing built while stats change lands in the dict they replaced, never in the current one
+        listings = self._listings
+        listing = listings.get(key)
+        if listing is None:
+            candidates = np.arange(len(self))
+            if genre:
+                candidates = candidates[self._genre_filter(candidates, genre)]
+            with self._stats_lock:
+                ratings = self.avg_ratings[candidates]
+            order = self._rating_order(ratings)
+            listing = CatalogListing(candidates[order], self.movie_ids[candidates[order]], ratings[order])
+            listings[key] = listing
+        return listing
+
+    def update_stats(self, pos: int, avg_rating: Optional[float], rating_count: Optional[int]):
+        """Set a movie's rating average and count together, and drop the sorted listings."""
+        with self._stats_lock:
+            self.avg_ratings[pos] = np.nan if avg_rating is None else avg_rating
+            self.rating_counts[pos] = rating_count or 0
+            self._listings = {}
+
+    def _genre_filter(self, candidates: np.ndarray, genre: str) -> np.ndarray:
+        """Mask of the candidates listed with every genre of a comma-separated filter."""
+        keep = np.ones(len(candidates), dtype=bool)
+        for name in genre.split(','):
+            genre_id = self._genre_lookup.get(name.strip().lower())
+            if genre_id is None:
+                keep[:] = False
+                break
+            keep &= self.genre_mask_at([genre_id], candidates)
+        return keep
+
+    def _order_by_rating(self, candidates: np.ndarray, by_count: bool = False) -> np.ndarray:
+        """Stable descending order by average rating (unset last), then by count."""
+        with self._stats_lock:
+            ratings = self.avg_ratings[candidates]
+            counts = self.rating_counts[candidates] if by_count else None
+        return self._rating_order(ratings, counts)
+
+    @staticmethod
+    def _rating_order(ratings: np.ndarray, counts: Optional[np.ndarray] = None) -> np.ndarray:
+        ratings = np.where(np.isnan(ratings), -np.inf, ratings)
+        if counts is not None:
+            return np.lexsort((-counts, -ratings))
+        return np.argsort(-ratings, kind='stable')
+
+
+class CatalogListing:
+    """
+    Positions of a movie listing in display order, with keys for keyset paging.
+
+    The order is average rating descending (unset last), then movie id, so
+    the pair (avg_rating, movie_id) of the last movie on a page locates the
+    next page with two binary searches, however deep the page is.
+    """
+
+    def __init__(self, positions: np.ndarray, movie_ids: np.ndarray, ratings: np.ndarray):
+        """
+        Args:
+            positions: Snapshot positions in display order
+            movie_ids: Their movie ids
+            ratings: Their average ratings, as sorted (NaN for unset)
+        """
+        self.positions = positions
+        # Both ascending along the listing
+        self._rating_keys = np.where(np.isnan(ratings), np.inf, -ratings)
+        self._movie_ids = movie_ids
+
+    def __len__(self) -> int:
+        return len(self.positions)
+
+    def start_after(self, avg_rating: Optional[float], movie_id: int) -> int:
+        """Index of the first movie after the one with this rating and id."""
+        key = np.inf if avg_rating is None else -avg_rating
+        lo = int(np.searchsorted(self._rating_keys, key, side='left'))
+        hi = int(np.searchsorted(self._rating_keys, key, side='right'))
+        return lo + int(np.searchsorted(self._movie_ids[lo:hi], movie_id, side='right'))
+
+
+class CatalogStore:
+    """
+    Process-wide catalog snapshot, loaded once and refreshed on change.
+
+    Rating writes update a movie's average and count in place through
+    ``update_movie_stats``; changes made elsewhere (other workers, import
+    scripts) are picked up by a full reload once the snapshot is older than
+    ``refresh_seconds``. Readers keep using the previous snapshot while one
+    thread reloads.
+    """
+
+    def __init__(self, pool: SQLitePool, refresh_seconds: float = 300):
+        """
+        Initialize store.
+
+        Args:
+            pool: Connection pool to read the movies table from
+            refresh_seconds: Maximum age of a snapshot before it is reloaded
+        """
+        self.pool = pool
+        self.refresh_seconds = refresh_seconds
+        self._snapshot: Optional[CatalogSnapshot] = None
+        self._lock = threading.Lock()
+        self.reloads = 0
+        self.last_load_ms = 0.0
+
+    @property
+    def snapshot(self) -> CatalogSnapshot:
+        """Current snapshot, loading or refreshing it as needed."""
+        snapshot = self._snapshot
+        if snapshot is None:
+            with self._lock:
+                if self._snapshot is None:
+                    self._snapshot = self._load()
+                return self._snapshot
+        if time.monotonic() - snapshot.loaded_at > self.refresh_seconds:
+            # Only one thread reloads; the others keep serving the old snapshot
+            if self._lock.acquire(blocking=False):
+                try:
+                    if self._snapshot is snapshot:
+                        self._snapshot = self._load()
+                finally:
+                    self._lock.release()
+        return self._snapshot
+
+    def refresh(self):
+        """Reload the snapshot now."""
+        with self._lock:
+            self._snapshot = self._load()
+
+    def _load(self) -> CatalogSnapshot:
+        start = time.perf_counter()
+        snapshot = CatalogSnapshot(self.pool.fetchall('catalog', CATALOG_QUERY))
+        # Build the search index with the snapshot, so a refresh never makes
+        # a search request wait for it
+        snapshot.search_index
+        self.last_load_ms = round((time.perf_counter() - start) * 1000, 2)
+        self.reloads += 1
+        return snapshot
+
+    def update_movie_stats(self, movie_id: int, avg_rating: float, rating_count: int):
+        """Apply a movie's new rating average and count to the loaded snapshot."""
+        snapshot = self._snapshot
+        if snapshot is None:
+            return
+        pos = snapshot.positions([movie_id])[0]
+        if pos < 0:
+            # A movie added after the snapshot; reload on next access
+            snapshot.loaded_at = float('-inf')
+            return
+        snapshot.update_stats(pos, avg_rating, rating_count)
+
+    def stats(self) -> Dict:
+        """Snapshot size, age and reload counters."""
+        snapshot = self._snapshot
+        return {
+            'movies': len(snapshot) if snapshot is not None else 0,
+            'genres': len(snapshot.genre_names) if snapshot is not None else 0,
+            'age_seconds': round(time.monotonic() - snapshot.loaded_at, 1) if snapshot is not None else None,
+            'reloads': self.reloads,
+            'last_load_ms': self.last_load_ms,
+            'search_index': snapshot.search_index.stats() if snapshot is not None else None
+        }
+
+
+# Singleton instance
+_catalog_instance: Optional[CatalogStore] = None
+
+
+def get_catalog() -> CatalogStore:
+    """Get or create the catalog store for the application database."""
+    global _catalog_instance
+    if _catalog_instance is None:
+        _catalog_instance = CatalogStore(
+            SQLitePool(engine.url.database, size=settings.SQLITE_POOL_SIZE),
+            refresh_seconds=settings.CATALOG_REFRESH_SECONDS
+        )
+    return _catalog_instance
@@ -0,0 +1,121 @@
+"""Executors that keep blocking work off the event loop."""
+import asyncio
+import functools
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, Dict, Optional, TypeVar
+from app.config import settings
+from app.metrics import registry as metrics_registry
+
+T = TypeVar('T')
+
+
+class BoundedExecutor:
+    """
+    Thread pool with a fixed number of workers for one kind of blocking work.
+
+    ``run`` awaits a blocking call on the pool, so the event loop keeps
+    serving other requests while it runs. Calls beyond ``max_workers``
+    queue up instead of spawning threads. With ``max_workers=0`` calls run
+    inline on the event loop (the behaviour before the executors existed).
+    """
+
+    def __init__(self, name: str, max_workers: int):
+        """
+        Initialize executor.
+
+        Args:
+            name: Thread name prefix, also used in stats
+            max_workers: Worker threads (0 runs calls inline)
+        """
+        self.name = name
+        self.max_workers = max_workers
+        self._pool: Optional[ThreadPoolExecutor] = None
+        self._lock = threading.Lock()
+        self.submitted = 0
+        self.active = 0
+
+    @property
+    def pool(self) -> ThreadPoolExecutor:
+        if self._pool is None:
+            with self._lock:
+                if self._pool is None:
+                    self._pool = ThreadPoolExecutor(max_workers=self.max_workers, thread_name_prefix=self.name)
+        return self._pool
+
+    async def run(self, func: Callable[..., T], *args, **kwargs) -> T:
+        """Run ``func(*args, **kwargs)`` on the pool and await its result."""
+        self.submitted += 1
+        if self.max_workers <= 0:
+            return func(*args, **kwargs)
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(self.pool, functools.partial(self._call, func, *args, **kwargs))
+
+    def _call(self, func: Callable[..., T], *args, **kwargs) -> T:
+        with self._lock:
+            self.active += 1
+        try:
+            return func(*args, **kwargs)
+        finally:
+            with self._lock:
+                self.active -= 1
+
+    def shutdown(self):
+        """Wait for running calls and stop the worker threads."""
+        if self._pool is not None:
+            self._pool.shutdown(wait=True)
+            self._pool = None
+
+    def stats(self) -> Dict:
+        """Pool size, busy threads and queued calls."""
+        queued = self._pool._work_queue.qsize() if self._pool is not None else 0
+        return {
+            'max_workers': self.max_workers,
+            'active': self.active,
+            'queued': queued,
+            'submitted': self.submitted
+        }
+
+
+# Database work (SQLAlchemy sessions, raw SQLite) and model scoring get
+# separate pools so slow scoring cannot starve cheap lookups
+db_executor = BoundedExecutor('db', settings.DB_EXECUTOR_THREADS)
+model_executor = BoundedExecutor('model', settings.MODEL_EXECUTOR_THREADS)
+
+
+def _collect_metrics():
+    """Busy threads and queued calls per executor, for ``/metrics``."""
+    executors = (db_executor, model_executor)
+    return [
+        ('executor_active_threads', 'gauge', 'Threads running a blocking call',
+         [({'executor': e.name}, e.stats()['active']) for e in executors]),
+        ('executor_queued_calls', 'gauge', 'Blocking calls waiting for a thread',
+         [({'executor': e.name}, e.stats()['queued']) for e in executors]),
+    ]
+
+
+metrics_registry.add_collector(_collect_metrics)
+
+
+async def run_db(func: Callable[..., T], *args, **kwargs) -> T:
+    """Run blocking database work on the database pool."""
+    return await db_executor.run(func, *args, **kwargs)
+
+
+async def run_model(func: Callable[..., T], *args, **kwargs) -> T:
+    """Run model scoring on the model pool."""
+    return await model_executor.run(func, *args, **kwargs)
+
+
+def executor_stats() -> Dict:
+    """Stats of both executors."""
+    return {
+        'db': db_executor.stats(),
+        'model': model_executor.stats()
+    }
+
+
+def shutdown_executors():
+    """Stop both executors, letting running calls finish."""
+    db_executor.shutdown()
+    model_executor.shutdown()
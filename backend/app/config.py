@@ -8,6 +8,15 @@ class Settings(BaseSettings):
     
     # Database
     DATABASE_URL: str = "sqlite:///./data/database.db"
+    SQLITE_POOL_SIZE: int = 8  # Raw connections kept by the recommender
+    SQLITE_SYNCHRONOUS: str = "NORMAL"  # Safe with WAL; FULL fsyncs every commit
+    SQLITE_CACHE_SIZE_KB: int = 65536  # Page cache per connection
+    SQLITE_MMAP_SIZE: int = 268435456  # Bytes of the database file memory-mapped
+    SQLITE_BUSY_TIMEOUT_MS: int = 5000
+    DB_EXECUTOR_THREADS: int = 16  # Blocking database calls from async routes
+    MODEL_EXECUTOR_THREADS: int = 4  # Recommendation scoring; 0 runs it on the event loop
+    RECOMMENDATION_BATCH_WINDOW_MS: float = 3.0  # Wait for concurrent requests to score together; 0 disables
+    RECOMMENDATION_BATCH_MAX_SIZE: int = 32  # Score a batch as soon as this many requests wait
     
     # JWT
     SECRET_KEY: str = "your-secret-key-change-in-production"
@@ -19,6 +28,25 @@ class Settings(BaseSettings):
     
     # Model
     MODEL_PATH: str = "data/trained_model.pkl"
+    MODEL_ARTIFACT_DIR: str = "data/model"  # Memory-mapped artifacts, preferred over MODEL_PATH
+    MODEL_WATCH_SECONDS: float = 30  # Poll for new model versions and hot-reload them; 0 disables
+    ADMIN_TOKEN: str = ""  # X-Admin-Token for /admin endpoints; empty disables them
+    SIMILARITY_INDEX_MODE: str = "exact"  # "exact" or "lsh"
+    RECOMMENDATION_CACHE_SIZE: int = 10000  # Users kept in memory
+    RECOMMENDATION_CACHE_TTL: int = 300  # Seconds
+    USER_HISTORY_CACHE_SIZE: int = 10000  # Users whose rated movies are kept in memory (expire with the cache TTL)
+    RECOMMENDATION_PIPELINE: str = "full"  # "full" (score every movie) or "two_stage" (retrieve, then re-rank)
+    RETRIEVAL_CANDIDATES: int = 300  # Candidates from the factor index per user in two-stage mode
+    PRECOMPUTED_RECOMMENDATIONS_DIR: str = "data/precomputed"
+    ONLINE_FOLD_IN: bool = True  # Update user factors on each rating write
+    CATALOG_REFRESH_SECONDS: int = 300  # Full reload of the in-memory movie catalog
+    MOVIE_STATS_RECONCILE_SECONDS: float = 3600  # Recompute drifted movie rating stats; 0 disables
+    FOLD_IN_REG: float = 0.02
+    FOLD_IN_MAX_USERS: int = 10000  # Users with folded-in factors kept per model (least recently used dropped)
+    RATING_WRITE_BEHIND: bool = False  # Acknowledge rating writes once logged; apply them in batches
+    RATING_QUEUE_PATH: str = "data/rating_queue.log"
+    RATING_QUEUE_BATCH_SIZE: int = 500  # Most queued writes per transaction
+    RATING_QUEUE_FLUSH_MS: float = 50  # Let writes gather this long before each transaction
     
     # TMDB API
     TMDB_API_KEY: str = ""
@@ -1,15 +1,48 @@
 """Database configuration and session management."""
-from sqlalchemy import create_engine
+import queue
+import sqlite3
+import threading
+import time
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Dict, Iterator, List, Optional, Sequence, Tuple
+from sqlalchemy import create_engine, event
 from sqlalchemy.ext.declarative import declarative_base
 from sqlalchemy.orm import sessionmaker
 from app.config import settings
 
+
+def configure_sqlite_connection(conn):
+    """
+    Apply the connection pragmas used by every SQLite connection.
+
+    WAL lets readers run alongside the writer, ``synchronous=NORMAL`` is
+    durable in WAL mode while skipping an fsync per commit, and the page
+    cache and memory map keep hot pages out of read() calls.
+    """
+    cursor = conn.cursor()
+    cursor.execute("PRAGMA journal_mode=WAL")
+    cursor.execute(f"PRAGMA synchronous={settings.SQLITE_SYNCHRONOUS}")
+    cursor.execute(f"PRAGMA cache_size=-{int(settings.SQLITE_CACHE_SIZE_KB)}")
+    cursor.execute(f"PRAGMA mmap_size={int(settings.SQLITE_MMAP_SIZE)}")
+    cursor.execute("PRAGMA temp_store=MEMORY")
+    cursor.execute(f"PRAGMA busy_timeout={int(settings.SQLITE_BUSY_TIMEOUT_MS)}")
+    cursor.close()
+
+
 # Create database engine
+# The pool holds at least one connection per database executor thread, so
+# blocking calls on the executor never wait for a connection
 engine = create_engine(
     settings.DATABASE_URL,
-    connect_args={"check_same_thread": False}  # Needed for SQLite
+    connect_args={"check_same_thread": False},  # Needed for SQLite
+    pool_size=max(5, settings.DB_EXECUTOR_THREADS),
+    max_overflow=10
 )
 
+if engine.dialect.name == "sqlite":
+    event.listen(engine, "connect", lambda dbapi_conn, _: configure_sqlite_connection(dbapi_conn))
+
 # Create session factory
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
 
@@ -27,5 +60,139 @@ def get_db():
 
 
 def init_db():
-    """Initialize database tables."""
+    """Initialize database tables, and indexes added to existing tables since."""
     Base.metadata.create_all(bind=engine)
+    for table in Base.metadata.sorted_tables:
+        for index in table.indexes:
+            index.create(bind=engine, checkfirst=True)
+
+
+class SQLitePool:
+    """
+    Thread-safe pool of raw sqlite3 connections for hot read paths.
+
+    Connections are opened lazily up to ``size``, configured once with
+    ``configure_sqlite_connection`` and reused, so each one keeps its page
+    cache and its compiled statement cache across requests. Queries are
+    named; per-name call counts and latencies are kept for ``stats()``.
+    """
+
+    def __init__(self, db_path: Path, size: int = 8, timeout: float = 30.0,
+                 cached_statements: int = 256):
+        """
+        Initialize pool.
+
+        Args:
+            db_path: Path to SQLite database
+            size: Maximum number of open connections
+            timeout: Seconds to wait for a free connection
+            cached_statements: Prepared statements kept per connection
+        """
+        self.db_path = Path(db_path)
+        self.size = size
+        self.timeout = timeout
+        self.cached_statements = cached_statements
+        self._idle = queue.LifoQueue()
+        self._opened = 0
+        self._lock = threading.Lock()
+        self._query_stats: Dict[str, List[float]] = {}  # name -> [count, total_ms, max_ms]
+        self.waits = 0
+
+    def _open(self) -> sqlite3.Connection:
+        conn = sqlite3.connect(self.db_path, check_same_thread=False,
+                               cached_statements=self.cached_statements)
+        configure_sqlite_connection(conn)
+        return conn
+
+    @contextmanager
+    def connection(self) -> Iterator[sqlite3.Connection]:
+        """
+        Borrow a connection, opening one if the pool is not full yet.
+
+        Raises:
+            sqlite3.OperationalError: If no connection frees up within ``timeout``
+        """
+        try:
+            conn = self._idle.get_nowait()
+        except queue.Empty:
+            conn = None
+            with self._lock:
+                if self._opened < self.size:
+                    self._opened += 1
+                    open_new = True
+                else:
+                    self.waits += 1
+                    open_new = False
+            if open_new:
+                try:
+                    conn = self._open()
+                except Exception:
+                    with self._lock:
+                        self._opened -= 1
+                    raise
+            else:
+                try:
+                    conn = self._idle.get(timeout=self.timeout)
+                except queue.Empty:
+                    raise sqlite3.OperationalError(
+                        f"connection pool exhausted: no connection free after {self.timeout}s "
+                        f"({self.size} in use)"
+                    ) from None
+        try:
+            yield conn
+        finally:
+            self._idle.put(conn)
+
+    def fetchall(self, name: str, sql: str, params: Sequence = ()) -> List[Tuple]:
+        """Run a query and return its rows as plain tuples."""
+        with self.connection() as conn:
+            start = time.perf_counter()
+            rows = conn.execute(sql, params).fetchall()
+            self._record(name, time.perf_counter() - start)
+        return rows
+
+    def fetchone(self, name: str, sql: str, params: Sequence = ()) -> Optional[Tuple]:
+        """Run a query and return its first row, or None."""
+        with self.connection() as conn:
+            start = time.perf_counter()
+            row = conn.execute(sql, params).fetchone()
+            self._record(name, time.perf_counter() - start)
+        return row
+
+    def _record(self, name: str, seconds: float):
+        elapsed_ms = seconds * 1000
+        with self._lock:
+            entry = self._query_stats.setdefault(name, [0, 0.0, 0.0])
+            entry[0] += 1
+            entry[1] += elapsed_ms
+            entry[2] = max(entry[2], elapsed_ms)
+
+    def stats(self) -> Dict:
+        """Pool usage and per-query call counts and latencies (ms)."""
+        with self._lock:
+            return {
+                'size': self.size,
+                'open': self._opened,
+                'idle': self._idle.qsize(),
+                'waits': self.waits,
+                'queries': {
+                    name: {
+                        'count': count,
+                        'total_ms': round(total, 3),
+                        'avg_ms': round(total / count, 3),
+                        'max_ms': round(peak, 3)
+                    }
+                    for name, (count, total, peak) in self._query_stats.items()
+                }
+            }
+
+    def close(self):
+        """Close idle connections."""
+        while True:
+            try:
+                conn = self._idle.get_nowait()
+            except queue.Empty:
+                break
+            conn.close()
+            with self._lock:
+                self._opened -= 1
@@ -1,8 +1,16 @@
 """FastAPI main application."""
 from fastapi import FastAPI
+from fastapi.responses import PlainTextResponse
 from fastapi.middleware.cors import CORSMiddleware
-from app.api import auth, movies, ratings, recommendations
+from app.api import admin, auth, movies, ratings, recommendations
+from app.concurrency import executor_stats, shutdown_executors
 from app.database import init_db
+from app.metrics import MetricsMiddleware, render_metrics
+from app.ml.batching import batcher_stats
+from app.ml.recommender import get_recommender, model_status, recommender_stats
+from app.ml.shared_model import shared_model_spec
+from app.movie_stats import get_reconciler
+from app.rating_queue import get_rating_queue, rating_queue_stats
 from app.config import settings
 
 app = FastAPI(
@@ -23,6 +31,9 @@ app.add_middleware(
     expose_headers=["*"],
 )
 
+# Request latency per route template, exported at /metrics
+app.add_middleware(MetricsMiddleware)
+
 
 # Initialize database on startup
 @app.on_event("startup")
@@ -30,10 +41,30 @@ async def startup_event():
     """Initialize database tables on app startup."""
     init_db()
     print("✓ Database initialized")
+    if shared_model_spec() is not None:
+        # Attaching the shared model takes milliseconds; do it before the first request
+        get_recommender().scorer
+    get_recommender().registry.start_watcher()
+    get_reconciler().start()
+    if settings.RATING_WRITE_BEHIND:
+        queue = get_rating_queue()
+        queue.start()
+        print(f"✓ Rating writes queued to {queue.path}")
     print(f"✓ API running at http://localhost:8000")
     print(f"✓ Docs available at http://localhost:8000/docs")
 
 
+@app.on_event("shutdown")
+async def shutdown_event():
+    """Stop the background threads and let in-flight database and scoring calls finish."""
+    get_recommender().registry.stop_watcher()
+    get_reconciler().stop()
+    shutdown_executors()
+    if settings.RATING_WRITE_BEHIND:
+        # After the executors: no request can queue a rating write any more
+        get_rating_queue().stop()
+
+
 # Health check endpoint
 @app.get("/")
 async def root():
@@ -53,8 +84,29 @@ async def root():
 
 @app.get("/health")
 async def health_check():
-    """Health check endpoint."""
-    return {"status": "healthy"}
+    """Health check endpoint, with the model version, executor load and, once loaded, recommender stats."""
+    health = {
+        "status": "healthy",
+        "model": model_status(),
+        "executors": executor_stats(),
+        "movie_stats": get_reconciler().stats()
+    }
+    stats = recommender_stats()
+    if stats is not None:
+        health["recommender"] = stats
+    stats = batcher_stats()
+    if stats is not None:
+        health["batcher"] = stats
+    stats = rating_queue_stats()
+    if stats is not None:
+        health["rating_queue"] = stats
+    return health
+
+
+@app.get("/metrics", response_class=PlainTextResponse)
+async def metrics():
+    """Request latency, recommendation stage timings and counters in the Prometheus text format."""
+    return PlainTextResponse(render_metrics(), media_type="text/plain; version=0.0.4")
 
 
 # Include API routers
@@ -62,3 +114,4 @@ app.include_router(auth.router, prefix="/api/v1")
 app.include_router(movies.router, prefix="/api/v1")
 app.include_router(ratings.router, prefix="/api/v1")
 app.include_router(recommendations.router, prefix="/api/v1")
+app.include_router(admin.router, prefix="/api/v1")
@@ -0,0 +1,266 @@
+"""Latency histograms and counters, exposed in the Prometheus text format."""
+import bisect
+import math
+import threading
+import time
+from contextlib import contextmanager
+from typing import Callable, Dict, Iterable, List, Sequence, Tuple
+
+# Seconds; fine-grained at the low end, where recommendation stages live
+DEFAULT_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0)
+
+# (metric name, type, help, samples) as produced by collectors; a sample is
+# (labels, value) or (labels, value, name suffix such as '_bucket')
+MetricFamily = Tuple[str, str, str, List[tuple]]
+
+
+def _format_labels(labels: Dict[str, str]) -> str:
+    if not labels:
+        return ''
+    pairs = []
+    for name, value in labels.items():
+        value = str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+        pairs.append(f'{name}="{value}"')
+    return '{' + ','.join(pairs) + '}'
+
+
+def _format_value(value: float) -> str:
+    if math.isinf(value):
+        return '+Inf' if value > 0 else '-Inf'
+    if float(value).is_integer():
+        return str(int(value))
+    return repr(float(value))
+
+
+class Counter:
+    """Monotonic counter with optional labels."""
+
+    def __init__(self, name: str, help: str, labelnames: Sequence[str] = ()):
+        self.name = name
+        self.help = help
+        self.labelnames = tuple(labelnames)
+        self._values: Dict[Tuple[str, ...], float] = {}
+        self._lock = threading.Lock()
+
+    def inc(self, amount: float = 1.0, **labels):
+        """Add ``amount`` to the series with these label values."""
+        key = tuple(str(labels[name]) for name in self.labelnames)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0.0) + amount
+
+    def value(self, **labels) -> float:
+        key = tuple(str(labels[name]) for name in self.labelnames)
+        return self._values.get(key, 0.0)
+
+    def collect(self) -> List[MetricFamily]:
+        with self._lock:
+            samples = [(dict(zip(self.labelnames, key)), value) for key, value in sorted(self._values.items())]
+        return [(self.name, 'counter', self.help, samples)]
+
+
+class Histogram:
+    """
+    Cumulative latency histogram with optional labels.
+
+    Observations only bump a bucket counter and a sum under a lock, so
+    recording from the request path costs well under a microsecond.
+    """
+
+    def __init__(self, name: str, help: str, labelnames: Sequence[str] = (),
+                 buckets: Sequence[float] = DEFAULT_BUCKETS):
+        self.name = name
+        self.help = help
+        self.labelnames = tuple(labelnames)
+        self.buckets = tuple(sorted(buckets))
+        # label values -> (per-bucket counts incl. +Inf, sum)
+        self._series: Dict[Tuple[str, ...], Tuple[List[int], List[float]]] = {}
+        self._lock = threading.Lock()
+
+    def observe(self, value: float, **labels):
+        """Record one observation (seconds)."""
+        key = tuple(str(labels[name]) for name in self.labelnames)
+        index = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            series = self._series.get(key)
+            if series is None:
+                series = self._series[key] = ([0] * (len(self.buckets) + 1), [0.0])
+            series[0][index] += 1
+            series[1][0] += value
+
+    @contextmanager
+    def time(self, **labels):
+        """Observe the duration of a ``with`` block."""
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(time.perf_counter() - start, **labels)
+
+    def count(self, **labels) -> int:
+        key = tuple(str(labels[name]) for name in self.labelnames)
+        series = self._series.get(key)
+        return sum(series[0]) if series is not None else 0
+
+    def collect(self) -> List[MetricFamily]:
+        samples = []
+        with self._lock:
+            series = [(key, list(counts), total[0]) for key, (counts, total) in sorted(self._series.items())]
+        for key, counts, total in series:
+            labels = dict(zip(self.labelnames, key))
+            cumulative = 0
+            for bound, count in zip(self.buckets + (math.inf,), counts):
+                cumulative += count
+                samples.append(({**labels, 'le': _format_value(bound)}, cumulative, '_bucket'))
+            samples.append((labels, total, '_sum'))
+            samples.append((labels, cumulative, '_count'))
+        return [(self.name, 'histogram', self.help, samples)]
+
+
+class StageTimer:
+    """
+    Time the stages of one piece of work and record them together.
+
+    Stages can be entered repeatedly (e.g. one SQL query per user of a
+    batch); their durations add up and ``record`` makes one observation
+    per stage, so a batch shows up as one sample rather than one per query.
+    """
+
+    def __init__(self, histogram: Histogram):
+        self.histogram = histogram
+        self.seconds: Dict[str, float] = {}
+
+    @contextmanager
+    def stage(self, name: str):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.seconds[name] = self.seconds.get(name, 0.0) + time.perf_counter() - start
+
+    def record(self):
+        """Observe every stage's total duration."""
+        for name, seconds in self.seconds.items():
+            self.histogram.observe(seconds, stage=name)
+        self.seconds = {}
+
+
+class MetricsRegistry:
+    """Metrics and collector callbacks rendered together at ``/metrics``."""
+
+    def __init__(self):
+        self._metrics = []
+        self._collectors: List[Callable[[], Iterable[MetricFamily]]] = []
+
+    def register(self, metric):
+        self._metrics.append(metric)
+        return metric
+
+    def add_collector(self, collector: Callable[[], Iterable[MetricFamily]]):
+        """Call ``collector()`` on every scrape, e.g. to export existing stats."""
+        self._collectors.append(collector)
+
+    def collect(self) -> List[MetricFamily]:
+        families = []
+        for metric in self._metrics:
+            families.extend(metric.collect())
+        for collector in self._collectors:
+            try:
+                families.extend(collector())
+            except Exception as e:
+                print(f"Warning: Metrics collector {getattr(collector, '__name__', collector)} failed: {e}")
+        return families
+
+    def render(self) -> str:
+        """All metrics in the Prometheus text exposition format (0.0.4)."""
+        lines = []
+        for name, kind, help, samples in self.collect():
+            lines.append(f"# HELP {name} {help}")
+            lines.append(f"# TYPE {name} {kind}")
+            for sample in samples:
+                labels, value = sample[0], sample[1]
+                suffix = sample[2] if len(sample) > 2 else ''
+                lines.append(f"{name}{suffix}{_format_labels(labels)} {_format_value(value)}")
+        return '\n'.join(lines) + '\n'
+
+
+registry = MetricsRegistry()
+
+http_request_seconds = registry.register(Histogram(
+    'http_request_duration_seconds', 'HTTP request latency by route template and status',
+    ['method', 'route', 'status']
+))
+recommendation_stage_seconds = registry.register(Histogram(
+    'recommendation_stage_duration_seconds',
+    'Time spent per recommendation stage (sql, candidates, retrieve_<source>, genre_boost, scoring, sorting, '
+    'serialization) per scoring pass; a micro-batch of users is one pass',
+    ['stage']
+))
+recommendation_results = registry.register(Counter(
+    'recommendation_results_total', 'Recommendation lists by where they came from '
+    '(cache hits are counted in recommendation_cache_lookups_total)', ['source']
+))
+recommendation_fallbacks = registry.register(Counter(
+    'recommendation_fallbacks_total', 'Requests answered with popular movies instead', ['reason']
+))
+recommendation_prediction_failures = registry.register(Counter(
+    'recommendation_prediction_failures_total',
+    'Predictions made without factors, from the global mean and biases only', ['reason']
+))
+recommendation_errors = registry.register(Counter(
+    'recommendation_errors_total', 'Failures while building recommendations', ['stage']
+))
+
+
+class MetricsMiddleware:
+    """
+    ASGI middleware timing every HTTP request into ``http_request_seconds``.
+
+    Requests are labelled with the route template (``/api/v1/movies/{movie_id}``)
+    rather than the raw path, so series stay few however many ids are requested.
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope['type'] != 'http':
+            await self.app(scope, receive, send)
+            return
+        start = time.perf_counter()
+        status = 500
+
+        async def send_with_status(message):
+            nonlocal status
+            if message['type'] == 'http.response.start':
+                status = message['status']
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_with_status)
+        finally:
+            http_request_seconds.observe(
+                time.perf_counter() - start,
+                method=scope['method'], route=_route_template(scope), status=status
+            )
+
+
+def _route_template(scope) -> str:
+    path = getattr(scope.get('route'), 'path', None)
+    if path is not None:
+        # Routes of an included router may carry their path relative to its
+        # prefix; take the prefix from the request path
+        depth = path.count('/')
+        return scope['path'].rsplit('/', depth)[0] + path
+    # Older Starlette does not put the matched route in the scope
+    from starlette.routing import Match
+    app = scope.get('app')
+    for candidate in getattr(app, 'routes', ()):
+        match, _ = candidate.matches(scope)
+        if match == Match.FULL:
+            return getattr(candidate, 'path', 'unmatched')
+    return 'unmatched'
+
+
+def render_metrics() -> str:
+    """Prometheus text of every registered metric and collector."""
+    return registry.render()
@@ -0,0 +1,227 @@
+"""Pickle-free, memory-mappable model artifacts."""
+import json
+import os
+import pickle
+import time
+import numpy as np
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Dict, Optional, Sequence, Tuple
+import sys
+
+# Add parent directory to path
+sys.path.append(str(Path(__file__).parent.parent.parent))
+
+from app.ml.scoring import FactorScorer
+
+ARTIFACT_FORMAT = 'svd-factors/1'
+LATEST_POINTER = 'LATEST'
+
+# Arrays stored in every artifact, one .npy file each
+ARRAY_FILES = (
+    'pu', 'qi', 'bu', 'bi',
+    'user_ids', 'item_ids', 'user_order', 'item_order',
+    'item_vectors',
+)
+
+
+def write_latest_pointer(version_dir: Path):
+    """Point ``<parent>/LATEST`` at a version directory, atomically."""
+    version_dir = Path(version_dir)
+    tmp = version_dir.parent / f"{LATEST_POINTER}.tmp"
+    tmp.write_text(version_dir.name)
+    os.replace(tmp, version_dir.parent / LATEST_POINTER)
+
+
+def read_latest_pointer(root: Path) -> Optional[Path]:
+    """Version directory ``<root>/LATEST`` points to, or None."""
+    pointer = Path(root) / LATEST_POINTER
+    if not pointer.exists():
+        return None
+    version_dir = Path(root) / pointer.read_text().strip()
+    if not (version_dir / 'manifest.json').exists():
+        return None
+    return version_dir
+
+
+def normalized_item_vectors(qi: np.ndarray) -> np.ndarray:
+    """L2-normalized float32 copy of the item factors (zero rows left as is)."""
+    norms = np.linalg.norm(qi, axis=1, keepdims=True)
+    norms[norms == 0] = 1.0
+    return np.ascontiguousarray(qi / norms, dtype=np.float32)
+
+
+def save_model_artifact(output_dir: Path, global_mean: float, bu: np.ndarray, bi: np.ndarray,
+                        pu: np.ndarray, qi: np.ndarray, user_ids: Sequence, item_ids: Sequence,
+                        rating_scale: Tuple[float, float] = (1, 5),
+                        metadata: Optional[Dict] = None) -> Path:
+    """
+    Write factor matrices, biases and id maps as a new artifact version.
+
+    Each array is a plain ``.npy`` file so it can be memory-mapped; a small
+    ``manifest.json`` holds the scalars. Versions are never overwritten in
+    place (workers may still have the previous one mapped): a new directory
+    is written and ``LATEST`` is switched to it once complete.
+
+    Args:
+        output_dir: Root directory holding artifact versions
+        global_mean: Mean of all training ratings
+        bu, bi: User and item biases
+        pu, qi: User and item factor matrices
+        user_ids, item_ids: Raw ids in inner id order
+        rating_scale: (min, max) rating
+        metadata: Extra fields recorded in the manifest
+
+    Returns:
+        Path of the new version directory
+    """
+    version = datetime.now(timezone.utc).strftime('%Y%m%dT%H%M%S%f')
+    version_dir = Path(output_dir) / version
+    version_dir.mkdir(parents=True, exist_ok=False)
+
+    user_ids = np.asarray(user_ids, dtype=np.int64)
+    item_ids = np.asarray(item_ids, dtype=np.int64)
+    qi = np.ascontiguousarray(qi, dtype=np.float64)
+
+    arrays = {
+        'pu': np.ascontiguousarray(pu, dtype=np.float64),
+        'qi': qi,
+        'bu': np.asarray(bu, dtype=np.float64),
+        'bi': np.asarray(bi, dtype=np.float64),
+        'user_ids': user_ids,
+        'item_ids': item_ids,
+        'user_order': np.argsort(user_ids, kind='stable'),
+        'item_order': np.argsort(item_ids, kind='stable'),
+        'item_vectors': normalized_item_vectors(qi),
+    }
+    for name in ARRAY_FILES:
+        np.save(version_dir / f"{name}.npy", arrays[name])
+
+    manifest = {
+        'format': ARTIFACT_FORMAT,
+        'version': version,
+        'created_at': datetime.now(timezone.utc).isoformat(),
+        'global_mean': float(global_mean),
+        'rating_scale': [float(rating_scale[0]), float(rating_scale[1])],
+        'n_users': len(user_ids),
+        'n_items': len(item_ids),
+        'n_factors': int(qi.shape[1]) if qi.ndim == 2 else 0,
+        **(metadata or {})
+    }
+    with open(version_dir / 'manifest.json', 'w') as f:
+        json.dump(manifest, f, indent=2)
+
+    write_latest_pointer(version_dir)
+    return version_dir
+
+
+def save_scorer(scorer: FactorScorer, output_dir: Path, metadata: Optional[Dict] = None) -> Path:
+    """Write the factors held by a ``FactorScorer`` as an artifact version."""
+    return save_model_artifact(
+        output_dir,
+        global_mean=scorer.global_mean,
+        bu=scorer.bu, bi=scorer.bi, pu=scorer.pu, qi=scorer.qi,
+        user_ids=scorer.user_ids, item_ids=scorer.item_ids,
+        rating_scale=scorer.rating_scale,
+        metadata=metadata
+    )
+
+
+def export_svd(algo, output_dir: Path, metadata: Optional[Dict] = None) -> Path:
+    """Export a fitted ``surprise.SVD`` as an artifact version."""
+    return save_scorer(FactorScorer.from_svd(algo), output_dir,
+                       metadata={'trainer': 'surprise-svd', **(metadata or {})})
+
+
+def load_model_artifact(version_dir: Path, mmap: bool = True) -> Tuple[FactorScorer, Dict]:
+    """
+    Open an artifact version.
+
+    With ``mmap`` the arrays are memory-mapped read-only: nothing is copied
+    at load time and every process mapping the same files shares one copy
+    in the OS page cache.
+
+    Args:
+        version_dir: Artifact version directory
+        mmap: Memory-map arrays instead of reading them into memory
+
+    Returns:
+        (scorer, manifest)
+    """
+    version_dir = Path(version_dir)
+    with open(version_dir / 'manifest.json') as f:
+        manifest = json.load(f)
+    if manifest.get('format') != ARTIFACT_FORMAT:
+        raise ValueError(f"Unsupported model artifact format: {manifest.get('format')}")
+
+    mmap_mode = 'r' if mmap else None
+    arrays = {name: np.load(version_dir / f"{name}.npy", mmap_mode=mmap_mode) for name in ARRAY_FILES}
+    scorer = FactorScorer(
+        global_mean=manifest['global_mean'],
+        bu=arrays['bu'], bi=arrays['bi'], pu=arrays['pu'], qi=arrays['qi'],
+        user_ids=arrays['user_ids'], item_ids=arrays['item_ids'],
+        rating_scale=tuple(manifest['rating_scale']),
+        user_order=arrays['user_order'], item_order=arrays['item_order'],
+        item_vectors=arrays['item_vectors']
+    )
+    return scorer, manifest
+
+
+def load_scorer(artifact_dir: Path, model_path: Optional[Path] = None) -> Tuple[FactorScorer, Dict]:
+    """
+    Load the latest artifact, falling back to a pickled Surprise model.
+
+    Args:
+        artifact_dir: Root directory holding artifact versions
+        model_path: Pickled ``surprise.SVD`` used when no artifact exists
+
+    Returns:
+        (scorer, info) where info has the source, version, load time and RSS
+    """
+    start = time.perf_counter()
+    version_dir = read_latest_pointer(artifact_dir)
+    if version_dir is not None:
+        scorer, manifest = load_model_artifact(version_dir)
+        info = {'source': 'artifact', 'path': str(version_dir), 'version': manifest['version']}
+    elif model_path is not None and Path(model_path).exists():
+        with open(model_path, 'rb') as f:
+            scorer = FactorScorer.from_svd(pickle.load(f))
+        version = datetime.fromtimestamp(Path(model_path).stat().st_mtime, timezone.utc)
+        info = {'source': 'pickle', 'path': str(model_path), 'version': version.strftime('%Y%m%dT%H%M%S')}
+    else:
+        raise FileNotFoundError(
+            f"No model artifact in {artifact_dir} or model at {model_path}. "
+            "Please run 'python app/ml/train_model.py' first."
+        )
+    info['load_ms'] = round((time.perf_counter() - start) * 1000, 2)
+    info['rss_mb'] = current_rss_mb()
+    return scorer, info
+
+
+def current_rss_mb() -> float:
+    """Resident set size of this process in MB."""
+    try:
+        with open('/proc/self/statm') as f:
+            resident_pages = int(f.read().split()[1])
+        return round(resident_pages * os.sysconf('SC_PAGE_SIZE') / 1024 / 1024, 1)
+    except (OSError, ValueError, IndexError):
+        import resource
+        # ru_maxrss is the peak, in KB on Linux
+        return round(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024, 1)
+
+
+if __name__ == "__main__":
+    # Convert an existing pickled model into the artifact format
+    base_dir = Path(__file__).parent.parent.parent
+    model_path = base_dir / 'data' / 'trained_model.pkl'
+    if not model_path.exists():
+        print(f"❌ Error: Model not found at {model_path}")
+        sys.exit(1)
+
+    with open(model_path, 'rb') as f:
+        algo = pickle.load(f)
+    version_dir = export_svd(algo, base_dir / 'data' / 'model', metadata={'exported_from': model_path.name})
+    print(f"✓ Exported model artifact to {version_dir}")
+
+    scorer, info = load_scorer(base_dir / 'data' / 'model')
+    print(f"✓ Loaded {info['version']} in {info['load_ms']} ms (RSS {info['rss_mb']} MB)")
@@ -0,0 +1,171 @@
+"""Coalesces concurrent recommendation requests into batched scoring passes."""
+import asyncio
+import time
+from collections import deque
+from typing import Callable, Dict, List, Optional, Tuple
+import numpy as np
+from app.concurrency import run_model
+from app.config import settings
+from app.ml.recommender import get_recommender
+
+BatchHandler = Callable[[List[Tuple[int, int]]], List[List[Dict]]]
+Lookup = Callable[[int, int], Optional[List[Dict]]]
+
+
+class RecommendationBatcher:
+    """
+    Micro-batching scheduler in front of the recommendation engine.
+
+    Requests arriving within ``window_ms`` of the first one in a batch, or
+    until ``max_batch_size`` requests are waiting, are handed to the engine
+    together and scored with one user-matrix x item-matrix product on the
+    model executor. Each caller gets its own top N back.
+
+    Requests are queued on the event loop after a non-blocking ``lookup``
+    (the engine's cache), so only cache misses wait for a window. A window
+    of 0 or a batch size of 1 sends every miss on its own.
+    """
+
+    def __init__(self, handler: BatchHandler, lookup: Optional[Lookup] = None,
+                 window_ms: float = 3.0, max_batch_size: int = 32, delay_samples: int = 10000):
+        """
+        Initialize batcher.
+
+        Args:
+            handler: Blocking function mapping (user_id, n) pairs to results
+            lookup: Fast in-memory lookup tried first, returning None on a miss
+            window_ms: Longest time a request waits for others to join its batch
+            max_batch_size: Batch size that triggers scoring without waiting
+            delay_samples: Recent queueing delays kept for the percentiles
+        """
+        self.handler = handler
+        self.lookup = lookup
+        self.window_ms = window_ms
+        self.max_batch_size = max_batch_size
+        self._pending: List[Tuple[int, int, asyncio.Future, float]] = []
+        self._timer: Optional[asyncio.TimerHandle] = None
+        self._delays_ms = deque(maxlen=delay_samples)
+        self.reset_stats()
+
+    @property
+    def enabled(self) -> bool:
+        return self.window_ms > 0 and self.max_batch_size > 1
+
+    async def submit(self, user_id: int, n: int) -> List[Dict]:
+        """
+        Queue a request and wait for its batch to be scored.
+
+        Args:
+            user_id: User ID
+            n: Number of recommendations
+
+        Returns:
+            The user's recommendations
+        """
+        if self.lookup is not None:
+            result = self.lookup(user_id, n)
+            if result is not None:
+                self.lookup_hits += 1
+                return result
+
+        self.requests += 1
+        if not self.enabled:
+            self._record([time.perf_counter()])
+            return (await run_model(self.handler, [(user_id, n)]))[0]
+
+        loop = asyncio.get_running_loop()
+        future = loop.create_future()
+        self._pending.append((user_id, n, future, time.perf_counter()))
+        if len(self._pending) >= self.max_batch_size:
+            self._flush()
+        elif self._timer is None:
+            self._timer = loop.call_later(self.window_ms / 1000, self._flush)
+        return await future
+
+    def _flush(self):
+        """Dispatch the waiting requests as one batch."""
+        if self._timer is not None:
+            self._timer.cancel()
+            self._timer = None
+        batch, self._pending = self._pending, []
+        if batch:
+            self._record([queued_at for _, _, _, queued_at in batch])
+            asyncio.ensure_future(self._run(batch))
+
+    async def _run(self, batch: List[Tuple[int, int, asyncio.Future, float]]):
+        try:
+            results = await run_model(self.handler, [(user_id, n) for user_id, n, _, _ in batch])
+        except Exception as e:
+            if len(batch) > 1:
+                # One bad request must not fail the others: score each on its own
+                self.split_batches += 1
+                await asyncio.gather(*(self._run([entry]) for entry in batch))
+                return
+            _, _, future, _ = batch[0]
+            if not future.done():
+                future.set_exception(e)
+            return
+        for (_, _, future, _), result in zip(batch, results):
+            if not future.done():
+                future.set_result(result)
+
+    def _record(self, queued_at: List[float]):
+        now = time.perf_counter()
+        self.batches += 1
+        self.batch_sizes[len(queued_at)] = self.batch_sizes.get(len(queued_at), 0) + 1
+        self._delays_ms.extend((now - t) * 1000 for t in queued_at)
+
+    def reset_stats(self):
+        """Zero the counters, batch-size distribution and delay samples."""
+        self.requests = 0
+        self.lookup_hits = 0
+        self.batches = 0
+        self.split_batches = 0  # Batches that failed and were retried request by request
+        self.batch_sizes: Dict[int, int] = {}  # batch size -> number of batches
+        self._delays_ms.clear()
+
+    def stats(self) -> Dict:
+        """Batch-size distribution and queueing delay (ms) before dispatch."""
+        delays = np.array(self._delays_ms) if self._delays_ms else np.zeros(1)
+        return {
+            'window_ms': self.window_ms,
+            'max_batch_size': self.max_batch_size,
+            'lookup_hits': self.lookup_hits,
+            'requests': self.requests,
+            'batches': self.batches,
+            'split_batches': self.split_batches,
+            'pending': len(self._pending),
+            'avg_batch_size': round(self.requests / self.batches, 2) if self.batches else 0.0,
+            'batch_sizes': dict(sorted(self.batch_sizes.items())),
+            'queue_delay_ms': {
+                'p50': round(float(np.percentile(delays, 50)), 3),
+                'p95': round(float(np.percentile(delays, 95)), 3),
+                'p99': round(float(np.percentile(delays, 99)), 3),
+                'max': round(float(delays.max()), 3)
+            }
+        }
+
+
+# Singleton instance
+_batcher_instance: Optional[RecommendationBatcher] = None
+
+
+def get_batcher() -> RecommendationBatcher:
+    """Get or create the batcher in front of the recommender."""
+    global _batcher_instance
+    if _batcher_instance is None:
+        recommender = get_recommender()
+        _batcher_instance = RecommendationBatcher(
+            lambda requests: recommender.get_recommendations_batch(requests, check_cache=False),
+            lookup=recommender.cache.get,
+            window_ms=settings.RECOMMENDATION_BATCH_WINDOW_MS,
+            max_batch_size=settings.RECOMMENDATION_BATCH_MAX_SIZE
+        )
+    return _batcher_instance
+
+
+def batcher_stats() -> Optional[Dict]:
+    """Stats of the batcher, or None if it has not been created yet."""
+    if _batcher_instance is None:
+        return None
+    return _batcher_instance.stats()
@@ -0,0 +1,238 @@
+"""Candidate generation: in-memory rating histories and unrated-movie masks."""
+import threading
+import time
+from collections import OrderedDict
+from typing import Dict, List, Optional, Sequence, Tuple
+import numpy as np
+from app.catalog import CatalogSnapshot
+from app.database import SQLitePool
+from app.ml.scoring import FactorScorer
+
+# Recent positive ratings (>= this, newest first) drive the genre boost
+POSITIVE_RATING = 4.0
+RECENT_POSITIVE_LIMIT = 5
+
+# Users per history query; keeps the IN list below SQLite's variable limit
+HISTORY_QUERY_BATCH = 500
+
+
+class UserHistory:
+    """
+    One user's ratings in compact form.
+
+    ``movie_ids`` is sorted (int32, 4 bytes per rating) with ``ratings``
+    aligned to it (float32), which is all candidate exclusion and fold-in
+    need; ``recent_positive`` keeps the few movies the genre boost looks at.
+    """
+
+    __slots__ = ('movie_ids', 'ratings', 'recent_positive', 'loaded_at')
+
+    def __init__(self, movie_ids: np.ndarray, ratings: np.ndarray, recent_positive: Tuple[int, ...]):
+        self.movie_ids = movie_ids
+        self.ratings = ratings
+        self.recent_positive = recent_positive
+        self.loaded_at = time.monotonic()
+
+    @classmethod
+    def from_rows(cls, rows: Sequence[Tuple]) -> 'UserHistory':
+        """
+        Build from (movie_id, rating) rows, newest first.
+
+        Rows must come ordered like ``ORDER BY timestamp DESC, rating_id DESC``.
+        """
+        recent_positive = []
+        for movie_id, rating in rows:
+            if len(recent_positive) == RECENT_POSITIVE_LIMIT:
+                break
+            if rating >= POSITIVE_RATING:
+                recent_positive.append(movie_id)
+        movie_ids = np.fromiter((row[0] for row in rows), dtype=np.int32, count=len(rows))
+        ratings = np.fromiter((row[1] for row in rows), dtype=np.float32, count=len(rows))
+        order = np.argsort(movie_ids, kind='stable')
+        return cls(movie_ids[order], ratings[order], tuple(recent_positive))
+
+    @property
+    def nbytes(self) -> int:
+        return self.movie_ids.nbytes + self.ratings.nbytes
+
+
+class UserHistoryStore:
+    """
+    Bounded LRU of user rating histories, loaded from SQLite on demand.
+
+    A scoring pass looks up all of its users at once: users already in
+    memory cost no query, and the rest are read with a single ``IN`` query,
+    so database work per request is constant however many movies a user
+    has rated. Rating writes drop the user's entry (``invalidate``);
+    entries also expire after ``ttl_seconds`` so writes made through other
+    workers are picked up, like the recommendation cache.
+    """
+
+    def __init__(self, pool: SQLitePool, max_users: int = 10000, ttl_seconds: float = 300):
+        """
+        Initialize store.
+
+        Args:
+            pool: SQLite pool to read ratings from
+            max_users: Maximum number of users kept in memory
+            ttl_seconds: Lifetime of an entry in seconds
+        """
+        self.pool = pool
+        self.max_users = max_users
+        self.ttl_seconds = ttl_seconds
+        self._entries: 'OrderedDict[int, UserHistory]' = OrderedDict()
+        self._lock = threading.Lock()
+        # Bumped by every invalidation; a load that overlapped one is not kept
+        self._epoch = 0
+        self.hits = 0
+        self.misses = 0
+        self.queries = 0
+        self.evictions = 0
+        self.invalidations = 0
+
+    def get_many(self, user_ids: Sequence[int]) -> Dict[int, UserHistory]:
+        """
+        Histories of several users, reading the missing ones in one query.
+
+        Args:
+            user_ids: Distinct user IDs
+
+        Returns:
+            user_id -> history (empty for users without ratings)
+        """
+        histories: Dict[int, UserHistory] = {}
+        missing: List[int] = []
+        now = time.monotonic()
+        with self._lock:
+            epoch = self._epoch
+            for user_id in user_ids:
+                entry = self._entries.get(user_id)
+                if entry is not None and now - entry.loaded_at <= self.ttl_seconds:
+                    self._entries.move_to_end(user_id)
+                    histories[user_id] = entry
+                    self.hits += 1
+                else:
+                    missing.append(user_id)
+                    self.misses += 1
+        if not missing:
+            return histories
+
+        loaded = self._load(missing)
+        histories.update(loaded)
+        with self._lock:
+            if self._epoch == epoch:
+                for user_id, history in loaded.items():
+                    self._entries[user_id] = history
+                    self._entries.move_to_end(user_id)
+                while len(self._entries) > self.max_users:
+                    self._entries.popitem(last=False)
+                    self.evictions += 1
+        return histories
+
+    def _load(self, user_ids: List[int]) -> Dict[int, UserHistory]:
+        rows_by_user: Dict[int, List[Tuple]] = {user_id: [] for user_id in user_ids}
+        for start in range(0, len(user_ids), HISTORY_QUERY_BATCH):
+            chunk = user_ids[start:start + HISTORY_QUERY_BATCH]
+            rows = self.pool.fetchall(
+                'user_histories',
+                f"SELECT user_id, movie_id, rating FROM ratings "
+                f"WHERE user_id IN ({','.join('?' * len(chunk))}) "
+                f"ORDER BY user_id, timestamp DESC, rating_id DESC",
+                chunk
+            )
+            self.queries += 1
+            for user_id, movie_id, rating in rows:
+                rows_by_user[user_id].append((movie_id, rating))
+        return {user_id: UserHistory.from_rows(rows) for user_id, rows in rows_by_user.items()}
+
+    def invalidate(self, user_id: int):
+        """Drop a user's history, e.g. after they rated a movie."""
+        with self._lock:
+            self._epoch += 1
+            if self._entries.pop(user_id, None) is not None:
+                self.invalidations += 1
+
+    def clear(self):
+        """Drop every history."""
+        with self._lock:
+            self._epoch += 1
+            self._entries.clear()
+
+    def stats(self) -> Dict:
+        """Store size, memory and hit/miss counters."""
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                'users': len(self._entries),
+                'max_users': self.max_users,
+                'ratings': sum(len(entry.movie_ids) for entry in self._entries.values()),
+                'bytes': sum(entry.nbytes for entry in self._entries.values()),
+                'hits': self.hits,
+                'misses': self.misses,
+                'hit_rate': self.hits / lookups if lookups else 0.0,
+                'queries': self.queries,
+                'evictions': self.evictions,
+                'invalidations': self.invalidations
+            }
+
+
+class CandidateSpace:
+    """
+    The movies recommendations are drawn from, aligned with the factor matrix.
+
+    Built once per (catalog snapshot, model) pair: ``positions`` are the
+    catalog positions of displayable movies (the precomputed image filter),
+    ``movie_ids`` and ``inner_items`` their raw and model ids, and
+    ``column_of`` maps a catalog position to its column (-1 if filtered
+    out), so a user's rated movies become a vectorized column mask.
+    """
+
+    def __init__(self, snapshot: CatalogSnapshot, scorer: FactorScorer, require_image: bool = True):
+        self.snapshot = snapshot
+        self.scorer = scorer
+        self.positions = np.flatnonzero(snapshot.has_image) if require_image else np.arange(len(snapshot))
+        self.movie_ids = snapshot.movie_ids[self.positions]
+        self.inner_items = scorer.inner_item_ids(self.movie_ids)
+        self.column_of = np.full(len(snapshot), -1, dtype=np.int64)
+        self.column_of[self.positions] = np.arange(len(self.positions))
+
+    def __len__(self) -> int:
+        return len(self.positions)
+
+    def unrated_mask(self, histories: Sequence[UserHistory]) -> np.ndarray:
+        """
+        Which columns each user has not rated.
+
+        Returns:
+            (len(histories), len(self)) boolean mask, one row per user
+        """
+        mask = np.ones((len(histories), len(self.positions)), dtype=bool)
+        if not histories:
+            return mask
+        rows = np.repeat(np.arange(len(histories)), [len(history.movie_ids) for history in histories])
+        rated = np.concatenate([history.movie_ids for history in histories]).astype(np.int64)
+        positions = self.snapshot.positions(rated)
+        columns = np.where(positions >= 0, self.column_of[positions], -1)
+        keep = columns >= 0
+        mask[rows[keep], columns[keep]] = False
+        return mask
+
+
+class CandidateGenerator:
+    """Keeps the candidate space current and the user histories in memory."""
+
+    def __init__(self, histories: UserHistoryStore, require_image: bool = True):
+        self.histories = histories
+        self.require_image = require_image
+        self._space: Optional[CandidateSpace] = None
+        self._lock = threading.Lock()
+
+    def space(self, snapshot: CatalogSnapshot, scorer: FactorScorer) -> CandidateSpace:
+        """Candidate space of a snapshot and model, rebuilt when either changes."""
+        space = self._space
+        if space is None or space.snapshot is not snapshot or space.scorer is not scorer:
+            with self._lock:
+                space = self._space
+                if space is None or space.snapshot is not snapshot or space.scorer is not scorer:
+                    space = self._space = CandidateSpace(snapshot, scorer, self.require_image)
+        return space
@@ -0,0 +1,406 @@
+"""Native NumPy matrix factorization trainers (ALS and mini-batch SGD)."""
+import json
+import os
+import sqlite3
+import time
+import numpy as np
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Callable, Dict, Optional, Tuple
+
+from app.ml.scoring import FactorScorer
+
+# On-disk training matrix: one .npy per array, written by build_training_matrix
+MATRIX_FILES = ('user_idx', 'item_idx', 'ratings', 'user_ids', 'item_ids')
+RATING_ROW = np.dtype([('user_id', np.int32), ('movie_id', np.int32), ('rating', np.float32)])
+
+
+def _stream_ratings(db_path: Path, chunk_size: int,
+                    allocate: Callable[[int], Tuple[np.ndarray, np.ndarray, np.ndarray]]
+                    ) -> Tuple[np.ndarray, np.ndarray, np.ndarray, np.ndarray, np.ndarray]:
+    """
+    Read the ratings table in chunks into preallocated compact arrays.
+
+    Rows are fetched ``chunk_size`` at a time and converted straight to
+    int32/int32/float32, so no full-table list of tuples or float64 frame is
+    ever built. The raw ids are written first and the sorted id maps grow
+    chunk by chunk; a second pass over the arrays then replaces raw ids by
+    dense indices in place.
+
+    Args:
+        db_path: Path to SQLite database
+        chunk_size: Rows fetched per round trip
+        allocate: Returns (users, items, ratings) output arrays for n rows
+
+    Returns:
+        (user_idx, item_idx, ratings, user_ids, item_ids)
+    """
+    conn = sqlite3.connect(db_path)
+    try:
+        # One read transaction so the count and the rows see the same snapshot
+        conn.execute("BEGIN")
+        n_ratings = conn.execute("SELECT COUNT(*) FROM ratings").fetchone()[0]
+        users, items, ratings = allocate(n_ratings)
+        user_ids = np.empty(0, dtype=np.int64)
+        item_ids = np.empty(0, dtype=np.int64)
+
+        cursor = conn.execute("SELECT user_id, movie_id, rating FROM ratings")
+        filled = 0
+        while True:
+            rows = cursor.fetchmany(chunk_size)
+            if not rows:
+                break
+            chunk = np.fromiter(rows, dtype=RATING_ROW, count=len(rows))
+            end = filled + len(chunk)
+            users[filled:end] = chunk['user_id']
+            items[filled:end] = chunk['movie_id']
+            ratings[filled:end] = chunk['rating']
+            user_ids = np.union1d(user_ids, chunk['user_id'])
+            item_ids = np.union1d(item_ids, chunk['movie_id'])
+            filled = end
+        conn.execute("COMMIT")
+    finally:
+        conn.close()
+
+    for lo in range(0, filled, chunk_size):
+        hi = min(lo + chunk_size, filled)
+        users[lo:hi] = np.searchsorted(user_ids, users[lo:hi])
+        items[lo:hi] = np.searchsorted(item_ids, items[lo:hi])
+    return users, items, ratings, user_ids, item_ids
+
+
+def build_training_matrix(db_path: Path, output_dir: Path, chunk_size: int = 100_000) -> Path:
+    """
+    Stream the ratings table into a compact on-disk training matrix.
+
+    The output arrays are memory-mapped ``.npy`` files filled chunk by chunk,
+    so the process never holds more than one chunk plus the id maps; load
+    the result with ``RatingMatrix.load``. 12 bytes per rating on disk.
+
+    Args:
+        db_path: Path to SQLite database
+        output_dir: Directory to write the matrix to (replaced if present)
+        chunk_size: Rows read per chunk
+
+    Returns:
+        ``output_dir``
+    """
+    output_dir = Path(output_dir)
+    output_dir.mkdir(parents=True, exist_ok=True)
+
+    def allocate(n_ratings):
+        return tuple(
+            np.lib.format.open_memmap(output_dir / f"{name}.tmp.npy", mode='w+', dtype=dtype, shape=(n_ratings,))
+            for name, dtype in (('user_idx', np.int32), ('item_idx', np.int32), ('ratings', np.float32))
+        )
+
+    user_idx, item_idx, ratings, user_ids, item_ids = _stream_ratings(db_path, chunk_size, allocate)
+    n_ratings = len(ratings)
+    for array in (user_idx, item_idx, ratings):
+        array.flush()
+    del user_idx, item_idx, ratings
+    np.save(output_dir / 'user_ids.tmp.npy', user_ids)
+    np.save(output_dir / 'item_ids.tmp.npy', item_ids)
+
+    # Rename into place only once every array is complete
+    for name in MATRIX_FILES:
+        os.replace(output_dir / f"{name}.tmp.npy", output_dir / f"{name}.npy")
+    with open(output_dir / 'manifest.json', 'w') as f:
+        json.dump({
+            'created_at': datetime.now(timezone.utc).isoformat(),
+            'source': str(db_path),
+            'n_ratings': n_ratings,
+            'n_users': len(user_ids),
+            'n_items': len(item_ids),
+            'rating_scale': [1, 5]
+        }, f, indent=2)
+    return output_dir
+
+
+class RatingMatrix:
+    """
+    Ratings as coordinate arrays over dense user/item indices.
+
+    ``user_ids[u]`` / ``item_ids[i]`` give the raw ids of index ``u`` / ``i``.
+    CSR views grouped by user or by item are built on demand.
+    """
+
+    def __init__(self, user_idx: np.ndarray, item_idx: np.ndarray, ratings: np.ndarray,
+                 user_ids: np.ndarray, item_ids: np.ndarray,
+                 rating_scale: Tuple[float, float] = (1, 5)):
+        """
+        Initialize rating matrix.
+
+        Args:
+            user_idx: Dense user index per rating
+            item_idx: Dense item index per rating
+            ratings: Rating values
+            user_ids: Raw user id per dense user index
+            item_ids: Raw movie id per dense item index
+            rating_scale: (min, max) rating
+        """
+        self.user_idx = np.asarray(user_idx, dtype=np.int32)
+        self.item_idx = np.asarray(item_idx, dtype=np.int32)
+        self.ratings = np.asarray(ratings, dtype=np.float32)
+        self.user_ids = np.asarray(user_ids)
+        self.item_ids = np.asarray(item_ids)
+        self.rating_scale = rating_scale
+
+    @classmethod
+    def from_database(cls, db_path: Path, chunk_size: int = 100_000) -> 'RatingMatrix':
+        """Load every rating from the ratings table, streaming it in chunks."""
+        def allocate(n_ratings):
+            return (np.empty(n_ratings, dtype=np.int32), np.empty(n_ratings, dtype=np.int32),
+                    np.empty(n_ratings, dtype=np.float32))
+        return cls(*_stream_ratings(db_path, chunk_size, allocate))
+
+    @classmethod
+    def load(cls, path: Path, mmap: bool = True) -> 'RatingMatrix':
+        """Open a matrix written by ``build_training_matrix``, memory-mapped by default."""
+        path = Path(path)
+        with open(path / 'manifest.json') as f:
+            manifest = json.load(f)
+        mmap_mode = 'r' if mmap else None
+        arrays = {name: np.load(path / f"{name}.npy", mmap_mode=mmap_mode) for name in MATRIX_FILES}
+        return cls(arrays['user_idx'], arrays['item_idx'], arrays['ratings'],
+                   arrays['user_ids'], arrays['item_ids'], tuple(manifest['rating_scale']))
+
+    @property
+    def n_users(self) -> int:
+        return len(self.user_ids)
+
+    @property
+    def n_items(self) -> int:
+        return len(self.item_ids)
+
+    @property
+    def n_ratings(self) -> int:
+        return len(self.ratings)
+
+    def subset(self, rows: np.ndarray) -> 'RatingMatrix':
+        """Ratings at ``rows``, keeping the full user/item index space."""
+        return RatingMatrix(
+            self.user_idx[rows], self.item_idx[rows], self.ratings[rows],
+            self.user_ids, self.item_ids, self.rating_scale
+        )
+
+    def train_test_split(self, test_size: float = 0.2,
+                         random_state: int = 42) -> Tuple['RatingMatrix', 'RatingMatrix']:
+        """Random split of the ratings into train and test matrices."""
+        rng = np.random.default_rng(random_state)
+        order = rng.permutation(self.n_ratings)
+        n_test = int(round(self.n_ratings * test_size))
+        return self.subset(np.sort(order[n_test:])), self.subset(np.sort(order[:n_test]))
+
+    def csr(self, by: str = 'user') -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+        """
+        Group ratings by user or by item.
+
+        Returns:
+            (indptr, indices, values): ratings of row ``r`` are
+            ``values[indptr[r]:indptr[r + 1]]`` for columns ``indices[...]``
+        """
+        rows, cols, n_rows = (
+            (self.user_idx, self.item_idx, self.n_users) if by == 'user'
+            else (self.item_idx, self.user_idx, self.n_items)
+        )
+        order = np.argsort(rows, kind='stable')
+        indptr = np.zeros(n_rows + 1, dtype=np.int64)
+        np.cumsum(np.bincount(rows, minlength=n_rows), out=indptr[1:])
+        return indptr, cols[order], self.ratings[order]
+
+
+def _solve_block(rows: range, indptr: np.ndarray, indices: np.ndarray, targets: np.ndarray,
+                 fixed_factors: np.ndarray, reg: float) -> np.ndarray:
+    """
+    Ridge solves for a block of rows against fixed factors of the other side.
+
+    Each row solves for [factors, bias] with a design of [fixed factors, 1]
+    and a penalty of ``reg`` times its rating count. The per-row systems are
+    stacked and solved in one batched call.
+
+    Returns:
+        (len(rows), n_factors + 1) solutions; rows without ratings stay zero
+    """
+    n_factors = fixed_factors.shape[1]
+    dtype = fixed_factors.dtype
+    grams = np.zeros((len(rows), n_factors + 1, n_factors + 1), dtype=dtype)
+    rhs = np.zeros((len(rows), n_factors + 1), dtype=dtype)
+    diagonal = np.diag_indices(n_factors + 1)
+    for pos, row in enumerate(rows):
+        start, end = indptr[row], indptr[row + 1]
+        if start == end:
+            grams[pos][diagonal] = 1.0
+            continue
+        factors = fixed_factors[indices[start:end]]
+        target = targets[start:end]
+        # Gram of the design [factors, 1] without materializing the ones column
+        gram = grams[pos]
+        gram[:n_factors, :n_factors] = factors.T @ factors
+        gram[:n_factors, n_factors] = gram[n_factors, :n_factors] = factors.sum(axis=0)
+        gram[n_factors, n_factors] = end - start
+        gram[diagonal] += reg * (end - start)
+        rhs[pos, :n_factors] = target @ factors
+        rhs[pos, n_factors] = target.sum()
+    return np.linalg.solve(grams, rhs[..., None])[..., 0]
+
+
+def train_als(matrix: RatingMatrix, n_factors: int = 100, n_epochs: int = 5,
+              reg: float = 0.05, block_size: int = 256, n_jobs: Optional[int] = None,
+              random_state: int = 42, verbose: bool = False) -> FactorScorer:
+    """
+    Biased matrix factorization by alternating least squares.
+
+    Alternates closed-form ridge solves of every user's (pu, bu) with items
+    fixed and every item's (qi, bi) with users fixed. Rows are solved in
+    blocks of ``block_size`` spread over ``n_jobs`` threads; NumPy releases
+    the GIL inside the matrix products and batched solves, so blocks run on
+    separate cores. Solves run in float32; the result is stored as float64.
+
+    Args:
+        matrix: Training ratings
+        n_factors: Number of latent factors
+        n_epochs: Number of user+item sweeps
+        reg: Regularization per rating (weighted-lambda)
+        block_size: Rows per batched solve
+        n_jobs: Worker threads (defaults to CPU count)
+        random_state: Seed for the initial item factors
+        verbose: Print the epoch timings
+
+    Returns:
+        Trained model as a FactorScorer
+    """
+    rng = np.random.default_rng(random_state)
+    global_mean = float(matrix.ratings.mean(dtype=np.float64)) if matrix.n_ratings else 0.0
+    pu = np.zeros((matrix.n_users, n_factors), dtype=np.float32)
+    bu = np.zeros(matrix.n_users, dtype=np.float32)
+    qi = rng.normal(0, 0.1, (matrix.n_items, n_factors)).astype(np.float32)
+    bi = np.zeros(matrix.n_items, dtype=np.float32)
+
+    user_csr = matrix.csr('user')
+    item_csr = matrix.csr('item')
+    n_jobs = n_jobs or os.cpu_count() or 1
+
+    def sweep(csr, n_rows, other_factors, other_bias, out_factors, out_bias, pool):
+        indptr, indices, values = csr
+        targets = (values - np.float32(global_mean) - other_bias[indices]).astype(np.float32)
+        blocks = [range(lo, min(lo + block_size, n_rows)) for lo in range(0, n_rows, block_size)]
+        solutions = pool.map(
+            lambda rows: (rows, _solve_block(rows, indptr, indices, targets, other_factors, reg)),
+            blocks
+        )
+        for rows, solution in solutions:
+            out_factors[rows.start:rows.stop] = solution[:, :n_factors]
+            out_bias[rows.start:rows.stop] = solution[:, n_factors]
+
+    with ThreadPoolExecutor(max_workers=n_jobs) as pool:
+        for epoch in range(n_epochs):
+            start = time.perf_counter()
+            sweep(user_csr, matrix.n_users, qi, bi, pu, bu, pool)
+            sweep(item_csr, matrix.n_items, pu, bu, qi, bi, pool)
+            if verbose:
+                print(f"   epoch {epoch + 1}/{n_epochs} ({time.perf_counter() - start:.2f}s)")
+
+    return FactorScorer(global_mean, bu.astype(np.float64), bi.astype(np.float64),
+                        pu.astype(np.float64), qi.astype(np.float64),
+                        matrix.user_ids, matrix.item_ids, rating_scale=matrix.rating_scale)
+
+
+def _scatter_add(target: np.ndarray, unique: np.ndarray, inverse: np.ndarray, values: np.ndarray):
+    """
+    ``target[index] += values``, accumulating repeated indices.
+
+    Same result as ``np.add.at`` but several times faster: ``unique`` and
+    ``inverse`` come from ``np.unique(index, return_inverse=True)`` and the
+    repeated entries are summed with ``bincount`` over the compacted index.
+    """
+    if values.ndim == 1:
+        target[unique] += np.bincount(inverse, weights=values, minlength=len(unique))
+        return
+    width = values.shape[1]
+    flat = (inverse[:, None] * width + np.arange(width)).ravel()
+    sums = np.bincount(flat, weights=values.ravel(), minlength=len(unique) * width)
+    target[unique] += sums.reshape(len(unique), width)
+
+
+def train_sgd(matrix: RatingMatrix, n_factors: int = 100, n_epochs: int = 20,
+              lr: float = 0.005, reg: float = 0.02, batch_size: int = 512,
+              random_state: int = 42, verbose: bool = False) -> FactorScorer:
+    """
+    Biased matrix factorization by vectorized mini-batch SGD.
+
+    Minimizes the same objective as ``surprise.SVD`` (squared error plus
+    ``reg`` times the squared norms of bu, bi, pu, qi for every rating),
+    with the same initialization (factors ~ N(0, 0.1), zero biases). Each
+    mini-batch computes its errors at once and applies the summed updates,
+    which approximates Surprise's rating-by-rating loop.
+
+    Args:
+        matrix: Training ratings
+        n_factors: Number of latent factors
+        n_epochs: Number of passes over the ratings
+        lr: Learning rate
+        reg: Regularization
+        batch_size: Ratings per vectorized update
+        random_state: Seed for initialization and shuffling
+        verbose: Print the epoch timings
+
+    Returns:
+        Trained model as a FactorScorer
+    """
+    rng = np.random.default_rng(random_state)
+    global_mean = float(matrix.ratings.mean()) if matrix.n_ratings else 0.0
+    pu = rng.normal(0, 0.1, (matrix.n_users, n_factors))
+    qi = rng.normal(0, 0.1, (matrix.n_items, n_factors))
+    bu = np.zeros(matrix.n_users)
+    bi = np.zeros(matrix.n_items)
+    ratings = matrix.ratings.astype(np.float64)
+
+    for epoch in range(n_epochs):
+        start = time.perf_counter()
+        order = rng.permutation(matrix.n_ratings)
+        for lo in range(0, matrix.n_ratings, batch_size):
+            batch = order[lo:lo + batch_size]
+            users = matrix.user_idx[batch]
+            items = matrix.item_idx[batch]
+            p = pu[users]
+            q = qi[items]
+
+            err = ratings[batch] - (global_mean + bu[users] + bi[items] + np.einsum('ij,ij->i', p, q))
+            user_unique, user_inverse = np.unique(users, return_inverse=True)
+            item_unique, item_inverse = np.unique(items, return_inverse=True)
+            _scatter_add(bu, user_unique, user_inverse, lr * (err - reg * bu[users]))
+            _scatter_add(bi, item_unique, item_inverse, lr * (err - reg * bi[items]))
+            _scatter_add(pu, user_unique, user_inverse, lr * (err[:, None] * q - reg * p))
+            _scatter_add(qi, item_unique, item_inverse, lr * (err[:, None] * p - reg * q))
+        if verbose:
+            print(f"   epoch {epoch + 1}/{n_epochs} ({time.perf_counter() - start:.2f}s)")
+
+    # Users/items without training ratings are unknown to the model: keep
+    # only their (zero) biases, as SVD.predict does
+    pu[np.bincount(matrix.user_idx, minlength=matrix.n_users) == 0] = 0.0
+    qi[np.bincount(matrix.item_idx, minlength=matrix.n_items) == 0] = 0.0
+
+    return FactorScorer(global_mean, bu, bi, pu, qi, matrix.user_ids, matrix.item_ids,
+                        rating_scale=matrix.rating_scale)
+
+
+def evaluate(model: FactorScorer, matrix: RatingMatrix) -> Dict[str, float]:
+    """
+    RMSE and MAE of a model on a rating matrix.
+
+    ``matrix`` must share the model's user/item index space (e.g. come from
+    ``RatingMatrix.train_test_split``). Users or items without training
+    ratings fall back to the biases, like ``SVD.predict`` does.
+    """
+    users = matrix.user_idx
+    items = matrix.item_idx
+    est = (model.global_mean + model.bu[users] + model.bi[items]
+           + np.einsum('ij,ij->i', model.pu[users], model.qi[items]))
+    est = np.clip(est, *model.rating_scale)
+    err = est - matrix.ratings
+    return {
+        'rmse': float(np.sqrt(np.mean(err ** 2))) if len(err) else 0.0,
+        'mae': float(np.mean(np.abs(err))) if len(err) else 0.0
+    }
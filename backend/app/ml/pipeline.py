@@ -0,0 +1,243 @@
+"""Two-stage recommendation pipeline: retrieve a few hundred candidates, then re-rank them exactly."""
+import argparse
+import sys
+import time
+from pathlib import Path
+from typing import Callable, Dict, List, Optional, Sequence, Tuple
+import numpy as np
+
+# Add parent directory to path
+sys.path.append(str(Path(__file__).parent.parent.parent))
+
+from app.catalog import CatalogSnapshot
+from app.metrics import StageTimer, recommendation_stage_seconds
+from app.ml.candidates import CandidateSpace
+from app.ml.retrieval import FactorRetriever, Retriever, default_retrievers
+from app.ml.scoring import FactorScorer, top_n_rounded
+
+# Business rule over candidate positions: returns a mask of the ones to keep
+CandidateFilter = Callable[[CatalogSnapshot, np.ndarray], np.ndarray]
+
+PIPELINE_MODES = ('full', 'two_stage')
+
+
+class ReRanker:
+    """
+    Second stage: exact SVD scores, the genre boost and business filters.
+
+    Scores exactly as full scoring does (``FactorScorer.score_many`` plus
+    the capped genre boost, ranked by ``top_n_rounded``), so whenever the
+    retrieved candidates contain the full top N, the result is the same.
+    """
+
+    def __init__(self, filters: Sequence[CandidateFilter] = ()):
+        """
+        Initialize re-ranker.
+
+        Args:
+            filters: Rules a candidate must pass on top of the image filter
+                and the exclusion of rated movies (applied in retrieval)
+        """
+        self.filters = list(filters)
+
+    def rank(self, snapshot: CatalogSnapshot, space: CandidateSpace, scorer: FactorScorer, user_id: int,
+             columns: np.ndarray, genre_boost: Dict[str, float], n: int,
+             stages: StageTimer) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+        """
+        Top N of the retrieved candidates.
+
+        Args:
+            columns: Sorted candidate columns of ``space``
+
+        Returns:
+            (scored columns, top N catalog positions, their final scores)
+        """
+        positions = space.positions[columns]
+        if self.filters:
+            with stages.stage('filters'):
+                keep = np.ones(len(columns), dtype=bool)
+                for candidate_filter in self.filters:
+                    keep &= candidate_filter(snapshot, positions)
+                columns, positions = columns[keep], positions[keep]
+        if len(columns) == 0:
+            return columns, positions, np.zeros(0)
+        with stages.stage('scoring'):
+            base_scores = scorer.score_many([user_id], space.movie_ids[columns], space.inner_items[columns])[0]
+        with stages.stage('genre_boost'):
+            boost = snapshot.genre_boost(genre_boost, positions)
+        # Cap boost to avoid over-inflation
+        final_scores = np.minimum(5.0, base_scores + boost)
+        with stages.stage('sorting'):
+            top = top_n_rounded(final_scores, n)
+        return columns, positions[top], final_scores[top]
+
+
+class RecommendationPipeline:
+    """
+    Retrieval from several sources, then exact re-ranking of their union.
+
+    Every retriever is timed as its own stage (``retrieve_<name>``), so
+    the cost of each source shows up in ``/metrics`` next to the re-ranking
+    stages. Sources are pluggable: anything implementing ``Retriever``.
+    """
+
+    def __init__(self, retrievers: Sequence[Retriever], reranker: Optional[ReRanker] = None):
+        self.retrievers = list(retrievers)
+        self.reranker = reranker if reranker is not None else ReRanker()
+
+    def retrieve(self, snapshot: CatalogSnapshot, space: CandidateSpace, scorer: FactorScorer, user_id: int,
+                 allowed: np.ndarray, genre_boost: Dict[str, float], stages: StageTimer) -> np.ndarray:
+        """Union of every retriever's candidates, as sorted columns of ``space``."""
+        found = []
+        for retriever in self.retrievers:
+            with stages.stage(f'retrieve_{retriever.name}'):
+                found.append(retriever.retrieve(snapshot, space, scorer, user_id, allowed, genre_boost))
+        # Sorted like full scoring, so ties rank the same
+        return np.unique(np.concatenate(found)) if found else np.empty(0, dtype=np.int64)
+
+    def recommend(self, snapshot: CatalogSnapshot, space: CandidateSpace, scorer: FactorScorer, user_id: int,
+                  allowed: np.ndarray, genre_boost: Dict[str, float], n: int,
+                  stages: StageTimer) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+        """
+        Top N for one user.
+
+        Args:
+            allowed: Mask over ``space`` of the movies the user may get
+                (not rated)
+            genre_boost: Boost per genre from the user's recent ratings
+
+        Returns:
+            (scored columns, top N catalog positions, their final scores)
+        """
+        columns = self.retrieve(snapshot, space, scorer, user_id, allowed, genre_boost, stages)
+        return self.reranker.rank(snapshot, space, scorer, user_id, columns, genre_boost, n, stages)
+
+
+def build_pipeline(mode: str = 'full', n_candidates: int = 300) -> Optional[RecommendationPipeline]:
+    """
+    Pipeline for a ``RECOMMENDATION_PIPELINE`` mode.
+
+    Args:
+        mode: 'full' (score every candidate; no pipeline) or 'two_stage'
+        n_candidates: Candidates from the factor index (popular and
+            genre-seeded ones add up to a third more)
+
+    Returns:
+        The pipeline, or None for full scoring
+    """
+    if mode not in PIPELINE_MODES:
+        raise ValueError(f"Unknown recommendation pipeline '{mode}', expected one of {PIPELINE_MODES}")
+    if mode == 'full':
+        return None
+    return RecommendationPipeline(default_retrievers(n_candidates))
+
+
+def _percentiles(values_ms: List[float]) -> Dict[str, float]:
+    if not values_ms:
+        return {'p50_ms': 0.0, 'p95_ms': 0.0}
+    return {
+        'p50_ms': round(float(np.percentile(values_ms, 50)), 3),
+        'p95_ms': round(float(np.percentile(values_ms, 95)), 3)
+    }
+
+
+def evaluate_pipeline(recommender, pipeline: RecommendationPipeline, user_ids: Sequence[int],
+                      n: int = 10) -> Dict:
+    """
+    Recall and latency of a pipeline against full scoring.
+
+    Both run on the same model, catalog snapshot and user histories; the
+    full top N is the ground truth.
+
+    Args:
+        recommender: ``RecommendationEngine`` to take the model, catalog and histories from
+        pipeline: Pipeline to evaluate
+        user_ids: Users to evaluate on
+        n: Recommendations per user
+
+    Returns:
+        Mean candidate count, candidate recall@n (share of the full top N
+        among the retrieved candidates), recall@n of the final lists, and
+        latency percentiles per stage and end to end for both
+    """
+    model = recommender.model
+    snapshot = recommender.catalog.snapshot
+    space = recommender.candidates.space(snapshot, model.scorer)
+    if not user_ids:
+        return {
+            'users': 0, 'n': n, 'catalog_candidates': len(space), 'mean_candidates': 0.0,
+            'candidate_recall': 1.0, 'recall': 1.0, 'full': _percentiles([]), 'two_stage': _percentiles([]),
+            'stages': {}
+        }
+    histories = recommender.candidates.histories.get_many(list(user_ids))
+    # Build the factor indexes before timing
+    for retriever in pipeline.retrievers:
+        if isinstance(retriever, FactorRetriever):
+            retriever.index(model.scorer)
+
+    candidate_counts, candidate_recalls, recalls = [], [], []
+    full_ms, pipeline_ms = [], []
+    stage_ms: Dict[str, List[float]] = {}
+    for user_id in user_ids:
+        history = histories[user_id]
+        allowed = space.unrated_mask([history])[0]
+        genre_boost = recommender._genre_boost(snapshot, history.recent_positive)
+
+        # Timers only collect here; nothing is recorded to /metrics
+        start = time.perf_counter()
+        truth, _ = recommender._rank_all(model, snapshot, space, [user_id], [n], allowed[None], [genre_boost],
+                                         StageTimer(recommendation_stage_seconds))[0]
+        full_ms.append((time.perf_counter() - start) * 1000)
+
+        stages = StageTimer(recommendation_stage_seconds)
+        start = time.perf_counter()
+        columns, positions, _ = pipeline.recommend(snapshot, space, model.scorer, user_id, allowed,
+                                                   genre_boost, n, stages)
+        pipeline_ms.append((time.perf_counter() - start) * 1000)
+        for stage, seconds in stages.seconds.items():
+            stage_ms.setdefault(stage, []).append(seconds * 1000)
+
+        truth = set(truth.tolist())
+        candidate_counts.append(len(columns))
+        if truth:
+            candidate_recalls.append(len(truth & set(space.positions[columns].tolist())) / len(truth))
+            recalls.append(len(truth & set(positions.tolist())) / len(truth))
+
+    return {
+        'users': len(user_ids),
+        'n': n,
+        'catalog_candidates': len(space),
+        'mean_candidates': round(float(np.mean(candidate_counts)), 1) if candidate_counts else 0.0,
+        'candidate_recall': round(float(np.mean(candidate_recalls)), 4) if candidate_recalls else 1.0,
+        'recall': round(float(np.mean(recalls)), 4) if recalls else 1.0,
+        'full': _percentiles(full_ms),
+        'two_stage': _percentiles(pipeline_ms),
+        'stages': {stage: _percentiles(values) for stage, values in stage_ms.items()}
+    }
+
+
+if __name__ == "__main__":
+    from app.ml.recommender import get_recommender
+
+    parser = argparse.ArgumentParser(description="Recall and latency of two-stage recommendations vs full scoring")
+    parser.add_argument('--users', type=int, default=200, help="Users to evaluate on (spread over the model's users)")
+    parser.add_argument('--n', type=int, default=10, help="Recommendations per user")
+    parser.add_argument('--candidates', type=int, default=300, help="Candidates from the factor index")
+    args = parser.parse_args()
+
+    recommender = get_recommender()
+    scorer = recommender.scorer
+    users = scorer.user_ids[np.linspace(0, scorer.n_users - 1, min(args.users, scorer.n_users), dtype=int)]
+    pipeline = build_pipeline('two_stage', args.candidates)
+    report = evaluate_pipeline(recommender, pipeline, [int(user_id) for user_id in users], n=args.n)
+
+    print(f"🧭 Two-stage recommendations ({report['catalog_candidates']:,} candidate movies, "
+          f"{report['users']} users, top {report['n']})")
+    print("=" * 60)
+    print(f"Retrieved candidates: {report['mean_candidates']} per user")
+    print(f"Candidate recall@{args.n}: {report['candidate_recall']:.3f}")
+    print(f"Recall@{args.n}: {report['recall']:.3f}")
+    print(f"Full scoring: p50 {report['full']['p50_ms']} ms  p95 {report['full']['p95_ms']} ms")
+    print(f"Two-stage:    p50 {report['two_stage']['p50_ms']} ms  p95 {report['two_stage']['p95_ms']} ms")
+    for stage, stats in report['stages'].items():
+        print(f"   {stage:<18} p50 {stats['p50_ms']} ms  p95 {stats['p95_ms']} ms")
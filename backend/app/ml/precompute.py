@@ -0,0 +1,351 @@
+"""Offline batch job that materializes top-K recommendations for every user."""
+import argparse
+import json
+import os
+import sqlite3
+import time
+import numpy as np
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple
+import sys
+
+# Add parent directory to path
+sys.path.append(str(Path(__file__).parent.parent.parent))
+
+from app.ml.artifacts import load_scorer, read_latest_pointer, write_latest_pointer
+from app.ml.scoring import FactorScorer
+
+GENRE_BOOST = 0.2  # Per genre occurrence in a user's recent positive ratings
+RECENT_POSITIVE_RATINGS = 5
+
+
+def _latest_rating_version(conn: sqlite3.Connection) -> int:
+    """Highest per-user rating version (0 if the API has not created the version table yet)."""
+    try:
+        return conn.execute("SELECT COALESCE(MAX(version), 0) FROM user_rating_versions").fetchone()[0]
+    except sqlite3.OperationalError:
+        return 0
+
+
+def _load_inputs(conn: sqlite3.Connection, scorer: FactorScorer) -> Dict:
+    """
+    Read everything the scoring blocks need into compact arrays.
+
+    Candidate movies are the ones with an image, in movie_id order (the same
+    order the live query returns them in), with zero factors for movies the
+    model has never seen so they score like ``SVD.predict`` does.
+    """
+    movies = conn.execute(
+        "SELECT movie_id, genres FROM movies WHERE image_url IS NOT NULL ORDER BY movie_id"
+    ).fetchall()
+    movie_ids = np.array([row[0] for row in movies], dtype=np.int64)
+
+    inner_items = scorer.inner_item_ids(movie_ids)
+    known_items = inner_items >= 0
+    item_factors = np.zeros((len(movie_ids), scorer.qi.shape[1]))
+    item_factors[known_items] = scorer.qi[inner_items[known_items]]
+    item_bias = np.zeros(len(movie_ids))
+    item_bias[known_items] = scorer.bi[inner_items[known_items]]
+
+    # Genre incidence matrix (movies x genres), counting repeated tokens
+    vocabulary = {}
+    entries = []
+    for pos, (_, genres) in enumerate(movies):
+        if genres:
+            for genre in genres.split(','):
+                entries.append((pos, vocabulary.setdefault(genre.strip(), len(vocabulary))))
+    genre_matrix = np.zeros((len(movie_ids), max(len(vocabulary), 1)), dtype=np.float32)
+    for pos, genre in entries:
+        genre_matrix[pos, genre] += 1
+
+    user_ids = np.array(
+        [row[0] for row in conn.execute(
+            "SELECT user_id FROM users UNION SELECT DISTINCT user_id FROM ratings ORDER BY 1"
+        )],
+        dtype=np.int64
+    )
+    inner_users = np.array([
+        inner if inner is not None else -1
+        for inner in (scorer.inner_user_id(uid) for uid in user_ids.tolist())
+    ], dtype=np.int64)
+    known_users = inner_users >= 0
+    user_factors = np.zeros((len(user_ids), scorer.pu.shape[1]))
+    user_factors[known_users] = scorer.pu[inner_users[known_users]]
+    user_bias = np.zeros(len(user_ids))
+    user_bias[known_users] = scorer.bu[inner_users[known_users]]
+
+    # Rated candidate positions per user, as CSR
+    ratings = np.array(
+        conn.execute("SELECT user_id, movie_id FROM ratings").fetchall(), dtype=np.int64
+    ).reshape(-1, 2)
+    user_pos = np.searchsorted(user_ids, ratings[:, 0])
+    movie_pos = np.searchsorted(movie_ids, ratings[:, 1])
+    movie_pos = np.minimum(movie_pos, max(len(movie_ids) - 1, 0))
+    in_catalog = (movie_ids[movie_pos] == ratings[:, 1]) if len(movie_ids) else np.zeros(len(ratings), bool)
+    order = np.argsort(user_pos[in_catalog], kind='stable')
+    rated_indices = movie_pos[in_catalog][order]
+    rated_indptr = np.concatenate(([0], np.cumsum(np.bincount(user_pos[in_catalog], minlength=len(user_ids)))))
+
+    # Genre boost from each user's most recent positive ratings
+    user_genre_boost = np.zeros((len(user_ids), genre_matrix.shape[1]), dtype=np.float32)
+    recent = conn.execute(f"""
+        SELECT user_id, genres FROM (
+            SELECT r.user_id, m.genres,
+                   ROW_NUMBER() OVER (PARTITION BY r.user_id ORDER BY r.timestamp DESC) AS rn
+            FROM ratings r
+            JOIN movies m ON r.movie_id = m.movie_id
+            WHERE r.rating >= 4.0
+        ) WHERE rn <= {RECENT_POSITIVE_RATINGS}
+    """).fetchall()
+    for user_id, genres in recent:
+        if not genres:
+            continue
+        row = np.searchsorted(user_ids, user_id)
+        for genre in genres.split(','):
+            col = vocabulary.get(genre.strip())
+            if col is not None:
+                user_genre_boost[row, col] += GENRE_BOOST
+
+    return {
+        'global_mean': scorer.global_mean,
+        'rating_scale': scorer.rating_scale,
+        'movie_ids': movie_ids,
+        'item_factors': item_factors,
+        'item_bias': item_bias,
+        'genre_matrix': genre_matrix,
+        'user_ids': user_ids,
+        'user_factors': user_factors,
+        'user_bias': user_bias,
+        'user_genre_boost': user_genre_boost,
+        'rated_indptr': rated_indptr,
+        'rated_indices': rated_indices,
+    }
+
+
+_worker_inputs: Optional[Dict] = None
+
+
+def _init_worker(inputs: Dict):
+    """Process pool initializer: keep the inputs for every block of this worker."""
+    global _worker_inputs
+    _worker_inputs = inputs
+
+
+def _score_block(start: int, stop: int, top_k: int) -> Tuple[int, np.ndarray, np.ndarray]:
+    """
+    Score users ``start:stop`` against every candidate movie.
+
+    Returns:
+        (start, movie ids [users x top_k], scores [users x top_k]); rows with
+        fewer than ``top_k`` unrated candidates are padded with -1 / NaN
+    """
+    data = _worker_inputs
+    n_movies = len(data['movie_ids'])
+    n_block = stop - start
+    k = min(top_k, n_movies)
+
+    scores = data['user_factors'][start:stop] @ data['item_factors'].T
+    scores += data['item_bias'][None, :]
+    scores += (data['global_mean'] + data['user_bias'][start:stop])[:, None]
+    np.clip(scores, *data['rating_scale'], out=scores)
+    scores += data['user_genre_boost'][start:stop] @ data['genre_matrix'].T
+    np.minimum(scores, 5.0, out=scores)
+    scores = np.round(scores, 2)
+
+    indptr = data['rated_indptr']
+    for row in range(n_block):
+        rated = data['rated_indices'][indptr[start + row]:indptr[start + row + 1]]
+        scores[row, rated] = -np.inf
+
+    movie_out = np.full((n_block, top_k), -1, dtype=np.int32)
+    score_out = np.full((n_block, top_k), np.nan, dtype=np.float32)
+    if k == 0:
+        return start, movie_out, score_out
+
+    # Keep the k best per row; ties on the k-th score go to the lowest
+    # positions, matching the live path's stable sort
+    kth = -np.partition(-scores, k - 1, axis=1)[:, k - 1]
+    above = scores > kth[:, None]
+    tied = scores == kth[:, None]
+    room = k - above.sum(axis=1)
+    keep = above | (tied & (np.cumsum(tied, axis=1) <= room[:, None]))
+    rows, cols = np.nonzero(keep)
+    cols = cols.reshape(n_block, k)
+    picked = np.take_along_axis(scores, cols, axis=1)
+    order = np.argsort(-picked, axis=1, kind='stable')
+    cols = np.take_along_axis(cols, order, axis=1)
+    picked = np.take_along_axis(picked, order, axis=1)
+
+    valid = np.isfinite(picked)
+    movie_out[:, :k] = np.where(valid, data['movie_ids'][cols], -1)
+    score_out[:, :k] = np.where(valid, picked, np.nan)
+    return start, movie_out, score_out
+
+
+def precompute_recommendations(db_path='data/database.db', model_path='data/trained_model.pkl',
+                               artifact_dir='data/model', output_dir='data/precomputed', top_k: int = 50,
+                               block_size: int = 256, n_workers: Optional[int] = None):
+    """
+    Score every user against every movie and store each user's top K.
+
+    Users are processed in blocks of ``block_size`` rows, each block being a
+    single (users x factors) @ (factors x movies) product, spread over a
+    process pool. Results go to a new snapshot directory of ``.npy`` files
+    (memory-mapped by the API) and the ``LATEST`` pointer is switched to it
+    once complete.
+
+    Args:
+        db_path: Path to SQLite database
+        model_path: Path to pickled model, used when no artifact exists
+        artifact_dir: Directory of model artifacts
+        output_dir: Directory holding the snapshots
+        top_k: Recommendations kept per user
+        block_size: Users scored per matrix multiplication
+        n_workers: Worker processes (defaults to CPU count, 1 runs inline)
+
+    Returns:
+        Path of the written snapshot, or None on failure
+    """
+    print("🧮 Precomputing recommendations for all users...")
+    print("=" * 60)
+    base_dir = Path(__file__).parent.parent.parent
+    db_full_path = base_dir / db_path
+
+    if not db_full_path.exists():
+        print(f"❌ Error: Database not found at {db_full_path}")
+        return None
+
+    start_time = time.perf_counter()
+    try:
+        scorer, model_info = load_scorer(base_dir / artifact_dir, base_dir / model_path)
+    except FileNotFoundError as e:
+        print(f"❌ Error: {e}")
+        return None
+
+    conn = sqlite3.connect(db_full_path)
+    # Users whose ratings change after this version are stale in the snapshot
+    snapshot_rating_version = _latest_rating_version(conn)
+    inputs = _load_inputs(conn, scorer)
+    conn.close()
+
+    n_users = len(inputs['user_ids'])
+    print(f"\n1. Loaded {n_users:,} users x {len(inputs['movie_ids']):,} candidate movies "
+          f"({time.perf_counter() - start_time:.1f}s)")
+
+    snapshot_dir = base_dir / output_dir / datetime.now(timezone.utc).strftime('%Y%m%dT%H%M%S%f')
+    snapshot_dir.mkdir(parents=True, exist_ok=True)
+    np.save(snapshot_dir / 'user_ids.npy', inputs['user_ids'])
+    movie_out = np.lib.format.open_memmap(
+        snapshot_dir / 'movie_ids.npy', mode='w+', dtype=np.int32, shape=(n_users, top_k)
+    )
+    score_out = np.lib.format.open_memmap(
+        snapshot_dir / 'scores.npy', mode='w+', dtype=np.float32, shape=(n_users, top_k)
+    )
+
+    blocks = [(lo, min(lo + block_size, n_users)) for lo in range(0, n_users, block_size)]
+    n_workers = n_workers or os.cpu_count() or 1
+    print(f"\n2. Scoring {len(blocks)} blocks of {block_size} users on {n_workers} worker(s)...")
+    score_start = time.perf_counter()
+
+    if n_workers == 1:
+        _init_worker(inputs)
+        results = (_score_block(lo, hi, top_k) for lo, hi in blocks)
+        for lo, movies, scores in results:
+            movie_out[lo:lo + len(movies)] = movies
+            score_out[lo:lo + len(scores)] = scores
+    else:
+        with ProcessPoolExecutor(max_workers=n_workers, initializer=_init_worker,
+                                 initargs=(inputs,)) as pool:
+            futures = [pool.submit(_score_block, lo, hi, top_k) for lo, hi in blocks]
+            for future in futures:
+                lo, movies, scores = future.result()
+                movie_out[lo:lo + len(movies)] = movies
+                score_out[lo:lo + len(scores)] = scores
+
+    movie_out.flush()
+    score_out.flush()
+    del movie_out, score_out
+    print(f"   ✓ Scored in {time.perf_counter() - score_start:.1f}s")
+
+    manifest = {
+        'created_at': datetime.now(timezone.utc).isoformat(),
+        'snapshot_rating_version': int(snapshot_rating_version),
+        'top_k': top_k,
+        'n_users': n_users,
+        'n_movies': len(inputs['movie_ids']),
+        'model_version': model_info['version'],
+    }
+    with open(snapshot_dir / 'manifest.json', 'w') as f:
+        json.dump(manifest, f, indent=2)
+
+    # Switch readers to the new snapshot atomically
+    write_latest_pointer(snapshot_dir)
+
+    print(f"\n3. Saved snapshot to {snapshot_dir}")
+    print("\n" + "=" * 60)
+    print(f"✅ Precompute complete in {time.perf_counter() - start_time:.1f}s")
+    print("=" * 60)
+    return snapshot_dir
+
+
+class PrecomputedRecommendations:
+    """Read side of a precompute snapshot, memory-mapped from disk."""
+
+    def __init__(self, snapshot_dir: Path):
+        """
+        Open a snapshot.
+
+        Args:
+            snapshot_dir: Directory written by ``precompute_recommendations``
+        """
+        self.snapshot_dir = Path(snapshot_dir)
+        with open(self.snapshot_dir / 'manifest.json') as f:
+            self.manifest = json.load(f)
+        # Snapshots from before versions were kept count every changed user as stale
+        self.snapshot_rating_version = self.manifest.get('snapshot_rating_version', 0)
+        self.top_k = self.manifest['top_k']
+        self.user_ids = np.load(self.snapshot_dir / 'user_ids.npy')
+        self.movie_ids = np.load(self.snapshot_dir / 'movie_ids.npy', mmap_mode='r')
+        self.scores = np.load(self.snapshot_dir / 'scores.npy', mmap_mode='r')
+
+    @classmethod
+    def load_latest(cls, output_dir: Path) -> Optional['PrecomputedRecommendations']:
+        """Open the snapshot ``LATEST`` points to, or None if there is none."""
+        snapshot_dir = read_latest_pointer(output_dir)
+        return cls(snapshot_dir) if snapshot_dir is not None else None
+
+    def lookup(self, user_id: int, n: int) -> Optional[List[Tuple[int, float]]]:
+        """
+        Precomputed (movie_id, predicted rating) pairs for a user.
+
+        Returns:
+            Up to ``n`` pairs, best first, or None when the user is not in
+            the snapshot or ``n`` exceeds what was stored
+        """
+        pos = int(np.searchsorted(self.user_ids, user_id))
+        if pos >= len(self.user_ids) or self.user_ids[pos] != user_id:
+            return None
+        movies = self.movie_ids[pos]
+        valid = int((movies >= 0).sum())
+        # A short row means the user ran out of candidates, which answers any n
+        if n > self.top_k and valid == self.top_k:
+            return None
+        return [
+            (int(movies[i]), round(float(self.scores[pos, i]), 2))
+            for i in range(min(n, valid))
+        ]
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--top-k', type=int, default=50, help='Recommendations kept per user')
+    parser.add_argument('--block-size', type=int, default=256, help='Users per matrix multiplication')
+    parser.add_argument('--workers', type=int, default=None, help='Worker processes (default: CPU count)')
+    args = parser.parse_args()
+
+    snapshot = precompute_recommendations(
+        top_k=args.top_k, block_size=args.block_size, n_workers=args.workers
+    )
+    sys.exit(0 if snapshot is not None else 1)
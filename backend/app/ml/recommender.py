@@ -1,41 +1,181 @@
 """Recommendation engine using trained SVD model."""
-import pickle
 import sqlite3
-import pandas as pd
+import threading
+import time
 import numpy as np
+from collections import OrderedDict
 from pathlib import Path
-from typing import List, Dict, Optional
+from typing import List, Dict, Optional, Sequence, Tuple
+from app.catalog import CatalogStore, get_catalog
+from app.config import settings
+from app.database import SQLitePool
+from app.metrics import (
+    StageTimer, recommendation_errors, recommendation_prediction_failures,
+    recommendation_results, recommendation_stage_seconds, registry as metrics_registry
+)
+from app.ml.candidates import CandidateGenerator, UserHistoryStore
+from app.ml.pipeline import RecommendationPipeline, build_pipeline
+from app.ml.registry import ModelRegistry, ModelVersion
+from app.ml.scoring import FactorScorer, top_n_rounded
+from app.ml.similarity import SimilarityIndex
+
+
+class RecommendationCache:
+    """
+    Bounded per-user cache of top-N recommendation lists.
+    
+    Entries are evicted least-recently-used once ``max_size`` users are
+    cached, and expire after ``ttl_seconds`` so changes made through other
+    workers are eventually picked up.
+    """
+    
+    def __init__(self, max_size: int = 10000, ttl_seconds: float = 300):
+        """
+        Initialize cache.
+        
+        Args:
+            max_size: Maximum number of users kept in memory
+            ttl_seconds: Lifetime of an entry in seconds
+        """
+        self.max_size = max_size
+        self.ttl_seconds = ttl_seconds
+        self._entries = OrderedDict()  # user_id -> (created_at, n, recommendations)
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.invalidations = 0
+    
+    def get(self, user_id: int, n: int) -> Optional[List[Dict]]:
+        """Return cached top-N for a user, or None on a miss."""
+        with self._lock:
+            entry = self._entries.get(user_id)
+            if entry is not None:
+                created_at, cached_n, recommendations = entry
+                if time.monotonic() - created_at > self.ttl_seconds:
+                    del self._entries[user_id]
+                    self.evictions += 1
+                    entry = None
+                # A shorter list than requested means the catalog ran out,
+                # so it also answers any larger N
+                elif n <= cached_n or len(recommendations) < cached_n:
+                    self._entries.move_to_end(user_id)
+                    self.hits += 1
+                    return recommendations[:n]
+            self.misses += 1
+            return None
+    
+    def put(self, user_id: int, n: int, recommendations: List[Dict]):
+        """Store the top-N computed for a user."""
+        with self._lock:
+            self._entries[user_id] = (time.monotonic(), n, recommendations)
+            self._entries.move_to_end(user_id)
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+    
+    def invalidate(self, user_id: int):
+        """Drop a user's entry, e.g. after they rated a movie."""
+        with self._lock:
+            if self._entries.pop(user_id, None) is not None:
+                self.invalidations += 1
+    
+    def clear(self):
+        """Drop every entry."""
+        with self._lock:
+            self._entries.clear()
+    
+    def stats(self) -> Dict:
+        """Cache size and hit/miss counters."""
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                'size': len(self._entries),
+                'max_size': self.max_size,
+                'hits': self.hits,
+                'misses': self.misses,
+                'hit_rate': self.hits / lookups if lookups else 0.0,
+                'evictions': self.evictions,
+                'invalidations': self.invalidations
+            }
 
 
 class RecommendationEngine:
     """Handles movie recommendations using trained SVD model."""
     
-    def __init__(self, model_path='data/trained_model.pkl', db_path='data/database.db'):
+    def __init__(self, model_path='data/trained_model.pkl', db_path='data/database.db',
+                 similarity_mode='exact', cache_size=10000, cache_ttl=300,
+                 precomputed_dir='data/precomputed', artifact_dir='data/model',
+                 online_fold_in=True, fold_in_reg=0.02, fold_in_max_users=10000, pool_size=8,
+                 catalog: Optional[CatalogStore] = None, watch_seconds=0,
+                 history_size=10000, history_ttl=300,
+                 pipeline: Optional[RecommendationPipeline] = None):
         """
         Initialize recommendation engine.
         
+        The model itself is loaded lazily, on first use.
+        
         Args:
-            model_path: Path to trained model file
+            model_path: Path to pickled model, used when no artifact exists
             db_path: Path to SQLite database
+            similarity_mode: Similar-movie index mode ('exact' or 'lsh')
+            cache_size: Maximum number of users in the recommendation cache
+            cache_ttl: Lifetime of cached recommendations in seconds
+            precomputed_dir: Directory of batch-precomputed recommendation snapshots
+            artifact_dir: Directory of memory-mapped model artifacts
+            online_fold_in: Re-estimate user factors from new ratings without retraining
+            fold_in_reg: Regularization of the fold-in least-squares solve
+            fold_in_max_users: Most users with folded-in factors kept per model
+            pool_size: Maximum number of pooled SQLite connections
+            catalog: Shared movie catalog (defaults to one read from ``db_path``)
+            watch_seconds: Poll interval for new model versions once
+                ``registry.start_watcher()`` is called
+            history_size: Maximum number of users whose ratings are kept in memory
+            history_ttl: Lifetime of a user's in-memory ratings in seconds
+            pipeline: Two-stage retrieval and re-ranking pipeline; None scores
+                every candidate movie
         """
         self.base_dir = Path(__file__).parent.parent.parent
         self.model_path = self.base_dir / model_path
+        self.artifact_dir = self.base_dir / artifact_dir
         self.db_path = self.base_dir / db_path
-        self.model = self._load_model()
-        
-    def _load_model(self):
-        """Load the trained SVD model."""
-        if not self.model_path.exists():
-            raise FileNotFoundError(
-                f"Model not found at {self.model_path}. "
-                "Please run 'python app/ml/train_model.py' first."
-            )
-        
-        with open(self.model_path, 'rb') as f:
-            model = pickle.load(f)
+        self.db = SQLitePool(self.db_path, size=pool_size)
+        self.catalog = catalog if catalog is not None else CatalogStore(self.db)
+        self.online_fold_in = online_fold_in
+        self.fold_in_reg = fold_in_reg
+        self.fold_in_max_users = fold_in_max_users
+        self.cache = RecommendationCache(max_size=cache_size, ttl_seconds=cache_ttl)
+        # Rated movies per user, for candidate generation without a query per request
+        self.candidates = CandidateGenerator(
+            UserHistoryStore(self.db, max_users=history_size, ttl_seconds=history_ttl)
+        )
+        self.pipeline = pipeline
+        # Model versions; loaded on first use, replaced by reload/rollback
+        self.registry = ModelRegistry(
+            self.artifact_dir, self.model_path, self.base_dir / precomputed_dir,
+            similarity_mode=similarity_mode, watch_seconds=watch_seconds
+        )
+        self.registry.on_swap(lambda new, old: self.cache.clear())
         
-        print(f"✓ Model loaded from {self.model_path}")
-        return model
+    @property
+    def model(self) -> ModelVersion:
+        """Active model version, loaded on first access."""
+        return self.registry.active
+    
+    @property
+    def scorer(self) -> FactorScorer:
+        """Factor scorer of the active model."""
+        return self.model.scorer
+    
+    @property
+    def similarity_index(self) -> SimilarityIndex:
+        """Similar-movie index of the active model, built on first access."""
+        return self.model.similarity_index
+    
+    @property
+    def model_info(self) -> Dict:
+        """Load info of the active model."""
+        return self.model.info
     
     def get_recommendations(self, user_id: int, n: int = 10) -> List[Dict]:
         """
@@ -48,81 +188,283 @@ class RecommendationEngine:
         Returns:
             List of dictionaries with movie details and predicted ratings
         """
-        conn = sqlite3.connect(self.db_path)
+        return self.get_recommendations_batch([(user_id, n)])[0]
+    
+    def stats(self) -> Dict:
+        """Model versions, cache counters and SQLite pool/query timings."""
+        return {
+            'model': self.registry.stats(),
+            'fold_in': self.model.scorer.fold_in_stats() if self.registry.loaded else None,
+            'cache': self.cache.stats(),
+            'histories': self.candidates.histories.stats(),
+            'catalog': self.catalog.stats(),
+            'db': self.db.stats()
+        }
+    
+    def invalidate_user(self, user_id: int):
+        """Forget cached and precomputed recommendations of a user whose ratings changed."""
+        self.cache.invalidate(user_id)
+        self.candidates.histories.invalidate(user_id)
+        model = self.registry.active if self.registry.loaded else None
+        if model is not None and model.precomputed is not None:
+            model.mark_stale(user_id)
+    
+    def fold_in_user(self, user_id: int, ratings: List[Tuple[int, float]]):
+        """
+        Update a user's factors from their current ratings and drop stale results.
         
-        # Get movies the user hasn't rated
-        # Get movies the user hasn't rated
-        # Filter out movies without images for better UI
-        query = """
-        SELECT m.movie_id, m.title, m.genres, m.avg_rating, m.image_url
-        FROM movies m
-        WHERE m.movie_id NOT IN (
-            SELECT movie_id FROM ratings WHERE user_id = ?
-        )
-        AND m.image_url IS NOT NULL
+        Args:
+            user_id: User ID
+            ratings: All (movie_id, rating) pairs of the user
+        """
+        if self.online_fold_in:
+            self.scorer.fold_in_user(
+                user_id,
+                [movie_id for movie_id, _ in ratings],
+                [rating for _, rating in ratings],
+                reg=self.fold_in_reg,
+                max_users=self.fold_in_max_users
+            )
+        self.invalidate_user(user_id)
+    
+    def _precomputed_recommendations(self, model: ModelVersion, user_id: int, n: int) -> Optional[List[Dict]]:
+        """
+        Serve a user's top N from the precompute snapshot.
+        
+        Returns:
+            Recommendations, or None when the snapshot cannot answer (no
+            snapshot, user unknown or rated something since, user to be
+            folded in, N too large)
         """
-        unrated_movies = pd.read_sql_query(query, conn, params=(user_id,))
+        precomputed = model.precomputed
+        if precomputed is None or model.is_stale(user_id):
+            return None
+        # The snapshot only has generic lists for users the model does not know; fold-in does better
+        if self.online_fold_in and model.scorer.inner_user_id(user_id) is None:
+            return None
         
-        if unrated_movies.empty:
-            conn.close()
+        # Ratings changed since the snapshot, through any worker or before a restart
+        stages = StageTimer(recommendation_stage_seconds)
+        with stages.stage('sql'):
+            try:
+                row = self.db.fetchone(
+                    'rating_version', "SELECT version FROM user_rating_versions WHERE user_id = ?", (user_id,)
+                )
+            except sqlite3.OperationalError as e:
+                if 'no such table' not in str(e):
+                    raise
+                # No version table: the API has never started on this database, so nothing changed through it
+                row = None
+        if row is not None and row[0] > precomputed.snapshot_rating_version:
+            model.mark_stale(user_id)
+            return None
+        
+        ranked = precomputed.lookup(user_id, n)
+        if ranked is None:
+            return None
+        if not ranked:
             return []
         
-        # Get user's recent positive ratings to boost genres
+        catalog = self.catalog.snapshot
+        positions = catalog.positions([movie_id for movie_id, _ in ranked])
+        if (positions < 0).any() or not catalog.has_image[positions].all():
+            # Catalog changed since the snapshot; rescore live
+            return None
+        
+        with stages.stage('serialization'):
+            recommendations = [
+                self._movie_entry(catalog, pos, predicted_rating=score)
+                for pos, (_, score) in zip(positions.tolist(), ranked)
+            ]
+        stages.record()
+        recommendation_results.inc(source='precomputed')
+        return recommendations
+    
+    @staticmethod
+    def _movie_entry(catalog, pos: int, predicted_rating: float) -> Dict:
+        """Recommendation dict for the movie at ``pos`` in a catalog snapshot."""
+        avg_rating = catalog.avg_rating(pos)
+        return {
+            'movie_id': int(catalog.movie_ids[pos]),
+            'title': catalog.titles[pos],
+            'genres': list(catalog.genre_lists[pos]),
+            'predicted_rating': predicted_rating,
+            'avg_rating': round(avg_rating, 2) if avg_rating else 0.0,
+            'image_url': catalog.image_urls[pos]
+        }
+    
+    def get_recommendations_batch(self, requests: List[Tuple[int, int]],
+                                  check_cache: bool = True) -> List[List[Dict]]:
+        """
+        Top N recommendations for several users at once.
+        
+        Cached and precomputed lists are served as in ``get_recommendations``;
+        the remaining users are scored together in one pass.
+        
+        Args:
+            requests: (user_id, n) pairs
+            check_cache: Look requests up in the cache first (off when the
+                caller already did)
+            
+        Returns:
+            Recommendations per request, in request order
+        """
+        # One model version for the whole batch, even if a reload swaps it meanwhile
+        model = self.model
+        results: List[Optional[List[Dict]]] = [None] * len(requests)
+        pending: Dict[int, int] = {}  # user_id -> largest n still to compute
+        for i, (user_id, n) in enumerate(requests):
+            cached = self.cache.get(user_id, n) if check_cache else None
+            if cached is None:
+                cached = self._precomputed_recommendations(model, user_id, n)
+                if cached is not None:
+                    self._cache_put(model, user_id, n, cached)
+            if cached is not None:
+                results[i] = cached
+            else:
+                pending[user_id] = max(n, pending.get(user_id, 0))
+        
+        if pending:
+            user_ids = list(pending)
+            computed = dict(zip(user_ids, self._compute_recommendations_batch(
+                model, user_ids, [pending[user_id] for user_id in user_ids]
+            )))
+            recommendation_results.inc(len(user_ids), source='scored')
+            for user_id, predictions in computed.items():
+                self._cache_put(model, user_id, pending[user_id], predictions)
+            for i, (user_id, n) in enumerate(requests):
+                if results[i] is None:
+                    results[i] = computed[user_id][:n]
+        return results
+    
+    def _cache_put(self, model: ModelVersion, user_id: int, n: int, recommendations: List[Dict]):
+        """Cache results unless the model they came from has been swapped out."""
+        if self.registry.active is model:
+            self.cache.put(user_id, n, recommendations)
+    
+    def _compute_recommendations_batch(self, model: ModelVersion, user_ids: List[int],
+                                       ns: List[int]) -> List[List[Dict]]:
+        """
+        Score the catalog for several users with one factor-matrix product.
+        
+        Args:
+            model: Model version to score with
+            user_ids: Distinct user IDs
+            ns: Number of recommendations per user
+            
+        Returns:
+            Recommendations per user, aligned with ``user_ids``
+        """
+        # Candidates: movies with an image (for better UI) the user hasn't rated
+        catalog = self.catalog.snapshot
+        space = self.candidates.space(catalog, model.scorer)
+        if len(space) == 0:
+            return [[] for _ in user_ids]
+        
+        stages = StageTimer(recommendation_stage_seconds)
+        # Users rated recently are in memory; the rest are read in one query
+        with stages.stage('sql'):
+            histories = self.candidates.histories.get_many(user_ids)
+        histories = [histories[user_id] for user_id in user_ids]
+        with stages.stage('candidates'):
+            candidate_masks = space.unrated_mask(histories)
+        genre_boosts = [self._genre_boost(catalog, history.recent_positive, stages) for history in histories]
+        
+        # Users who joined after training get factors folded in from their ratings
+        if self.online_fold_in:
+            for user_id, history in zip(user_ids, histories):
+                if len(history.movie_ids) and model.scorer.user_vector(user_id) is None:
+                    with stages.stage('scoring'):
+                        model.scorer.fold_in_user(user_id, history.movie_ids, history.ratings,
+                                                  reg=self.fold_in_reg, max_users=self.fold_in_max_users)
+        
+        if self.pipeline is None:
+            ranked = self._rank_all(model, catalog, space, user_ids, ns, candidate_masks, genre_boosts, stages)
+            scored_items = [space.inner_items[mask] for mask in candidate_masks]
+        else:
+            # Retrieve a few hundred candidates per user, score only those exactly
+            ranked, scored_items = [], []
+            for user_id, n, mask, genre_boost in zip(user_ids, ns, candidate_masks, genre_boosts):
+                columns, positions, scores = self.pipeline.recommend(
+                    catalog, space, model.scorer, user_id, mask, genre_boost, n, stages
+                )
+                ranked.append((positions, scores))
+                scored_items.append(space.inner_items[columns])
+        self._count_prediction_failures(model, user_ids, scored_items)
+        
+        results = []
+        for positions, scores in ranked:
+            with stages.stage('serialization'):
+                results.append([
+                    self._movie_entry(catalog, pos, round(score, 2))
+                    for pos, score in zip(positions.tolist(), scores.tolist())
+                ])
+        stages.record()
+        return results
+    
+    @staticmethod
+    def _rank_all(model: ModelVersion, catalog, space, user_ids: List[int], ns: List[int],
+                  candidate_masks: np.ndarray, genre_boosts: List[Dict[str, float]],
+                  stages: StageTimer) -> List[Tuple[np.ndarray, np.ndarray]]:
+        """
+        Full scoring: rank every unrated candidate of every user.
+        
+        Returns:
+            (top N catalog positions, their final scores) per user
+        """
+        # Score every candidate movie for all users in one pass over the
+        # factor matrices, then keep each user's unrated ones
+        with stages.stage('scoring'):
+            all_scores = model.scorer.score_many(user_ids, space.movie_ids, space.inner_items)
+        
+        ranked = []
+        for row, (n, mask, genre_boost) in enumerate(zip(ns, candidate_masks, genre_boosts)):
+            candidates = space.positions[mask]
+            if len(candidates) == 0:
+                ranked.append((candidates, np.zeros(0)))
+                continue
+            base_scores = all_scores[row, mask]
+            with stages.stage('genre_boost'):
+                boost = catalog.genre_boost(genre_boost, candidates)
+            
+            # Cap boost to avoid over-inflation
+            final_scores = np.minimum(5.0, base_scores + boost)
+            
+            # Rank by rounded predicted rating and return top N
+            with stages.stage('sorting'):
+                top = top_n_rounded(final_scores, n)
+            ranked.append((candidates[top], final_scores[top]))
+        return ranked
+    
+    @staticmethod
+    def _count_prediction_failures(model: ModelVersion, user_ids: List[int], scored_items: List[np.ndarray]):
+        """Count candidate predictions made without user or movie factors (inner item ids per user)."""
+        for user_id, inner_items in zip(user_ids, scored_items):
+            if model.scorer.user_vector(user_id) is None:
+                recommendation_prediction_failures.inc(len(inner_items), reason='unknown_user')
+            else:
+                missing = int(np.count_nonzero(inner_items < 0))
+                if missing:
+                    recommendation_prediction_failures.inc(missing, reason='unknown_movie')
+    
+    def _genre_boost(self, catalog, recent_positive: Sequence[int],
+                     stages: Optional[StageTimer] = None) -> Dict[str, float]:
+        """Boost per genre from the user's recent positive ratings (movie ids, newest first)."""
+        stages = stages if stages is not None else StageTimer(recommendation_stage_seconds)
         # This makes the system feel "live" even without retraining SVD
         genre_boost = {}
         try:
-            recent_ratings_query = """
-            SELECT m.genres, r.rating
-            FROM ratings r
-            JOIN movies m ON r.movie_id = m.movie_id
-            WHERE r.user_id = ? AND r.rating >= 4.0
-            ORDER BY r.timestamp DESC
-            LIMIT 5
-            """
-            recent_ratings = pd.read_sql_query(recent_ratings_query, conn, params=(user_id,))
-            
-            for _, row in recent_ratings.iterrows():
-                if row['genres']:
-                    for genre in row['genres'].split(','):
+            with stages.stage('genre_boost'):
+                for pos in catalog.positions(list(recent_positive)).tolist():
+                    if pos < 0:
+                        continue
+                    for genre in catalog.genre_lists[pos]:
                         genre = genre.strip()
                         genre_boost[genre] = genre_boost.get(genre, 0) + 0.2
-        except Exception as e:
-            print(f"Warning: Could not calculate genre boost: {e}")
-
-        # Predict ratings for all unrated movies
-        predictions = []
-        for _, movie in unrated_movies.iterrows():
-            try:
-                pred = self.model.predict(user_id, movie['movie_id'])
-                base_score = float(pred.est)
-                
-                # Apply genre boost
-                boost = 0
-                if movie['genres']:
-                    for genre in movie['genres'].split(','):
-                        if genre.strip() in genre_boost:
-                            boost += genre_boost[genre.strip()]
-                
-                # Cap boost to avoid over-inflation
-                final_score = min(5.0, base_score + boost)
-                
-                predictions.append({
-                    'movie_id': int(movie['movie_id']),
-                    'title': movie['title'],
-                    'genres': movie['genres'].split(',') if movie['genres'] else [],
-                    'predicted_rating': round(final_score, 2),
-                    'avg_rating': round(float(movie['avg_rating']), 2) if movie['avg_rating'] else 0.0,
-                    'image_url': movie['image_url']
-                })
-            except Exception as e:
-                print(f"Warning: Could not predict for movie {movie['movie_id']}: {e}")
-                continue
-        
-        # Sort by predicted rating and return top N
-        predictions.sort(key=lambda x: x['predicted_rating'], reverse=True)
-        
-        conn.close()
-        return predictions[:n]
+        except Exception:
+            # Recommendations go out unboosted; the failure shows in /metrics
+            recommendation_errors.inc(stage='genre_boost')
+        return genre_boost
     
     def get_popular_movies(self, n: int = 10, min_ratings: int = 50) -> List[Dict]:
         """
@@ -135,30 +477,17 @@ class RecommendationEngine:
         Returns:
             List of popular movies
         """
-        conn = sqlite3.connect(self.db_path)
-        
-        query = f"""
-        SELECT movie_id, title, genres, avg_rating, rating_count, image_url
-        FROM movies
-        WHERE rating_count >= ?
-        AND image_url IS NOT NULL
-        ORDER BY avg_rating DESC, rating_count DESC
-        LIMIT ?
-        """
-        
-        movies = pd.read_sql_query(query, conn, params=(min_ratings, n))
-        conn.close()
-        
+        catalog = self.catalog.snapshot
         return [
             {
-                'movie_id': int(row['movie_id']),
-                'title': row['title'],
-                'genres': row['genres'].split(',') if row['genres'] else [],
-                'avg_rating': round(float(row['avg_rating']), 2),
-                'rating_count': int(row['rating_count']),
-                'image_url': row['image_url']
+                'movie_id': int(catalog.movie_ids[pos]),
+                'title': catalog.titles[pos],
+                'genres': list(catalog.genre_lists[pos]),
+                'avg_rating': round(float(catalog.avg_ratings[pos]), 2),
+                'rating_count': int(catalog.rating_counts[pos]),
+                'image_url': catalog.image_urls[pos]
             }
-            for _, row in movies.iterrows()
+            for pos in catalog.popular(n, min_ratings, require_image=True).tolist()
         ]
     
     def get_similar_movies(self, movie_id: int, n: int = 10) -> List[Dict]:
@@ -172,49 +501,25 @@ class RecommendationEngine:
         Returns:
             List of similar movies
         """
-        try:
-            # Get the latent factor vector for the movie
-            movie_inner_id = self.model.trainset.to_inner_iid(movie_id)
-            movie_factors = self.model.qi[movie_inner_id]
-            
-            # Calculate similarity with all other movies
-            similarities = []
-            for iid in range(self.model.trainset.n_items):
-                if iid != movie_inner_id:
-                    other_movie_id = self.model.trainset.to_raw_iid(iid)
-                    other_factors = self.model.qi[iid]
-                    
-                    # Cosine similarity
-                    similarity = np.dot(movie_factors, other_factors) / (
-                        np.linalg.norm(movie_factors) * np.linalg.norm(other_factors)
-                    )
-                    similarities.append((int(other_movie_id), float(similarity)))
-            
-            # Sort by similarity
-            similarities.sort(key=lambda x: x[1], reverse=True)
-            
-            # Get movie details
-            conn = sqlite3.connect(self.db_path)
-            similar_movie_ids = [mid for mid, _ in similarities[:n]]
-            placeholders = ','.join('?' * len(similar_movie_ids))
-            query = f"SELECT movie_id, title, genres, avg_rating, image_url FROM movies WHERE movie_id IN ({placeholders}) AND image_url IS NOT NULL"
-            similar_movies = pd.read_sql_query(query, conn, params=similar_movie_ids)
-            conn.close()
-            
-            return [
-                {
-                    'movie_id': int(row['movie_id']),
-                    'title': row['title'],
-                    'genres': row['genres'].split(',') if row['genres'] else [],
-                    'avg_rating': round(float(row['avg_rating']), 2),
-                    'image_url': row['image_url']
-                }
-                for _, row in similar_movies.iterrows()
-            ]
-        
-        except ValueError:
-            # Movie not in training set
+        # Movies outside the training set have no factors and yield no neighbours
+        similarities = self.similarity_index.query(movie_id, n)
+        if not similarities:
             return []
+        
+        # Movie details, in movie id order, for the ones with an image
+        catalog = self.catalog.snapshot
+        positions = np.sort(catalog.positions([mid for mid, _ in similarities[:n]]))
+        return [
+            {
+                'movie_id': int(catalog.movie_ids[pos]),
+                'title': catalog.titles[pos],
+                'genres': list(catalog.genre_lists[pos]),
+                'avg_rating': round(float(catalog.avg_ratings[pos]), 2),
+                'image_url': catalog.image_urls[pos]
+            }
+            for pos in positions.tolist()
+            if pos >= 0 and catalog.has_image[pos]
+        ]
 
 
 # Singleton instance
@@ -225,5 +530,97 @@ def get_recommender() -> RecommendationEngine:
     """Get or create recommender instance (singleton pattern)."""
     global _recommender_instance
     if _recommender_instance is None:
-        _recommender_instance = RecommendationEngine()
+        _recommender_instance = RecommendationEngine(
+            similarity_mode=settings.SIMILARITY_INDEX_MODE,
+            cache_size=settings.RECOMMENDATION_CACHE_SIZE,
+            cache_ttl=settings.RECOMMENDATION_CACHE_TTL,
+            precomputed_dir=settings.PRECOMPUTED_RECOMMENDATIONS_DIR,
+            model_path=settings.MODEL_PATH,
+            artifact_dir=settings.MODEL_ARTIFACT_DIR,
+            online_fold_in=settings.ONLINE_FOLD_IN,
+            fold_in_reg=settings.FOLD_IN_REG,
+            fold_in_max_users=settings.FOLD_IN_MAX_USERS,
+            pool_size=settings.SQLITE_POOL_SIZE,
+            catalog=get_catalog(),
+            watch_seconds=settings.MODEL_WATCH_SECONDS,
+            history_size=settings.USER_HISTORY_CACHE_SIZE,
+            history_ttl=settings.RECOMMENDATION_CACHE_TTL,
+            pipeline=build_pipeline(settings.RECOMMENDATION_PIPELINE, settings.RETRIEVAL_CANDIDATES)
+        )
     return _recommender_instance
+
+
+def recommender_stats() -> Optional[Dict]:
+    """Stats of the recommender, or None if it has not been created yet."""
+    if _recommender_instance is None:
+        return None
+    return _recommender_instance.stats()
+
+
+def model_status() -> Optional[Dict]:
+    """Active and previous model versions, or None if no model is loaded yet."""
+    if _recommender_instance is None or not _recommender_instance.registry.loaded:
+        return None
+    registry = _recommender_instance.registry
+    return {
+        'version': registry.active.version,
+        'source': registry.active.info['source'],
+        'loaded_at': registry.active.loaded_at.isoformat(),
+        'previous_version': registry.previous.version if registry.previous is not None else None
+    }
+
+
+def _collect_metrics():
+    """Cache counters and the active model version, for ``/metrics``."""
+    if _recommender_instance is None:
+        return []
+    cache = _recommender_instance.cache.stats()
+    families = [
+        ('recommendation_cache_lookups_total', 'counter', 'Recommendation cache lookups by result',
+         [({'result': 'hit'}, cache['hits']), ({'result': 'miss'}, cache['misses'])]),
+        ('recommendation_cache_entries', 'gauge', 'Users with cached recommendations', [({}, cache['size'])]),
+    ]
+    registry = _recommender_instance.registry
+    if registry.loaded:
+        model = registry.active
+        families += [
+            ('recommendation_model_info', 'gauge', 'Active model version (always 1)',
+             [({'version': model.version, 'source': model.info['source']}, 1)]),
+            ('recommendation_model_reloads_total', 'counter', 'Model hot-reloads', [({}, registry.reloads)]),
+            ('recommendation_model_rollbacks_total', 'counter', 'Model rollbacks', [({}, registry.rollbacks)]),
+            ('recommendation_folded_in_users', 'gauge', 'Users with folded-in factors in the active model',
+             [({}, model.scorer.fold_in_stats()['users'])]),
+        ]
+    return families
+
+
+metrics_registry.add_collector(_collect_metrics)
+
+
+def invalidate_user_recommendations(user_id: int):
+    """Invalidate a user's cached recommendations if the recommender is loaded."""
+    if _recommender_instance is not None:
+        _recommender_instance.invalidate_user(user_id)
+
+
+def update_user_model(user_id: int, ratings: List[Tuple[int, float]]):
+    """
+    Fold a user's current ratings into the serving model, if it is loaded.
+    
+    Runs after the rating write has committed. It never loads the model
+    (until the first recommendation there are no factors to update) and
+    never fails the write: errors are counted in ``recommendation_errors``
+    (stage 'fold_in') and the user's cached results invalidated.
+    
+    Args:
+        user_id: User ID
+        ratings: All (movie_id, rating) pairs of the user
+    """
+    if _recommender_instance is None or not _recommender_instance.registry.loaded:
+        invalidate_user_recommendations(user_id)
+        return
+    try:
+        _recommender_instance.fold_in_user(user_id, ratings)
+    except Exception:
+        recommendation_errors.inc(stage='fold_in')
+        invalidate_user_recommendations(user_id)
@@ -0,0 +1,342 @@
+"""Versioned serving models with background reload, atomic swap and rollback."""
+import threading
+import time
+from collections import OrderedDict
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Dict, Optional, Set
+import numpy as np
+from app.ml.artifacts import current_rss_mb, load_model_artifact, load_scorer, read_latest_pointer
+from app.ml.precompute import PrecomputedRecommendations
+from app.ml.scoring import FactorScorer
+from app.ml.shared_model import attach_shared_model, shared_model_spec
+from app.ml.similarity import SimilarityIndex
+
+# Stale users remembered per version; older ones are caught by the persisted rating version instead
+MAX_STALE_USERS = 10000
+
+
+class ModelVersion:
+    """
+    One loaded model with everything derived from it.
+
+    Requests take a reference to a version once and use it throughout, so
+    a swap never mixes two models within a request. The similar-movie index
+    is built on first use or by ``warm``, and the precompute snapshot is
+    only attached when it was computed with this model.
+    """
+
+    def __init__(self, scorer: FactorScorer, info: Dict, similarity_mode: str = 'exact',
+                 precomputed: Optional[PrecomputedRecommendations] = None):
+        """
+        Initialize version.
+
+        Args:
+            scorer: Loaded model
+            info: Load info (source, path, version, load_ms, rss_mb)
+            similarity_mode: Similar-movie index mode ('exact' or 'lsh')
+            precomputed: Precompute snapshot computed with this model
+        """
+        self.scorer = scorer
+        self.info = info
+        self.version = info['version']
+        self.similarity_mode = similarity_mode
+        self.precomputed = precomputed
+        # Users whose ratings changed after the precompute snapshot (LRU, bounded)
+        self.stale_users: 'OrderedDict[int, None]' = OrderedDict()
+        self.max_stale_users = MAX_STALE_USERS
+        self._stale_lock = threading.Lock()
+        self.loaded_at = datetime.now(timezone.utc)
+        self._similarity_index: Optional[SimilarityIndex] = None
+        self._lock = threading.Lock()
+
+    @property
+    def similarity_index(self) -> SimilarityIndex:
+        """Similar-movie index, built on first access."""
+        if self._similarity_index is None:
+            with self._lock:
+                if self._similarity_index is None:
+                    scorer = self.scorer
+                    if scorer.item_vectors is not None:
+                        index = SimilarityIndex(scorer.item_vectors, scorer.item_ids,
+                                                mode=self.similarity_mode, normalized=True)
+                    else:
+                        index = SimilarityIndex(scorer.qi, scorer.item_ids, mode=self.similarity_mode)
+                    self._similarity_index = index
+        return self._similarity_index
+
+    def attach_precomputed(self, snapshot: Optional[PrecomputedRecommendations]) -> bool:
+        """Use a precompute snapshot if it was computed with this model."""
+        if snapshot is None or snapshot.manifest.get('model_version') != self.version:
+            return False
+        self.precomputed = snapshot
+        with self._stale_lock:
+            self.stale_users.clear()
+        return True
+
+    def mark_stale(self, user_id: int):
+        """Stop serving a user from the precompute snapshot."""
+        with self._stale_lock:
+            self.stale_users[user_id] = None
+            self.stale_users.move_to_end(user_id)
+            while len(self.stale_users) > self.max_stale_users:
+                self.stale_users.popitem(last=False)
+
+    def is_stale(self, user_id: int) -> bool:
+        """Whether a user was marked stale (and is still remembered)."""
+        with self._stale_lock:
+            return user_id in self.stale_users
+
+    def warm(self, sample_users: int = 256):
+        """
+        Build the similarity index and touch the factor pages before serving.
+
+        Scores a sample of users against every movie, which pages the
+        memory-mapped factor matrices in, so the first requests after a
+        swap do not pay for loading them.
+        """
+        start = time.perf_counter()
+        index = self.similarity_index
+        if len(index):
+            index.query(int(index.item_ids[0]), 10)
+        scorer = self.scorer
+        users = scorer.user_ids[np.linspace(0, scorer.n_users - 1, min(sample_users, scorer.n_users), dtype=int)]
+        for lo in range(0, len(users), 64):
+            scorer.score_many(users[lo:lo + 64], scorer.item_ids)
+        np.add.reduce(scorer.pu, axis=0)
+        self.info['warm_ms'] = round((time.perf_counter() - start) * 1000, 2)
+
+    def summary(self) -> Dict:
+        """Version, source and load details."""
+        return {
+            'version': self.version,
+            'source': self.info['source'],
+            'path': self.info['path'],
+            'loaded_at': self.loaded_at.isoformat(),
+            'load_ms': self.info.get('load_ms'),
+            'warm_ms': self.info.get('warm_ms'),
+            'n_users': self.scorer.n_users,
+            'n_items': self.scorer.n_items,
+            'precomputed': str(self.precomputed.snapshot_dir) if self.precomputed is not None else None
+        }
+
+
+class ModelRegistry:
+    """
+    Holds the serving model and replaces it without a restart.
+
+    New models are loaded and warmed off the request path, either by the
+    watcher thread (which polls the artifact ``LATEST`` pointer, or the
+    pickle's modification time) or by an explicit ``reload``, then swapped
+    in with a single reference assignment: requests already running finish
+    on the version they started with. The previous version stays loaded so
+    ``rollback`` is instant.
+    """
+
+    def __init__(self, artifact_dir: Path, model_path: Path, precomputed_dir: Path,
+                 similarity_mode: str = 'exact', watch_seconds: float = 30):
+        """
+        Initialize registry.
+
+        Args:
+            artifact_dir: Directory of memory-mapped model artifacts
+            model_path: Pickled model, used when no artifact exists
+            precomputed_dir: Directory of precompute snapshots
+            similarity_mode: Similar-movie index mode ('exact' or 'lsh')
+            watch_seconds: Poll interval of the watcher thread (0 disables it)
+        """
+        self.artifact_dir = Path(artifact_dir)
+        self.model_path = Path(model_path)
+        self.precomputed_dir = Path(precomputed_dir)
+        self.similarity_mode = similarity_mode
+        self.watch_seconds = watch_seconds
+        self._active: Optional[ModelVersion] = None
+        self.previous: Optional[ModelVersion] = None
+        # Serializes loads and swaps; readers never take it once a model is active
+        self._lock = threading.Lock()
+        # Versions rolled back from or failing to load; the watcher skips them
+        self._skipped: Set[str] = set()
+        self.reloads = 0
+        self.rollbacks = 0
+        self.last_error: Optional[str] = None
+        self._listeners = []
+        self._watcher: Optional[threading.Thread] = None
+        self._stop = threading.Event()
+
+    @property
+    def active(self) -> ModelVersion:
+        """Serving model, loaded on first access."""
+        model = self._active
+        if model is None:
+            with self._lock:
+                if self._active is None:
+                    self._active = self._load_initial()
+                model = self._active
+        return model
+
+    @property
+    def loaded(self) -> bool:
+        return self._active is not None
+
+    def on_swap(self, listener):
+        """Call ``listener(new, old)`` after every swap, e.g. to clear caches."""
+        self._listeners.append(listener)
+
+    def _load_initial(self) -> ModelVersion:
+        # Under app.serve the parent has published the model in shared memory
+        spec = shared_model_spec()
+        if spec is not None:
+            scorer, info = attach_shared_model(spec)
+        else:
+            scorer, info = load_scorer(self.artifact_dir, self.model_path)
+        model = self._new_version(scorer, info)
+        self._announce(model)
+        return model
+
+    def _new_version(self, scorer: FactorScorer, info: Dict) -> ModelVersion:
+        model = ModelVersion(scorer, info, similarity_mode=self.similarity_mode)
+        model.attach_precomputed(PrecomputedRecommendations.load_latest(self.precomputed_dir))
+        return model
+
+    @staticmethod
+    def _announce(model: ModelVersion):
+        print(
+            f"✓ Model {model.version} loaded from {model.info['path']} "
+            f"({model.info['source']}, {model.info['load_ms']} ms, RSS {model.info['rss_mb']} MB)"
+        )
+        if model.precomputed is not None:
+            print(f"✓ Precomputed recommendations loaded from {model.precomputed.snapshot_dir}")
+
+    def available_version(self) -> Optional[str]:
+        """Version the artifact directory (or the pickle) currently offers."""
+        version_dir = read_latest_pointer(self.artifact_dir)
+        if version_dir is not None:
+            return version_dir.name
+        if self.model_path.exists():
+            mtime = datetime.fromtimestamp(self.model_path.stat().st_mtime, timezone.utc)
+            return mtime.strftime('%Y%m%dT%H%M%S')
+        return None
+
+    def reload(self, version: Optional[str] = None) -> ModelVersion:
+        """
+        Load, warm and swap in a model version.
+
+        Args:
+            version: Artifact version directory name (defaults to the latest
+                artifact, or the pickle when there is none)
+
+        Returns:
+            The new active version
+        """
+        with self._lock:
+            start = time.perf_counter()
+            try:
+                if version is not None:
+                    version_dir = self.artifact_dir / version
+                    if not (version_dir / 'manifest.json').exists():
+                        raise FileNotFoundError(f"No model artifact version {version} in {self.artifact_dir}")
+                    scorer, manifest = load_model_artifact(version_dir)
+                    info = {'source': 'artifact', 'path': str(version_dir), 'version': manifest['version'],
+                            'load_ms': round((time.perf_counter() - start) * 1000, 2),
+                            'rss_mb': current_rss_mb()}
+                else:
+                    scorer, info = load_scorer(self.artifact_dir, self.model_path)
+                model = self._new_version(scorer, info)
+                model.warm()
+            except Exception as e:
+                self.last_error = f"{type(e).__name__}: {e}"
+                if version is not None or self.available_version() is not None:
+                    self._skipped.add(version or self.available_version())
+                raise
+            self._skipped.discard(model.version)
+            self._swap(model)
+            self.reloads += 1
+            self.last_error = None
+        self._announce(model)
+        return model
+
+    def rollback(self) -> ModelVersion:
+        """
+        Swap the previous version back in.
+
+        The version rolled back from is skipped by the watcher until it is
+        reloaded explicitly.
+
+        Returns:
+            The new active version
+        """
+        with self._lock:
+            if self.previous is None:
+                raise LookupError("No previous model version to roll back to")
+            current = self._active
+            self._swap(self.previous)
+            if current is not None:
+                self._skipped.add(current.version)
+            self.rollbacks += 1
+            return self._active
+
+    def _swap(self, model: ModelVersion):
+        old = self._active
+        self._active = model
+        self.previous = old
+        for listener in self._listeners:
+            listener(model, old)
+
+    def check_for_update(self) -> Optional[ModelVersion]:
+        """
+        Reload when a new model version is available.
+
+        Also attaches a precompute snapshot written for the active model
+        after it was loaded.
+
+        Returns:
+            The new active version, or None if nothing changed
+        """
+        model = self._active
+        if model is None:
+            return None
+        version = self.available_version()
+        if version is not None and version != model.version and version not in self._skipped:
+            return self.reload()
+        snapshot_dir = read_latest_pointer(self.precomputed_dir)
+        current = model.precomputed.snapshot_dir if model.precomputed is not None else None
+        if snapshot_dir is not None and snapshot_dir != current:
+            if model.attach_precomputed(PrecomputedRecommendations(snapshot_dir)):
+                print(f"✓ Precomputed recommendations loaded from {snapshot_dir}")
+        return None
+
+    def start_watcher(self):
+        """Poll for new model versions in a daemon thread."""
+        if self.watch_seconds <= 0 or self._watcher is not None:
+            return
+        self._stop.clear()
+        self._watcher = threading.Thread(target=self._watch, name='model-watcher', daemon=True)
+        self._watcher.start()
+
+    def stop_watcher(self):
+        """Stop the watcher thread."""
+        self._stop.set()
+        if self._watcher is not None:
+            self._watcher.join(timeout=self.watch_seconds + 1)
+            self._watcher = None
+
+    def _watch(self):
+        while not self._stop.wait(self.watch_seconds):
+            try:
+                self.check_for_update()
+            except Exception as e:
+                print(f"❌ Model reload failed: {e}")
+
+    def stats(self) -> Dict:
+        """Active and previous versions with reload counters."""
+        active = self._active
+        return {
+            'active': active.summary() if active is not None else None,
+            'previous_version': self.previous.version if self.previous is not None else None,
+            'available_version': self.available_version(),
+            'reloads': self.reloads,
+            'rollbacks': self.rollbacks,
+            'skipped_versions': sorted(self._skipped.copy()),
+            'last_error': self.last_error,
+            'watching': self._watcher is not None
+        }
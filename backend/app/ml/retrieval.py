@@ -0,0 +1,251 @@
+"""Candidate retrieval for the two-stage recommendation pipeline."""
+import threading
+from abc import ABC, abstractmethod
+import time
+from typing import Dict, List, Optional, Sequence, Tuple
+import numpy as np
+from app.catalog import CatalogSnapshot
+from app.ml.candidates import CandidateSpace
+from app.ml.scoring import FactorScorer
+
+
+class InnerProductIndex:
+    """
+    Approximate maximum inner product search over item factors.
+
+    A user's predicted rating ranks movies by ``bi + qi . pu``, i.e. by the
+    inner product of ``[qi, bi]`` with ``[pu, 1]``. Appending
+    ``sqrt(M^2 - |x|^2)`` to every item vector (``M`` the largest norm)
+    gives all items the same norm, so the largest inner products are the
+    nearest neighbours by angle, and items can be clustered on the sphere.
+    The index is an inverted file: items are bucketed by their nearest of
+    ``n_lists`` k-means centroids, and a query scores the centroids, then
+    scores exactly the items of the best lists until it has enough of them.
+    """
+
+    def __init__(self, qi: np.ndarray, bi: np.ndarray, n_lists: Optional[int] = None,
+                 n_iter: int = 8, sample_size: int = 65536, seed: int = 42):
+        """
+        Build the index.
+
+        Args:
+            qi: Item factors, one row per inner item id
+            bi: Item biases
+            n_lists: Number of clusters (defaults to ~sqrt of the item count)
+            n_iter: k-means iterations
+            sample_size: Most items the centroids are trained on
+            seed: Random seed for the sample and the initial centroids
+        """
+        start = time.perf_counter()
+        self.items = np.ascontiguousarray(np.hstack([qi, np.asarray(bi)[:, None]]), dtype=np.float32)
+        n_items = len(self.items)
+        norms = np.linalg.norm(self.items, axis=1)
+        max_norm = float(norms.max()) if n_items else 1.0
+        extra = np.sqrt(np.maximum(max_norm ** 2 - norms ** 2, 0.0))
+        points = np.hstack([self.items, extra[:, None]]) / max(max_norm, 1e-12)
+
+        if n_lists is None:
+            n_lists = int(np.clip(np.sqrt(n_items), 1, 4096))
+        self.n_lists = max(1, min(n_lists, n_items))
+
+        rng = np.random.default_rng(seed)
+        if n_items:
+            train = points[rng.choice(n_items, min(n_items, sample_size), replace=False)]
+            centroids = train[rng.choice(len(train), self.n_lists, replace=False)].copy()
+            for _ in range(n_iter):
+                assign = np.argmax(train @ centroids.T, axis=1)
+                sums = np.zeros_like(centroids)
+                np.add.at(sums, assign, train)
+                lengths = np.linalg.norm(sums, axis=1)
+                # Empty clusters keep their previous centroid
+                filled = lengths > 0
+                centroids[filled] = sums[filled] / lengths[filled, None]
+            assign = np.concatenate([
+                np.argmax(points[lo:lo + 65536] @ centroids.T, axis=1) for lo in range(0, n_items, 65536)
+            ])
+        else:
+            centroids = np.zeros((1, points.shape[1]))
+            assign = np.zeros(0, dtype=np.int64)
+
+        # Queries are [pu, 1, 0]: the norm-padding coordinate drops out
+        self.centroids = np.ascontiguousarray(centroids[:, :-1], dtype=np.float32)
+        self.lists = np.argsort(assign, kind='stable').astype(np.int64)
+        self.offsets = np.concatenate(([0], np.cumsum(np.bincount(assign, minlength=self.n_lists))))
+        self.build_ms = round((time.perf_counter() - start) * 1000, 2)
+
+    def __len__(self) -> int:
+        return len(self.items)
+
+    def search(self, user_factors: np.ndarray, k: int, oversample: float = 2.0) -> np.ndarray:
+        """
+        Inner item ids with the (approximately) largest ``bi + qi . pu``.
+
+        Args:
+            user_factors: ``pu`` of the user
+            k: Number of items to return
+            oversample: Items scored exactly per item returned
+
+        Returns:
+            Up to ``k`` inner item ids, best first
+        """
+        if k <= 0 or len(self.items) == 0:
+            return np.empty(0, dtype=np.int64)
+        query = np.append(np.asarray(user_factors, dtype=np.float32), np.float32(1.0))
+        wanted = min(len(self.items), int(np.ceil(k * oversample)))
+        list_order = np.argsort(-(self.centroids @ query))
+        sizes = self.offsets[list_order + 1] - self.offsets[list_order]
+        n_probe = int(np.searchsorted(np.cumsum(sizes), wanted)) + 1
+        probed = [self.lists[self.offsets[l]:self.offsets[l + 1]] for l in list_order[:n_probe].tolist()]
+        rows = np.concatenate(probed) if probed else np.empty(0, dtype=np.int64)
+        scores = self.items[rows] @ query
+        if len(rows) > k:
+            top = np.argpartition(-scores, k - 1)[:k]
+            rows, scores = rows[top], scores[top]
+        return rows[np.argsort(-scores, kind='stable')]
+
+    def stats(self) -> Dict:
+        """Lists, items and build time."""
+        return {'items': len(self.items), 'lists': self.n_lists, 'build_ms': self.build_ms}
+
+
+class Retriever(ABC):
+    """
+    One source of candidates for the re-ranking stage.
+
+    ``retrieve`` returns columns of the candidate space (see
+    ``CandidateSpace``) among those ``allowed`` for the user, i.e. movies
+    that pass the image filter and that the user has not rated.
+    """
+
+    name = 'retriever'
+
+    @abstractmethod
+    def retrieve(self, snapshot: CatalogSnapshot, space: CandidateSpace, scorer: FactorScorer,
+                 user_id: int, allowed: np.ndarray, genre_boost: Dict[str, float]) -> np.ndarray:
+        """
+        Candidates for one user.
+
+        Args:
+            snapshot: Catalog snapshot the space was built from
+            space: Candidate space to return columns of
+            scorer: Factor model being served
+            user_id: User ID
+            allowed: Mask over ``space`` of the movies the user may get
+            genre_boost: Boost per genre from the user's recent ratings
+
+        Returns:
+            Columns of ``space``, a subset of ``allowed``
+        """
+
+
+class FactorRetriever(Retriever):
+    """Movies with the highest predicted rating, from ``InnerProductIndex``."""
+
+    name = 'factors'
+
+    def __init__(self, k: int = 300, oversample: float = 2.0, n_lists: Optional[int] = None):
+        self.k = k
+        self.oversample = oversample
+        self.n_lists = n_lists
+        # (model it was built for, index) and (space, inner item id -> column)
+        self._index: Optional[Tuple[FactorScorer, InnerProductIndex]] = None
+        self._columns: Optional[Tuple[CandidateSpace, np.ndarray]] = None
+        self._lock = threading.Lock()
+
+    def index(self, scorer: FactorScorer) -> InnerProductIndex:
+        """Index over a model's items, built on first use per model."""
+        cached = self._index
+        if cached is None or cached[0] is not scorer:
+            with self._lock:
+                cached = self._index
+                if cached is None or cached[0] is not scorer:
+                    index = InnerProductIndex(scorer.qi, scorer.bi, n_lists=self.n_lists)
+                    cached = self._index = (scorer, index)
+        return cached[1]
+
+    def _column_of_item(self, space: CandidateSpace) -> np.ndarray:
+        cached = self._columns
+        if cached is None or cached[0] is not space:
+            column_of_item = np.full(space.scorer.n_items, -1, dtype=np.int64)
+            known = space.inner_items >= 0
+            column_of_item[space.inner_items[known]] = np.flatnonzero(known)
+            cached = self._columns = (space, column_of_item)
+        return cached[1]
+
+    def retrieve(self, snapshot, space, scorer, user_id, allowed, genre_boost):
+        user = scorer.user_vector(user_id)
+        if user is None:
+            return np.empty(0, dtype=np.int64)
+        # Fetch past the movies the user rated and those outside the space
+        # (e.g. without an image), assuming they rank like any other
+        column_of_item = self._column_of_item(space)
+        excluded = len(allowed) - int(np.count_nonzero(allowed))
+        share = max(len(space) / max(len(column_of_item), 1), 1e-3)
+        wanted = int(np.ceil((self.k + excluded) / min(share, 1.0)))
+        items = self.index(scorer).search(user[1], wanted, self.oversample)
+        columns = column_of_item[items]
+        columns = columns[columns >= 0]
+        return columns[allowed[columns]][:self.k]
+
+
+def _first_allowed(positions: np.ndarray, space: CandidateSpace, allowed: np.ndarray, k: int,
+                   keep: Optional[np.ndarray] = None) -> np.ndarray:
+    """Columns of the first ``k`` listed positions that are allowed, scanning in chunks."""
+    found: List[np.ndarray] = []
+    total = 0
+    step = max(4 * k, 256)
+    for start in range(0, len(positions), step):
+        chunk = positions[start:start + step]
+        if keep is not None:
+            chunk = chunk[keep[chunk]]
+        columns = space.column_of[chunk]
+        columns = columns[columns >= 0]
+        columns = columns[allowed[columns]]
+        found.append(columns)
+        total += len(columns)
+        if total >= k:
+            break
+    return np.concatenate(found)[:k] if found else np.empty(0, dtype=np.int64)
+
+
+class PopularRetriever(Retriever):
+    """Best rated movies with at least ``min_ratings`` ratings, for every user."""
+
+    name = 'popular'
+
+    def __init__(self, k: int = 50, min_ratings: int = 50):
+        self.k = k
+        self.min_ratings = min_ratings
+
+    def retrieve(self, snapshot, space, scorer, user_id, allowed, genre_boost):
+        return _first_allowed(snapshot.listing().positions, space, allowed, self.k,
+                              keep=snapshot.rating_counts >= self.min_ratings)
+
+
+class GenreRetriever(Retriever):
+    """Best rated movies of the genres the user rated highly lately (the genre boost's genres)."""
+
+    name = 'genres'
+
+    def __init__(self, k: int = 50):
+        self.k = k
+
+    def retrieve(self, snapshot, space, scorer, user_id, allowed, genre_boost):
+        if not genre_boost:
+            return np.empty(0, dtype=np.int64)
+        genres = sorted(genre_boost, key=lambda genre: -genre_boost[genre])
+        per_genre = max(1, -(-self.k // len(genres)))
+        found = [
+            _first_allowed(snapshot.listing(genre).positions, space, allowed, per_genre)
+            for genre in genres if genre
+        ]
+        return np.concatenate(found) if found else np.empty(0, dtype=np.int64)
+
+
+def default_retrievers(n_candidates: int = 300) -> Sequence[Retriever]:
+    """Factor ANN for most candidates, plus popular and genre-seeded ones (a sixth each)."""
+    return [
+        FactorRetriever(k=n_candidates),
+        PopularRetriever(k=max(1, n_candidates // 6)),
+        GenreRetriever(k=max(1, n_candidates // 6)),
+    ]
@@ -0,0 +1,284 @@
+"""Vectorized scoring on top of the latent factors of a trained SVD model."""
+import threading
+import numpy as np
+from collections import OrderedDict
+from typing import Dict, Optional, Sequence, Tuple
+
+# Users with folded-in factors kept per model, least recently used dropped first
+MAX_FOLDED_IN_USERS = 10000
+
+
+class FactorScorer:
+    """
+    Scores a user against many movies at once.
+
+    Reproduces ``surprise.SVD.predict`` for the biased SVD (global mean +
+    user bias + item bias + dot product, clipped to the rating scale), but
+    reads ``pu``, ``qi``, ``bu`` and ``bi`` once and replaces the per-movie
+    Python call with a single matrix-vector product.
+    """
+
+    def __init__(self, global_mean: float, bu: np.ndarray, bi: np.ndarray,
+                 pu: np.ndarray, qi: np.ndarray, user_ids: Sequence, item_ids: Sequence,
+                 rating_scale: Tuple[float, float] = (1, 5),
+                 user_order: Optional[np.ndarray] = None, item_order: Optional[np.ndarray] = None,
+                 item_vectors: Optional[np.ndarray] = None):
+        """
+        Initialize scorer from raw factor arrays.
+
+        Args:
+            global_mean: Mean of all training ratings
+            bu: User biases, indexed by inner user id
+            bi: Item biases, indexed by inner item id
+            pu: User factors, one row per inner user id
+            qi: Item factors, one row per inner item id
+            user_ids: Raw user ids in inner id order
+            item_ids: Raw movie ids in inner id order
+            rating_scale: (min, max) rating used to clip predictions
+            user_order: Precomputed argsort of ``user_ids``
+            item_order: Precomputed argsort of ``item_ids``
+            item_vectors: Precomputed L2-normalized float32 copy of ``qi``
+        """
+        self.global_mean = float(global_mean)
+        self.bu = bu
+        self.bi = bi
+        self.pu = pu
+        self.qi = qi
+        self.user_ids = np.asarray(user_ids)
+        self.item_ids = np.asarray(item_ids)
+        self.rating_scale = (float(rating_scale[0]), float(rating_scale[1]))
+        self.item_vectors = item_vectors
+
+        # Sorted copies of the raw ids turn raw -> inner lookups into searchsorted
+        if user_order is None:
+            user_order = np.argsort(self.user_ids, kind='stable')
+        if item_order is None:
+            item_order = np.argsort(self.item_ids, kind='stable')
+        self._user_order = user_order
+        self._user_sorted = self.user_ids[user_order]
+        self._item_order = item_order
+        self._item_sorted = self.item_ids[item_order]
+
+        # Folded-in (bu, pu) per raw user id, taking precedence over the
+        # trained rows; kept outside the (possibly read-only) factor arrays.
+        # A bounded LRU: evicted users fall back to their trained factors
+        self._user_overrides: 'OrderedDict[int, Tuple[float, np.ndarray]]' = OrderedDict()
+        self._overrides_lock = threading.Lock()
+        self.max_overrides = MAX_FOLDED_IN_USERS
+        self.override_evictions = 0
+
+    @classmethod
+    def from_svd(cls, model) -> 'FactorScorer':
+        """Extract factors, biases and id maps from a fitted ``surprise.SVD``."""
+        trainset = model.trainset
+        user_ids = [trainset.to_raw_uid(inner) for inner in range(trainset.n_users)]
+        item_ids = [trainset.to_raw_iid(inner) for inner in range(trainset.n_items)]
+        return cls(
+            global_mean=trainset.global_mean,
+            bu=np.asarray(model.bu, dtype=np.float64),
+            bi=np.asarray(model.bi, dtype=np.float64),
+            pu=np.ascontiguousarray(model.pu, dtype=np.float64),
+            qi=np.ascontiguousarray(model.qi, dtype=np.float64),
+            user_ids=user_ids,
+            item_ids=item_ids,
+            rating_scale=trainset.rating_scale
+        )
+
+    @property
+    def n_users(self) -> int:
+        return len(self.user_ids)
+
+    @property
+    def n_items(self) -> int:
+        return len(self.item_ids)
+
+    @staticmethod
+    def _lookup(sorted_ids: np.ndarray, order: np.ndarray, raw_ids) -> np.ndarray:
+        """Map raw ids to inner ids, using -1 for ids unknown to the model."""
+        raw_ids = np.asarray(raw_ids)
+        if len(sorted_ids) == 0:
+            return np.full(raw_ids.shape, -1, dtype=np.int64)
+        pos = np.searchsorted(sorted_ids, raw_ids)
+        pos = np.minimum(pos, len(sorted_ids) - 1)
+        found = sorted_ids[pos] == raw_ids
+        return np.where(found, order[pos], -1).astype(np.int64)
+
+    def inner_user_id(self, user_id) -> Optional[int]:
+        """Inner id of a user, or None if the user was not in the training set."""
+        inner = self._lookup(self._user_sorted, self._user_order, [user_id])[0]
+        return int(inner) if inner >= 0 else None
+
+    def inner_user_ids(self, user_ids) -> np.ndarray:
+        """Inner ids for an array of user ids (-1 for unknown users)."""
+        return self._lookup(self._user_sorted, self._user_order, user_ids)
+
+    def inner_item_ids(self, movie_ids) -> np.ndarray:
+        """Inner ids for an array of movie ids (-1 for unknown movies)."""
+        return self._lookup(self._item_sorted, self._item_order, movie_ids)
+
+    def user_vector(self, user_id) -> Optional[Tuple[float, np.ndarray]]:
+        """(bu, pu) of a user, folded-in values first, or None if unknown."""
+        if self._user_overrides:
+            with self._overrides_lock:
+                override = self._user_overrides.get(user_id)
+                if override is not None:
+                    self._user_overrides.move_to_end(user_id)
+                    return override
+        inner = self.inner_user_id(user_id)
+        if inner is None:
+            return None
+        return self.bu[inner], self.pu[inner]
+
+    def fold_in_user(self, user_id, movie_ids, ratings, reg: float = 0.02,
+                     max_users: Optional[int] = None) -> bool:
+        """
+        Re-estimate one user's bias and factors from their ratings.
+
+        Solves the regularized least-squares problem
+
+            min  sum_i (r_i - mu - b_i - b_u - q_i . p_u)^2 + reg * n * (b_u^2 + |p_u|^2)
+
+        with the item side (``qi``, ``bi``) held fixed. The penalty scales with
+        the number of ratings ``n``, like the per-rating penalty of the SGD
+        training objective. Movies the model has never seen are ignored.
+
+        Args:
+            user_id: Raw user ID
+            movie_ids: Movies the user rated
+            ratings: Ratings aligned with ``movie_ids``
+            reg: Regularization per rating
+            max_users: Most folded-in users to keep (updates ``max_overrides``)
+
+        Returns:
+            True if the user now has folded-in factors
+        """
+        inner_items = self.inner_item_ids(movie_ids)
+        known = inner_items >= 0
+        if not known.any():
+            with self._overrides_lock:
+                self._user_overrides.pop(user_id, None)
+            return False
+
+        items = inner_items[known]
+        residuals = np.asarray(ratings, dtype=np.float64)[known] - self.global_mean - self.bi[items]
+        design = np.hstack([self.qi[items], np.ones((len(items), 1))])
+        gram = design.T @ design
+        gram[np.diag_indices_from(gram)] += reg * len(items)
+        solution = np.linalg.solve(gram, design.T @ residuals)
+
+        with self._overrides_lock:
+            if max_users is not None:
+                self.max_overrides = max_users
+            self._user_overrides[user_id] = (float(solution[-1]), solution[:-1])
+            self._user_overrides.move_to_end(user_id)
+            while len(self._user_overrides) > self.max_overrides:
+                self._user_overrides.popitem(last=False)
+                self.override_evictions += 1
+        return True
+
+    def fold_in_stats(self) -> Dict:
+        """Number of folded-in users, their bound and evictions."""
+        with self._overrides_lock:
+            return {
+                'users': len(self._user_overrides),
+                'max_users': self.max_overrides,
+                'evictions': self.override_evictions
+            }
+
+    def score(self, user_id, movie_ids) -> np.ndarray:
+        """
+        Predict ratings of one user for many movies.
+
+        Args:
+            user_id: Raw user ID
+            movie_ids: Raw movie IDs to score
+
+        Returns:
+            Array of clipped predicted ratings aligned with ``movie_ids``
+        """
+        inner_items = self.inner_item_ids(movie_ids)
+        known_items = inner_items >= 0
+        user = self.user_vector(user_id)
+
+        # Same accumulation order as SVD.estimate: mean, user bias, item bias, dot
+        est = np.full(len(inner_items), self.global_mean)
+        if user is not None:
+            est += user[0]
+        est[known_items] += self.bi[inner_items[known_items]]
+        if user is not None:
+            est[known_items] += self.qi[inner_items[known_items]] @ user[1]
+
+        low, high = self.rating_scale
+        return np.clip(est, low, high)
+
+    def score_many(self, user_ids, movie_ids, inner_items: Optional[np.ndarray] = None) -> np.ndarray:
+        """
+        Predict ratings of several users for the same movies.
+
+        One user-matrix x item-matrix product instead of a matrix-vector
+        product per user; each row equals ``score(user_id, movie_ids)``.
+
+        Args:
+            user_ids: Raw user IDs, one row each
+            movie_ids: Raw movie IDs to score, one column each
+            inner_items: ``inner_item_ids(movie_ids)``, if already known
+
+        Returns:
+            (len(user_ids), len(movie_ids)) array of clipped predicted ratings
+        """
+        if inner_items is None:
+            inner_items = self.inner_item_ids(movie_ids)
+        known_items = inner_items >= 0
+        users = [self.user_vector(user_id) for user_id in user_ids]
+
+        # Unknown users get a zero bias and zero factors, which add exactly 0.0
+        user_bias = np.array([user[0] if user is not None else 0.0 for user in users])
+        user_factors = np.zeros((len(users), self.qi.shape[1]))
+        for row, user in enumerate(users):
+            if user is not None:
+                user_factors[row] = user[1]
+
+        # Same accumulation order as ``score``: mean, user bias, item bias, dot
+        est = np.full((len(users), len(inner_items)), self.global_mean)
+        est += user_bias[:, None]
+        items = inner_items[known_items]
+        est[:, known_items] += self.bi[items]
+        est[:, known_items] += user_factors @ self.qi[items].T
+
+        low, high = self.rating_scale
+        return np.clip(est, low, high)
+
+
+def top_n_rounded(scores: np.ndarray, n: int, decimals: int = 2) -> np.ndarray:
+    """
+    Indices of the top N scores after rounding, highest first.
+
+    Equivalent to a stable ``sort(key=round(score, decimals), reverse=True)``
+    followed by ``[:n]``: ties on the rounded value keep their original order.
+    ``argpartition`` narrows the work down to the scores that can still make
+    the cut before the exact, Python-rounded sort.
+
+    Args:
+        scores: Raw scores
+        n: Number of indices to return
+        decimals: Rounding applied before ranking
+
+    Returns:
+        Array of indices into ``scores``
+    """
+    scores = np.asarray(scores, dtype=np.float64)
+    if n <= 0 or len(scores) == 0:
+        return np.empty(0, dtype=np.int64)
+
+    if n < len(scores):
+        top = np.argpartition(-scores, n - 1)[:n]
+        # Rounding moves a value by at most half a unit, so anything that can
+        # tie the n-th score after rounding lies within one unit of it
+        threshold = scores[top].min() - 10.0 ** -decimals
+        pool = np.flatnonzero(scores >= threshold)
+    else:
+        pool = np.arange(len(scores))
+
+    rounded = np.array([round(float(s), decimals) for s in scores[pool]])
+    order = np.lexsort((pool, -rounded))
+    return pool[order[:n]]
@@ -0,0 +1,137 @@
+"""Factor matrices published once in shared memory for multi-worker serving."""
+import json
+import os
+import time
+import numpy as np
+from multiprocessing import shared_memory
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple
+import sys
+
+# Add parent directory to path
+sys.path.append(str(Path(__file__).parent.parent.parent))
+
+from app.ml.artifacts import current_rss_mb, normalized_item_vectors
+from app.ml.scoring import FactorScorer
+
+# Environment variable holding the JSON spec; inherited by the server workers
+SHARED_MODEL_ENV = 'SHARED_MODEL_SPEC'
+
+# Blocks attached in this process, kept open for the lifetime of the arrays
+_attached_blocks: List[shared_memory.SharedMemory] = []
+
+
+class SharedModel:
+    """
+    Factor matrices, biases and id maps of a model placed in shared memory.
+
+    The serving parent loads the model once (artifact or pickle) and copies
+    its arrays into named blocks; each server worker maps the same blocks
+    read-only through ``attach_shared_model`` instead of loading, or
+    unpickling, its own copy.
+    """
+
+    def __init__(self, scorer: FactorScorer, info: Dict):
+        """
+        Copy a scorer's arrays into shared memory.
+
+        Args:
+            scorer: Loaded model
+            info: Load info of the model (source, path, version)
+        """
+        arrays = {
+            'pu': scorer.pu,
+            'qi': scorer.qi,
+            'bu': scorer.bu,
+            'bi': scorer.bi,
+            'user_ids': scorer.user_ids,
+            'item_ids': scorer.item_ids,
+            'user_order': scorer._user_order,
+            'item_order': scorer._item_order,
+            'item_vectors': scorer.item_vectors if scorer.item_vectors is not None
+                            else normalized_item_vectors(np.asarray(scorer.qi, dtype=np.float64)),
+        }
+        self.blocks = {}
+        self.spec = {
+            'version': info['version'],
+            'source': info['source'],
+            'path': info['path'],
+            'global_mean': scorer.global_mean,
+            'rating_scale': list(scorer.rating_scale),
+            'arrays': {}
+        }
+        for name, array in arrays.items():
+            array = np.ascontiguousarray(array)
+            block = shared_memory.SharedMemory(create=True, size=max(array.nbytes, 1))
+            np.ndarray(array.shape, dtype=array.dtype, buffer=block.buf)[:] = array
+            self.blocks[name] = block
+            self.spec['arrays'][name] = (block.name, list(array.shape), array.dtype.str)
+
+    @property
+    def nbytes(self) -> int:
+        return sum(block.size for block in self.blocks.values())
+
+    def export(self):
+        """Publish the spec to child processes through the environment."""
+        os.environ[SHARED_MODEL_ENV] = json.dumps(self.spec)
+
+    def close(self):
+        """Release and unlink the shared blocks."""
+        if os.environ.get(SHARED_MODEL_ENV) == json.dumps(self.spec):
+            del os.environ[SHARED_MODEL_ENV]
+        for block in self.blocks.values():
+            block.close()
+            block.unlink()
+        self.blocks = {}
+
+    def __enter__(self) -> 'SharedModel':
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+def shared_model_spec() -> Optional[Dict]:
+    """Spec published by the serving parent, or None outside shared serving."""
+    spec = os.environ.get(SHARED_MODEL_ENV)
+    return json.loads(spec) if spec else None
+
+
+def attach_shared_model(spec: Dict) -> Tuple[FactorScorer, Dict]:
+    """
+    Map a published model into this process without copying it.
+
+    The arrays are read-only views of the shared blocks; folded-in users
+    live in the scorer's per-process overrides.
+
+    Args:
+        spec: Spec from ``SharedModel.spec``
+
+    Returns:
+        (scorer, info) like ``load_scorer``
+    """
+    start = time.perf_counter()
+    arrays = {}
+    for name, (block_name, shape, dtype) in spec['arrays'].items():
+        block = shared_memory.SharedMemory(name=block_name)
+        _attached_blocks.append(block)
+        array = np.ndarray(tuple(shape), dtype=np.dtype(dtype), buffer=block.buf)
+        array.flags.writeable = False
+        arrays[name] = array
+
+    scorer = FactorScorer(
+        global_mean=spec['global_mean'],
+        bu=arrays['bu'], bi=arrays['bi'], pu=arrays['pu'], qi=arrays['qi'],
+        user_ids=arrays['user_ids'], item_ids=arrays['item_ids'],
+        rating_scale=tuple(spec['rating_scale']),
+        user_order=arrays['user_order'], item_order=arrays['item_order'],
+        item_vectors=arrays['item_vectors']
+    )
+    info = {
+        'source': 'shared-memory',
+        'path': spec['path'],
+        'version': spec['version'],
+        'load_ms': round((time.perf_counter() - start) * 1000, 2),
+        'rss_mb': current_rss_mb()
+    }
+    return scorer, info
@@ -0,0 +1,222 @@
+"""Item-to-item similarity index over SVD item factors."""
+import time
+import numpy as np
+from pathlib import Path
+from typing import Dict, List, Optional, Sequence, Tuple
+import sys
+
+# Add parent directory to path
+sys.path.append(str(Path(__file__).parent.parent.parent))
+
+
+class SimilarityIndex:
+    """
+    Cosine-similarity index over movie latent factors.
+
+    Item vectors are normalized once and kept in a contiguous float32 matrix,
+    so a query is a single matrix-vector product. Two modes are available:
+
+    - ``exact``: brute-force scoring of every item.
+    - ``lsh``: random-projection LSH. Each of ``n_tables`` hash tables buckets
+      items by the sign pattern of ``n_bits`` random hyperplanes; a query only
+      scores the items sharing a bucket (or a bucket one bit away) with it in
+      any table, then ranks those candidates exactly.
+    """
+
+    MODES = ('exact', 'lsh')
+
+    def __init__(self, vectors: np.ndarray, item_ids: Sequence, mode: str = 'exact',
+                 n_tables: int = 8, n_bits: Optional[int] = None, seed: int = 42,
+                 normalized: bool = False):
+        """
+        Build the index.
+
+        Args:
+            vectors: Item factor matrix (one row per item)
+            item_ids: Raw movie ids aligned with ``vectors``
+            mode: 'exact' or 'lsh'
+            n_tables: Number of LSH hash tables
+            n_bits: Hyperplanes per table (defaults to ~16 items per bucket)
+            seed: Random seed for the hyperplanes
+            normalized: ``vectors`` are already unit-length float32 rows and
+                are used as-is (e.g. memory-mapped from a model artifact)
+        """
+        if mode not in self.MODES:
+            raise ValueError(f"Unknown similarity mode '{mode}', expected one of {self.MODES}")
+
+        self.mode = mode
+        self.item_ids = np.asarray(item_ids)
+        if normalized:
+            self.vectors = vectors
+        else:
+            vectors = np.asarray(vectors, dtype=np.float32)
+            norms = np.linalg.norm(vectors, axis=1, keepdims=True)
+            norms[norms == 0] = 1.0
+            self.vectors = np.ascontiguousarray(vectors / norms, dtype=np.float32)
+
+        self._id_order = np.argsort(self.item_ids, kind='stable')
+        self._sorted_ids = self.item_ids[self._id_order]
+
+        if mode == 'lsh':
+            self._build_lsh(n_tables, n_bits, seed)
+
+    def __len__(self) -> int:
+        return len(self.item_ids)
+
+    def _build_lsh(self, n_tables: int, n_bits: Optional[int], seed: int):
+        """Hash every item into ``n_tables`` sorted bucket tables."""
+        n_items, dim = self.vectors.shape
+        if n_bits is None:
+            n_bits = int(np.clip(np.log2(max(n_items, 1) / 16), 1, 24))
+        self.n_tables = n_tables
+        self.n_bits = n_bits
+
+        rng = np.random.default_rng(seed)
+        self._planes = rng.standard_normal((n_tables, n_bits, dim)).astype(np.float32)
+        self._bit_values = (1 << np.arange(n_bits, dtype=np.int64))
+
+        self._table_order = []
+        self._table_codes = []
+        for t in range(n_tables):
+            codes = self._hash(self.vectors, t)
+            order = np.argsort(codes, kind='stable')
+            self._table_order.append(order)
+            self._table_codes.append(codes[order])
+
+    def _hash(self, vectors: np.ndarray, table: int) -> np.ndarray:
+        """Bucket codes of ``vectors`` in one table."""
+        bits = (vectors @ self._planes[table].T) > 0
+        return bits.astype(np.int64) @ self._bit_values
+
+    def _position(self, movie_id) -> Optional[int]:
+        """Row of a movie in the index, or None if it is not indexed."""
+        if len(self._sorted_ids) == 0:
+            return None
+        pos = int(np.searchsorted(self._sorted_ids, movie_id))
+        if pos < len(self._sorted_ids) and self._sorted_ids[pos] == movie_id:
+            return int(self._id_order[pos])
+        return None
+
+    def _candidates(self, query: np.ndarray) -> np.ndarray:
+        """Rows sharing a bucket, or a bucket one bit away, with the query."""
+        bits = (self._planes @ query) > 0
+        codes = bits.astype(np.int64) @ self._bit_values
+        flips = np.concatenate(([0], self._bit_values))
+        found = []
+        for t in range(self.n_tables):
+            probes = codes[t] ^ flips
+            table_codes = self._table_codes[t]
+            starts = np.searchsorted(table_codes, probes, side='left')
+            ends = np.searchsorted(table_codes, probes, side='right')
+            for start, end in zip(starts.tolist(), ends.tolist()):
+                if end > start:
+                    found.append(self._table_order[t][start:end])
+        if not found:
+            return np.empty(0, dtype=np.int64)
+        return np.unique(np.concatenate(found))
+
+    def query(self, movie_id, k: int = 10, mode: Optional[str] = None) -> List[Tuple[int, float]]:
+        """
+        Most similar movies to ``movie_id``.
+
+        Args:
+            movie_id: Raw movie ID
+            k: Number of neighbours (the movie itself is excluded)
+            mode: Override the index mode for this query ('exact' or 'lsh')
+
+        Returns:
+            List of (movie_id, cosine similarity), most similar first.
+            Empty if the movie is not in the index.
+        """
+        row = self._position(movie_id)
+        if row is None or k <= 0:
+            return []
+        mode = mode or self.mode
+        query = self.vectors[row]
+
+        if mode == 'lsh' and hasattr(self, '_planes'):
+            rows = self._candidates(query)
+            rows = rows[rows != row]
+            if len(rows) < k:
+                # Sparse buckets: fall back to scoring everything
+                rows = None
+        else:
+            rows = None
+
+        if rows is None:
+            sims = self.vectors @ query
+            sims[row] = -np.inf
+            rows = np.arange(len(sims))
+            available = len(sims) - 1
+        else:
+            sims = self.vectors[rows] @ query
+            available = len(rows)
+
+        k = min(k, available)
+        if k <= 0:
+            return []
+        top = np.argpartition(-sims, k - 1)[:k]
+        top = top[np.lexsort((rows[top], -sims[top]))]
+        return [(int(self.item_ids[rows[i]]), float(sims[i])) for i in top]
+
+
+def evaluate_index(index: SimilarityIndex, k: int = 10, n_queries: int = 200,
+                   seed: int = 0) -> Dict[str, Dict[str, float]]:
+    """
+    Recall@k and latency of each index mode against exact brute force.
+
+    Args:
+        index: Index to evaluate (must be built in 'lsh' mode to report it)
+        k: Neighbours per query
+        n_queries: Number of random query movies
+        seed: Random seed for picking the queries
+
+    Returns:
+        Dictionary keyed by mode with recall, p50/p95/max latency in ms
+    """
+    rng = np.random.default_rng(seed)
+    queries = rng.choice(index.item_ids, size=min(n_queries, len(index)), replace=False)
+    modes = ['exact'] + (['lsh'] if index.mode == 'lsh' else [])
+
+    exact = {}
+    report = {}
+    for mode in modes:
+        latencies = []
+        recalls = []
+        for movie_id in queries:
+            start = time.perf_counter()
+            result = index.query(movie_id, k, mode=mode)
+            latencies.append((time.perf_counter() - start) * 1000)
+            found = {mid for mid, _ in result}
+            if mode == 'exact':
+                exact[movie_id] = found
+            truth = exact[movie_id]
+            recalls.append(len(found & truth) / len(truth) if truth else 1.0)
+        report[mode] = {
+            'recall_at_k': float(np.mean(recalls)),
+            'p50_ms': float(np.percentile(latencies, 50)),
+            'p95_ms': float(np.percentile(latencies, 95)),
+            'max_ms': float(np.max(latencies)),
+        }
+    return report
+
+
+if __name__ == "__main__":
+    from app.ml.recommender import get_recommender
+
+    recommender = get_recommender()
+    qi = recommender.scorer.qi
+    item_ids = recommender.scorer.item_ids
+
+    print(f"🔎 Similarity index report ({len(item_ids):,} movies, {qi.shape[1]} factors)")
+    print("=" * 60)
+    start = time.perf_counter()
+    lsh_index = SimilarityIndex(qi, item_ids, mode='lsh')
+    build_ms = (time.perf_counter() - start) * 1000
+    print(f"LSH: {lsh_index.n_tables} tables x {lsh_index.n_bits} bits, built in {build_ms:.1f} ms")
+    for k in (10, 50):
+        print(f"\nk={k}")
+        for mode, stats in evaluate_index(lsh_index, k=k).items():
+            print(f"   {mode:<6} recall@{k}: {stats['recall_at_k']:.3f}  "
+                  f"p50: {stats['p50_ms']:.3f} ms  p95: {stats['p95_ms']:.3f} ms  "
+                  f"max: {stats['max_ms']:.3f} ms")
@@ -1,8 +1,10 @@
 """SVD model training script."""
+import argparse
 import pickle
+import time
 from surprise import Dataset, Reader, SVD
 from surprise.model_selection import cross_validate, train_test_split
-import sqlite3
+import numpy as np
 import pandas as pd
 from pathlib import Path
 import sys
@@ -10,14 +12,28 @@ import sys
 # Add parent directory to path
 sys.path.append(str(Path(__file__).parent.parent.parent))
 
+from app.ml.artifacts import export_svd, save_scorer
+from app.ml.factorization import RatingMatrix, build_training_matrix, evaluate, train_als, train_sgd
+from app.ml.tuning import print_leaderboard, save_leaderboard, tune_hyperparameters
 
-def train_svd_model(db_path='data/database.db', model_path='data/trained_model.pkl'):
+NATIVE_TRAINERS = {
+    'als': train_als,
+    'sgd': train_sgd,
+}
+
+
+def train_svd_model(db_path='data/database.db', model_path='data/trained_model.pkl',
+                    artifact_dir='data/model', params=None, cv_metrics=None):
     """
     Train SVD collaborative filtering model.
     
     Args:
         db_path: Path to SQLite database
         model_path: Path to save trained model
+        artifact_dir: Directory to export the memory-mapped model artifact to
+        params: Hyperparameters (n_factors, n_epochs, lr, reg) overriding the defaults
+        cv_metrics: Cross-validated RMSE/MAE of ``params`` from a tuning run;
+            skips the 5-fold cross-validation step
         
     Returns:
         Trained SVD algorithm
@@ -35,9 +51,14 @@ def train_svd_model(db_path='data/database.db', model_path='data/trained_model.p
         print("Please run 'python scripts/load_movielens.py' first")
         return None
     
-    conn = sqlite3.connect(db_full_path)
-    ratings_df = pd.read_sql_query("SELECT user_id, movie_id, rating FROM ratings", conn)
-    conn.close()
+    # Streamed in chunks into int32/float32 arrays (no float64 frame from read_sql)
+    matrix = RatingMatrix.from_database(db_full_path)
+    ratings_df = pd.DataFrame({
+        'user_id': matrix.user_ids.astype(np.int32)[matrix.user_idx],
+        'movie_id': matrix.item_ids.astype(np.int32)[matrix.item_idx],
+        'rating': matrix.ratings
+    })
+    del matrix
     
     print(f"   ✓ Loaded {len(ratings_df):,} ratings")
     print(f"   ✓ {ratings_df['user_id'].nunique():,} unique users")
@@ -47,6 +68,7 @@ def train_svd_model(db_path='data/database.db', model_path='data/trained_model.p
     print("\n2. Preparing data for Surprise library...")
     reader = Reader(rating_scale=(1, 5))
     data = Dataset.load_from_df(ratings_df[['user_id', 'movie_id', 'rating']], reader)
+    del ratings_df
     
     # Split data for evaluation
     trainset, testset = train_test_split(data, test_size=0.2, random_state=42)
@@ -54,18 +76,19 @@ def train_svd_model(db_path='data/database.db', model_path='data/trained_model.p
     print(f"   ✓ Test set: {len(testset):,} ratings")
     
     # Initialize SVD algorithm
+    params = {'n_factors': 100, 'n_epochs': 20, 'lr': 0.005, 'reg': 0.02, **(params or {})}
     print("\n3. Initializing SVD algorithm...")
     print("   Parameters:")
-    print("   - Latent factors: 100")
-    print("   - Epochs: 20")
-    print("   - Learning rate: 0.005")
-    print("   - Regularization: 0.02")
+    print(f"   - Latent factors: {params['n_factors']}")
+    print(f"   - Epochs: {params['n_epochs']}")
+    print(f"   - Learning rate: {params['lr']}")
+    print(f"   - Regularization: {params['reg']}")
     
     algo = SVD(
-        n_factors=100,      # Number of latent factors
-        n_epochs=20,        # Number of iterations
-        lr_all=0.005,       # Learning rate
-        reg_all=0.02,       # Regularization term
+        n_factors=params['n_factors'],  # Number of latent factors
+        n_epochs=params['n_epochs'],    # Number of iterations
+        lr_all=params['lr'],            # Learning rate
+        reg_all=params['reg'],          # Regularization term
         random_state=42
     )
     
@@ -75,11 +98,16 @@ def train_svd_model(db_path='data/database.db', model_path='data/trained_model.p
     print("   ✓ Training complete")
     
     # Cross-validate
-    print("\n5. Running 5-fold cross-validation...")
-    results = cross_validate(algo, data, measures=['RMSE', 'MAE'], cv=5, verbose=True)
-    
-    avg_rmse = results['test_rmse'].mean()
-    avg_mae = results['test_mae'].mean()
+    if cv_metrics is not None:
+        print("\n5. Using cross-validation results from tuning...")
+        avg_rmse = cv_metrics['rmse']
+        avg_mae = cv_metrics['mae']
+    else:
+        print("\n5. Running 5-fold cross-validation...")
+        results = cross_validate(algo, data, measures=['RMSE', 'MAE'], cv=5, verbose=True)
+        
+        avg_rmse = results['test_rmse'].mean()
+        avg_mae = results['test_mae'].mean()
     
     print(f"\n📊 Model Performance:")
     print(f"   RMSE: {avg_rmse:.4f}")
@@ -100,6 +128,16 @@ def train_svd_model(db_path='data/database.db', model_path='data/trained_model.p
     
     print(f"   ✓ Model saved ({model_full_path.stat().st_size / 1024 / 1024:.2f} MB)")
     
+    # Export factors for the API (memory-mapped, no pickle)
+    print(f"\n8. Exporting model artifact to {artifact_dir}...")
+    version_dir = export_svd(algo, base_dir / artifact_dir, metadata={
+        'params': params,
+        'rmse': float(avg_rmse),
+        'mae': float(avg_mae)
+    })
+    artifact_mb = sum(f.stat().st_size for f in version_dir.iterdir()) / 1024 / 1024
+    print(f"   ✓ Artifact {version_dir.name} saved ({artifact_mb:.2f} MB)")
+    
     print("\n" + "=" * 60)
     print("✅ Model training complete!")
     print("=" * 60)
@@ -107,6 +145,145 @@ def train_svd_model(db_path='data/database.db', model_path='data/trained_model.p
     return algo
 
 
+def train_native_model(trainer='als', db_path='data/database.db', artifact_dir='data/model',
+                       matrix_dir='data/training', **params):
+    """
+    Train a factorization model with the NumPy trainers, without Surprise.
+
+    Fits once on an 80/20 holdout split for RMSE/MAE, then once on the full
+    data, instead of the fit + 5-fold CV + full fit of ``train_svd_model``.
+    Only the memory-mapped artifact is written; there is no pickle.
+
+    Ratings are streamed from the database into a compact on-disk matrix
+    (12 bytes per rating) that training memory-maps, so the loader never
+    holds more than one chunk on top of the final arrays.
+
+    Args:
+        trainer: 'als' or 'sgd'
+        db_path: Path to SQLite database
+        artifact_dir: Directory to write the model artifact to
+        matrix_dir: Directory for the on-disk training matrix
+        **params: Hyperparameters passed to the trainer
+
+    Returns:
+        Trained FactorScorer
+    """
+    train_fn = NATIVE_TRAINERS[trainer]
+    print(f"🤖 Training {trainer.upper()} Recommendation Model...")
+    print("=" * 60)
+
+    print("\n1. Loading rating data...")
+    base_dir = Path(__file__).parent.parent.parent
+    db_full_path = base_dir / db_path
+
+    if not db_full_path.exists():
+        print(f"❌ Error: Database not found at {db_full_path}")
+        print("Please run 'python scripts/load_movielens.py' first")
+        return None
+
+    matrix = RatingMatrix.load(build_training_matrix(db_full_path, base_dir / matrix_dir))
+    print(f"   ✓ Loaded {matrix.n_ratings:,} ratings")
+    print(f"   ✓ {matrix.n_users:,} unique users")
+    print(f"   ✓ {matrix.n_items:,} unique movies")
+
+    print("\n2. Evaluating on a holdout split...")
+    trainset, testset = matrix.train_test_split(test_size=0.2, random_state=42)
+    print(f"   ✓ Training set: {trainset.n_ratings:,} ratings")
+    print(f"   ✓ Test set: {testset.n_ratings:,} ratings")
+    if params:
+        print(f"   Parameters: {params}")
+
+    start = time.perf_counter()
+    model = train_fn(trainset, verbose=True, **params)
+    metrics = evaluate(model, testset)
+    print(f"   ✓ Fit in {time.perf_counter() - start:.2f}s")
+
+    print(f"\n📊 Model Performance:")
+    print(f"   RMSE: {metrics['rmse']:.4f}")
+    print(f"   MAE:  {metrics['mae']:.4f}")
+
+    print("\n3. Training on full dataset for production...")
+    start = time.perf_counter()
+    model = train_fn(matrix, verbose=True, **params)
+    print(f"   ✓ Fit in {time.perf_counter() - start:.2f}s")
+
+    print(f"\n4. Exporting model artifact to {artifact_dir}...")
+    version_dir = save_scorer(model, base_dir / artifact_dir, metadata={
+        'trainer': trainer,
+        'params': params,
+        **metrics
+    })
+    artifact_mb = sum(f.stat().st_size for f in version_dir.iterdir()) / 1024 / 1024
+    print(f"   ✓ Artifact {version_dir.name} saved ({artifact_mb:.2f} MB)")
+
+    print("\n" + "=" * 60)
+    print("✅ Model training complete!")
+    print("=" * 60)
+
+    return model
+
+
+def tune_and_train(trainer='surprise', db_path='data/database.db', n_folds=5, n_workers=None,
+                   grid=None):
+    """
+    Search hyperparameters in parallel, then train the best configuration.
+
+    Args:
+        trainer: 'surprise', 'als' or 'sgd'
+        db_path: Path to SQLite database
+        n_folds: Cross-validation folds per configuration
+        n_workers: Worker processes for the search (defaults to CPU count)
+        grid: {parameter: [values]} to search (defaults per trainer)
+
+    Returns:
+        Trained model from the best configuration
+    """
+    print(f"🔍 Tuning {trainer} hyperparameters...")
+    print("=" * 60)
+    base_dir = Path(__file__).parent.parent.parent
+    db_full_path = base_dir / db_path
+    if not db_full_path.exists():
+        print(f"❌ Error: Database not found at {db_full_path}")
+        print("Please run 'python scripts/load_movielens.py' first")
+        return None
+
+    matrix = RatingMatrix.load(build_training_matrix(db_full_path, base_dir / 'data' / 'training'))
+    start = time.perf_counter()
+    leaderboard = tune_hyperparameters(matrix, trainer, grid, n_folds, n_workers)
+    print(f"   ✓ Search finished in {time.perf_counter() - start:.1f}s")
+    print_leaderboard(leaderboard)
+
+    leaderboard_path = base_dir / 'data' / 'tuning' / f'leaderboard_{trainer}.json'
+    save_leaderboard(leaderboard, leaderboard_path, trainer, n_folds)
+    print(f"\n   ✓ Leaderboard saved to {leaderboard_path}")
+
+    best = leaderboard[0]
+    print(f"   ✓ Best: {best['params']} (RMSE {best['rmse']:.4f})\n")
+    if trainer == 'surprise':
+        return train_svd_model(db_path=db_path, params=best['params'], cv_metrics=best)
+    return train_native_model(trainer, db_path=db_path, **best['params'])
+
+
 if __name__ == "__main__":
-    model = train_svd_model()
+    parser = argparse.ArgumentParser(description="Train the recommendation model")
+    parser.add_argument('--trainer', choices=['surprise', *NATIVE_TRAINERS], default='surprise',
+                        help="Surprise SVD (default) or a native NumPy trainer")
+    parser.add_argument('--factors', type=int, help="Number of latent factors")
+    parser.add_argument('--epochs', type=int, help="Number of epochs")
+    parser.add_argument('--reg', type=float, help="Regularization")
+    parser.add_argument('--tune', action='store_true',
+                        help="Cross-validate a hyperparameter grid in parallel and train the best configuration")
+    parser.add_argument('--folds', type=int, default=5, help="Cross-validation folds when tuning")
+    parser.add_argument('--workers', type=int, help="Worker processes when tuning (default: CPU count)")
+    args = parser.parse_args()
+
+    params = {name: value for name, value in (
+        ('n_factors', args.factors), ('n_epochs', args.epochs), ('reg', args.reg)
+    ) if value is not None}
+    if args.tune:
+        model = tune_and_train(args.trainer, n_folds=args.folds, n_workers=args.workers)
+    elif args.trainer == 'surprise':
+        model = train_svd_model(params=params)
+    else:
+        model = train_native_model(args.trainer, **params)
     sys.exit(0 if model is not None else 1)
@@ -0,0 +1,283 @@
+"""Parallel cross-validated hyperparameter search."""
+import argparse
+import itertools
+import json
+import os
+import time
+import numpy as np
+import pandas as pd
+from concurrent.futures import ProcessPoolExecutor
+from multiprocessing import shared_memory
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple
+import sys
+
+# Add parent directory to path
+sys.path.append(str(Path(__file__).parent.parent.parent))
+
+from app.ml.factorization import RatingMatrix, evaluate, train_als, train_sgd
+from app.ml.scoring import FactorScorer
+
+# Searched when no grid is given; parameter names follow the native trainers
+DEFAULT_GRIDS = {
+    'surprise': {'n_factors': [50, 100, 150], 'n_epochs': [20, 30], 'lr': [0.005, 0.01], 'reg': [0.02, 0.05]},
+    'sgd': {'n_factors': [50, 100, 150], 'n_epochs': [20, 30], 'lr': [0.005, 0.01], 'reg': [0.02, 0.05]},
+    'als': {'n_factors': [50, 100, 150], 'n_epochs': [3, 5, 8], 'reg': [0.02, 0.05, 0.1]},
+}
+
+# Rating arrays shared with the pool; views are set up per worker by _attach_worker
+_SHARED_ARRAYS = ('user_idx', 'item_idx', 'ratings', 'folds')
+_worker_state = {}
+
+
+def parameter_grid(grid: Dict[str, List]) -> List[Dict]:
+    """Every combination of a {name: values} grid, in a stable order."""
+    names = sorted(grid)
+    return [dict(zip(names, values)) for values in itertools.product(*(grid[name] for name in names))]
+
+
+class SharedRatings:
+    """
+    Rating arrays and fold assignments placed in shared memory.
+
+    The parent copies the arrays in once; pool workers map the same blocks
+    by name instead of receiving a pickled copy of the ratings per task.
+    """
+
+    def __init__(self, matrix: RatingMatrix, n_folds: int, random_state: int = 42):
+        """
+        Copy a rating matrix into shared memory.
+
+        Args:
+            matrix: Ratings to share
+            n_folds: Number of cross-validation folds
+            random_state: Seed for the fold assignment
+        """
+        rng = np.random.default_rng(random_state)
+        folds = (rng.permutation(matrix.n_ratings) % n_folds).astype(np.int8)
+        arrays = {
+            'user_idx': matrix.user_idx,
+            'item_idx': matrix.item_idx,
+            'ratings': matrix.ratings,
+            'folds': folds,
+        }
+        self.blocks = {}
+        self.spec = {
+            'user_ids': matrix.user_ids,
+            'item_ids': matrix.item_ids,
+            'rating_scale': matrix.rating_scale,
+            'arrays': {}
+        }
+        for name in _SHARED_ARRAYS:
+            array = arrays[name]
+            block = shared_memory.SharedMemory(create=True, size=max(array.nbytes, 1))
+            np.ndarray(array.shape, dtype=array.dtype, buffer=block.buf)[:] = array
+            self.blocks[name] = block
+            self.spec['arrays'][name] = (block.name, array.shape, array.dtype.str)
+
+    def close(self):
+        """Release and unlink the shared blocks."""
+        for block in self.blocks.values():
+            block.close()
+            block.unlink()
+        self.blocks = {}
+
+    def __enter__(self) -> 'SharedRatings':
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+def _attach_worker(spec: Dict):
+    """Pool initializer: map the shared rating arrays into this process."""
+    blocks = {}
+    arrays = {}
+    for name, (block_name, shape, dtype) in spec['arrays'].items():
+        blocks[name] = shared_memory.SharedMemory(name=block_name)
+        arrays[name] = np.ndarray(shape, dtype=np.dtype(dtype), buffer=blocks[name].buf)
+    _worker_state.update(spec=spec, blocks=blocks, arrays=arrays)
+
+
+def _fold_matrices(fold: int) -> Tuple[RatingMatrix, RatingMatrix]:
+    """Train/test matrices of one fold, built from the shared arrays."""
+    arrays = _worker_state['arrays']
+    spec = _worker_state['spec']
+    test = arrays['folds'] == fold
+
+    def take(mask):
+        return RatingMatrix(
+            arrays['user_idx'][mask], arrays['item_idx'][mask], arrays['ratings'][mask],
+            spec['user_ids'], spec['item_ids'], spec['rating_scale']
+        )
+    return take(~test), take(test)
+
+
+def _align(scorer: FactorScorer, matrix: RatingMatrix) -> FactorScorer:
+    """
+    Re-index a scorer's factors onto a rating matrix's user/item indices.
+
+    Users and items the scorer does not know get zero biases and factors,
+    which is how ``SVD.predict`` treats them.
+    """
+    def gather(inner, values):
+        out = np.zeros((len(inner),) + values.shape[1:])
+        known = inner >= 0
+        out[known] = values[inner[known]]
+        return out
+
+    users = scorer.inner_user_ids(matrix.user_ids)
+    items = scorer.inner_item_ids(matrix.item_ids)
+    return FactorScorer(
+        scorer.global_mean, gather(users, scorer.bu), gather(items, scorer.bi),
+        gather(users, scorer.pu), gather(items, scorer.qi),
+        matrix.user_ids, matrix.item_ids, rating_scale=scorer.rating_scale
+    )
+
+
+def fit_model(trainer: str, matrix: RatingMatrix, params: Dict, n_jobs: Optional[int] = None) -> FactorScorer:
+    """
+    Fit one configuration and return it as a FactorScorer on ``matrix``'s indices.
+
+    Args:
+        trainer: 'surprise', 'sgd' or 'als'
+        matrix: Training ratings
+        params: n_factors / n_epochs / lr / reg
+        n_jobs: Threads for ALS
+    """
+    if trainer == 'als':
+        return train_als(matrix, n_jobs=n_jobs, **params)
+    if trainer == 'sgd':
+        return train_sgd(matrix, **params)
+
+    from surprise import Dataset, Reader, SVD
+    df = pd.DataFrame({
+        'user_id': matrix.user_ids[matrix.user_idx],
+        'movie_id': matrix.item_ids[matrix.item_idx],
+        'rating': matrix.ratings.astype(np.float64)
+    })
+    data = Dataset.load_from_df(df, Reader(rating_scale=matrix.rating_scale))
+    algo = SVD(
+        n_factors=params.get('n_factors', 100),
+        n_epochs=params.get('n_epochs', 20),
+        lr_all=params.get('lr', 0.005),
+        reg_all=params.get('reg', 0.02),
+        random_state=42
+    )
+    algo.fit(data.build_full_trainset())
+    return _align(FactorScorer.from_svd(algo), matrix)
+
+
+def _run_task(trainer: str, config: int, params: Dict, fold: int) -> Dict:
+    """Fit and score one (configuration, fold) pair inside a worker."""
+    train, test = _fold_matrices(fold)
+    start = time.perf_counter()
+    model = fit_model(trainer, train, params, n_jobs=1)
+    fit_time = time.perf_counter() - start
+    return {'config': config, 'fold': fold, 'fit_time': fit_time, **evaluate(model, test)}
+
+
+def tune_hyperparameters(matrix: RatingMatrix, trainer: str = 'surprise', grid: Optional[Dict] = None,
+                         n_folds: int = 5, n_workers: Optional[int] = None,
+                         random_state: int = 42) -> List[Dict]:
+    """
+    Cross-validate every configuration of a grid on a process pool.
+
+    Each (configuration, fold) pair is an independent task, so both folds
+    and configurations run in parallel. Ratings and fold assignments live in
+    shared memory; workers build their fold's arrays from it locally.
+
+    Args:
+        matrix: All ratings
+        trainer: 'surprise', 'sgd' or 'als'
+        grid: {parameter: [values]} (defaults to ``DEFAULT_GRIDS[trainer]``)
+        n_folds: Number of cross-validation folds
+        n_workers: Worker processes (defaults to CPU count)
+        random_state: Seed for the fold assignment
+
+    Returns:
+        Leaderboard sorted by mean RMSE: one dict per configuration with
+        params, rmse, rmse_std, mae and mean fit_time in seconds
+    """
+    configs = parameter_grid(grid or DEFAULT_GRIDS[trainer])
+    n_workers = n_workers or os.cpu_count() or 1
+    print(f"   Searching {len(configs)} configurations x {n_folds} folds on {n_workers} workers...")
+
+    results = {config: [] for config in range(len(configs))}
+    start = time.perf_counter()
+    with SharedRatings(matrix, n_folds, random_state) as shared:
+        with ProcessPoolExecutor(max_workers=n_workers, initializer=_attach_worker,
+                                 initargs=(shared.spec,)) as pool:
+            futures = [
+                pool.submit(_run_task, trainer, config, params, fold)
+                for config, params in enumerate(configs)
+                for fold in range(n_folds)
+            ]
+            for done, future in enumerate(futures, 1):
+                result = future.result()
+                results[result['config']].append(result)
+                if done % n_folds == 0:
+                    print(f"   ✓ {done}/{len(futures)} fits ({time.perf_counter() - start:.1f}s)")
+
+    leaderboard = []
+    for config, params in enumerate(configs):
+        folds = results[config]
+        rmse = np.array([fold['rmse'] for fold in folds])
+        leaderboard.append({
+            'params': params,
+            'rmse': float(rmse.mean()),
+            'rmse_std': float(rmse.std()),
+            'mae': float(np.mean([fold['mae'] for fold in folds])),
+            'fit_time': float(np.mean([fold['fit_time'] for fold in folds]))
+        })
+    leaderboard.sort(key=lambda entry: entry['rmse'])
+    return leaderboard
+
+
+def print_leaderboard(leaderboard: List[Dict], limit: int = 10):
+    """Print the best configurations as a table."""
+    print(f"\n   {'#':>3}  {'RMSE':>7} {'± std':>7} {'MAE':>7} {'fit (s)':>8}  params")
+    for rank, entry in enumerate(leaderboard[:limit], 1):
+        params = ', '.join(f"{name}={value}" for name, value in entry['params'].items())
+        print(f"   {rank:>3}  {entry['rmse']:7.4f} {entry['rmse_std']:7.4f} "
+              f"{entry['mae']:7.4f} {entry['fit_time']:8.2f}  {params}")
+
+
+def save_leaderboard(leaderboard: List[Dict], output_path: Path, trainer: str, n_folds: int):
+    """Write the full leaderboard as JSON."""
+    output_path = Path(output_path)
+    output_path.parent.mkdir(parents=True, exist_ok=True)
+    with open(output_path, 'w') as f:
+        json.dump({'trainer': trainer, 'n_folds': n_folds, 'leaderboard': leaderboard}, f, indent=2)
+
+
+def _parse_values(text: Optional[str], cast) -> Optional[List]:
+    return [cast(value) for value in text.split(',')] if text else None
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Cross-validated hyperparameter search")
+    parser.add_argument('--trainer', choices=sorted(DEFAULT_GRIDS), default='surprise')
+    parser.add_argument('--folds', type=int, default=5, help="Cross-validation folds")
+    parser.add_argument('--workers', type=int, help="Worker processes (default: CPU count)")
+    parser.add_argument('--factors', help="Comma-separated latent factor counts")
+    parser.add_argument('--epochs', help="Comma-separated epoch counts")
+    parser.add_argument('--lr', help="Comma-separated learning rates")
+    parser.add_argument('--reg', help="Comma-separated regularization values")
+    args = parser.parse_args()
+
+    base_dir = Path(__file__).parent.parent.parent
+    grid = dict(DEFAULT_GRIDS[args.trainer])
+    for name, values in (('n_factors', _parse_values(args.factors, int)),
+                         ('n_epochs', _parse_values(args.epochs, int)),
+                         ('lr', _parse_values(args.lr, float)),
+                         ('reg', _parse_values(args.reg, float))):
+        if values and name in grid:
+            grid[name] = values
+
+    matrix = RatingMatrix.from_database(base_dir / 'data' / 'database.db')
+    leaderboard = tune_hyperparameters(matrix, args.trainer, grid, args.folds, args.workers)
+    print_leaderboard(leaderboard)
+    output_path = base_dir / 'data' / 'tuning' / f'leaderboard_{args.trainer}.json'
+    save_leaderboard(leaderboard, output_path, args.trainer, args.folds)
+    print(f"\n✓ Leaderboard saved to {output_path}")
@@ -1,5 +1,5 @@
 """Rating database model."""
-from sqlalchemy import Column, Integer, Float, ForeignKey, DateTime
+from sqlalchemy import Column, DDL, Integer, Float, ForeignKey, DateTime, Index, event
 from sqlalchemy.sql import func
 from app.database import Base
 
@@ -14,3 +14,45 @@ class Rating(Base):
     movie_id = Column(Integer, ForeignKey("movies.movie_id"), nullable=False, index=True)
     rating = Column(Float, nullable=False)  # 1-5 stars
     timestamp = Column(DateTime(timezone=True), server_default=func.now())
+    
+    __table_args__ = (
+        # A user's ratings newest first, for keyset pagination
+        Index('ix_ratings_user_timestamp', 'user_id', 'timestamp', 'rating_id'),
+    )
+
+
+class UserRatingVersion(Base):
+    """
+    When each user's ratings last changed, as a database-wide increasing version.
+    
+    Maintained by triggers on ``ratings``, so every insert, update and
+    delete counts, whichever worker or tool made it. Precompute snapshots
+    record the highest version they saw; a user whose version is above
+    it has changed since.
+    """
+    
+    __tablename__ = "user_rating_versions"
+    
+    user_id = Column(Integer, primary_key=True)
+    version = Column(Integer, nullable=False, index=True)
+
+
+def _bump_version(user_id: str) -> str:
+    return (
+        f"INSERT OR REPLACE INTO user_rating_versions (user_id, version) "
+        f"VALUES ({user_id}, (SELECT COALESCE(MAX(version), 0) + 1 FROM user_rating_versions));"
+    )
+
+
+RATING_VERSION_TRIGGERS = [
+    f"CREATE TRIGGER IF NOT EXISTS ratings_version_insert AFTER INSERT ON ratings "
+    f"BEGIN {_bump_version('NEW.user_id')} END",
+    f"CREATE TRIGGER IF NOT EXISTS ratings_version_update AFTER UPDATE ON ratings "
+    f"BEGIN {_bump_version('OLD.user_id')} {_bump_version('NEW.user_id')} END",
+    f"CREATE TRIGGER IF NOT EXISTS ratings_version_delete AFTER DELETE ON ratings "
+    f"BEGIN {_bump_version('OLD.user_id')} END",
+]
+
+# Runs on every create_all, so databases created before the triggers get them too
+for _trigger in RATING_VERSION_TRIGGERS:
+    event.listen(Base.metadata, 'after_create', DDL(_trigger).execute_if(dialect='sqlite'))
@@ -0,0 +1,201 @@
+"""Incremental movie rating statistics and their periodic reconciliation."""
+import threading
+import time
+from typing import Dict, Optional, Tuple
+from sqlalchemy import bindparam, case, func, text, update
+from sqlalchemy.engine import Engine
+from sqlalchemy.orm import Session
+from app.catalog import get_catalog
+from app.config import settings
+from app.database import engine
+from app.models.movie import Movie
+
+# Movies whose stored stats differ from the ratings table
+DRIFT_QUERY = """
+SELECT m.movie_id, COALESCE(s.avg_rating, 0.0), COALESCE(s.rating_count, 0)
+FROM movies m
+LEFT JOIN (
+    SELECT movie_id, AVG(rating) AS avg_rating, COUNT(*) AS rating_count
+    FROM ratings
+    GROUP BY movie_id
+) s ON s.movie_id = m.movie_id
+WHERE COALESCE(m.rating_count, 0) != COALESCE(s.rating_count, 0)
+   OR ABS(COALESCE(m.avg_rating, 0.0) - COALESCE(s.avg_rating, 0.0)) > :tolerance
+"""
+
+
+def _stats_update(rating_delta, count_delta):
+    """``UPDATE movies`` adding ``rating_delta`` to the rating sum and ``count_delta`` to the count."""
+    movies = Movie.__table__
+    count = func.coalesce(movies.c.rating_count, 0)
+    new_count = count + count_delta
+    return update(movies).values(
+        rating_count=new_count,
+        avg_rating=case(
+            (new_count <= 0, 0.0),
+            else_=(func.coalesce(movies.c.avg_rating, 0.0) * count + rating_delta) / new_count
+        )
+    )
+
+
+def apply_rating_change(db: Session, movie_id: int, rating_delta: float, count_delta: int) -> Optional[Tuple[float, int]]:
+    """
+    Update a movie's average rating and count for one rating write, in O(1).
+
+    Runs as a single ``UPDATE`` in the caller's transaction, so the stats
+    commit together with the rating itself. The new average is derived
+    from the old one (``avg * count`` is the running sum), and the update
+    reads the current row values, so concurrent writers never overwrite
+    each other's changes.
+
+    Args:
+        db: Session holding the rating write
+        movie_id: Movie ID
+        rating_delta: Change of the movie's rating sum (the new rating,
+            minus the old one for updates, negated for deletes)
+        count_delta: Change of the rating count (+1, 0 or -1)
+
+    Returns:
+        The movie's new (avg_rating, rating_count), or None if it does not exist
+    """
+    db.execute(_stats_update(rating_delta, count_delta).where(Movie.__table__.c.movie_id == movie_id))
+    return db.query(Movie.avg_rating, Movie.rating_count).filter(Movie.movie_id == movie_id).first()
+
+
+def apply_rating_changes(db: Session, changes: Dict[int, Tuple[float, int]]) -> Dict[int, Tuple[float, int]]:
+    """
+    ``apply_rating_change`` for many movies with one batched statement.
+
+    Args:
+        db: Session holding the rating writes
+        changes: movie_id -> (rating sum delta, count delta), summed over
+            all writes to the movie
+
+    Returns:
+        movie_id -> new (avg_rating, rating_count)
+    """
+    if not changes:
+        return {}
+    statement = _stats_update(bindparam('rating_delta'), bindparam('count_delta'))\
+        .where(Movie.__table__.c.movie_id == bindparam('target_id'))
+    db.execute(statement, [
+        {'target_id': movie_id, 'rating_delta': rating_delta, 'count_delta': count_delta}
+        for movie_id, (rating_delta, count_delta) in changes.items()
+    ])
+    rows = db.query(Movie.movie_id, Movie.avg_rating, Movie.rating_count)\
+        .filter(Movie.movie_id.in_(list(changes))).all()
+    return {movie_id: (avg_rating, rating_count) for movie_id, avg_rating, rating_count in rows}
+
+
+def reconcile_movie_stats(bind: Engine = engine, tolerance: float = 1e-9) -> Dict:
+    """
+    Recompute movie stats from the ratings table and fix the ones that drifted.
+
+    Incremental updates accumulate floating-point error, and imports that
+    write ratings directly bypass them; this brings every movie back to
+    the exact ``AVG``/``COUNT`` of its ratings, and applies the fixes to
+    the in-memory catalog.
+
+    Args:
+        bind: Engine of the database to reconcile
+        tolerance: Largest average difference left alone
+
+    Returns:
+        Number of movies checked and fixed, and the run time
+    """
+    start = time.perf_counter()
+    with bind.begin() as conn:
+        drifted = conn.execute(text(DRIFT_QUERY), {'tolerance': tolerance}).fetchall()
+        if drifted:
+            conn.execute(
+                text("UPDATE movies SET avg_rating = :avg_rating, rating_count = :rating_count "
+                     "WHERE movie_id = :movie_id"),
+                [{'movie_id': movie_id, 'avg_rating': avg_rating, 'rating_count': rating_count}
+                 for movie_id, avg_rating, rating_count in drifted]
+            )
+        checked = conn.execute(text("SELECT COUNT(*) FROM movies")).scalar()
+    catalog = get_catalog()
+    for movie_id, avg_rating, rating_count in drifted:
+        catalog.update_movie_stats(movie_id, avg_rating, rating_count)
+    return {
+        'checked': checked,
+        'fixed': len(drifted),
+        'ms': round((time.perf_counter() - start) * 1000, 2)
+    }
+
+
+class MovieStatsReconciler:
+    """Runs ``reconcile_movie_stats`` every ``interval_seconds`` in a daemon thread."""
+
+    def __init__(self, interval_seconds: float = 3600, bind: Engine = engine):
+        """
+        Initialize reconciler.
+
+        Args:
+            interval_seconds: Time between runs (0 disables the thread)
+            bind: Engine of the database to reconcile
+        """
+        self.interval_seconds = interval_seconds
+        self.bind = bind
+        self.runs = 0
+        self.fixed = 0
+        self.last_run: Optional[Dict] = None
+        self.last_error: Optional[str] = None
+        self._thread: Optional[threading.Thread] = None
+        self._stop = threading.Event()
+
+    def run(self) -> Dict:
+        """Reconcile now."""
+        result = reconcile_movie_stats(self.bind)
+        self.runs += 1
+        self.fixed += result['fixed']
+        self.last_run = result
+        if result['fixed']:
+            print(f"✓ Movie stats reconciled: fixed {result['fixed']} of {result['checked']} movies")
+        return result
+
+    def start(self):
+        """Start the background thread."""
+        if self.interval_seconds <= 0 or self._thread is not None:
+            return
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._loop, name='movie-stats-reconciler', daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        """Stop the background thread."""
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join(timeout=5)
+            self._thread = None
+
+    def _loop(self):
+        while not self._stop.wait(self.interval_seconds):
+            try:
+                self.run()
+                self.last_error = None
+            except Exception as e:
+                self.last_error = f"{type(e).__name__}: {e}"
+                print(f"❌ Movie stats reconciliation failed: {e}")
+
+    def stats(self) -> Dict:
+        """Run counters and the last result."""
+        return {
+            'interval_seconds': self.interval_seconds,
+            'runs': self.runs,
+            'fixed': self.fixed,
+            'last_run': self.last_run,
+            'last_error': self.last_error
+        }
+
+
+# Singleton instance
+_reconciler_instance: Optional[MovieStatsReconciler] = None
+
+
+def get_reconciler() -> MovieStatsReconciler:
+    """Get or create the movie stats reconciler (singleton pattern)."""
+    global _reconciler_instance
+    if _reconciler_instance is None:
+        _reconciler_instance = MovieStatsReconciler(settings.MOVIE_STATS_RECONCILE_SECONDS)
+    return _reconciler_instance
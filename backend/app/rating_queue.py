@@ -0,0 +1,472 @@
+"""Write-behind queue for rating writes: a durable append-only log drained to the database in batches."""
+import fcntl
+import json
+import os
+import threading
+import time
+from collections import deque
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Callable, Deque, Dict, IO, Iterable, Iterator, List, Optional, Sequence, Tuple
+from sqlalchemy import text
+from sqlalchemy.exc import OperationalError
+from app.config import settings
+from app.database import SessionLocal
+from app.metrics import registry as metrics_registry
+from app.rating_writes import RatingWrites, apply_ratings, publish_ratings
+
+# (user_id, movie_id, rating); a rating of None deletes the pair's rating
+RatingEvent = Tuple[int, int, Optional[float]]
+
+
+class RatingQueue:
+    """
+    Acknowledge rating writes once they are in a local log; apply them later.
+
+    ``append`` writes events as JSON lines to an append-only log and fsyncs
+    it, which is all a request waits for. A writer thread drains the log in
+    batches: every batch is one transaction (``apply_ratings``), so many
+    requests share one SQLite write lock and one commit, and then goes to
+    the catalog, the recommendation cache and online fold-in.
+
+    Every worker process has its own log (``<stem>.<worker>.<suffix>``
+    next to ``path``), locked with ``flock`` while the worker runs, so
+    workers never share sequence numbers or truncate each other's writes.
+    The sequence number of the last applied event is kept in a checkpoint
+    file next to the log, and the log is truncated whenever it is fully
+    applied. Events past the checkpoint are replayed on ``start``, and the
+    logs of workers that are gone (unlocked) are taken over. Events hold
+    the final state of a (user, movie) pair, so replaying one that was
+    committed just before a crash changes nothing.
+
+    A batch that fails is retried event by event. Events the database
+    rejects while it is otherwise reachable go to a dead-letter file next
+    to the log (``<log>.dead``), so one bad write cannot hold the queue
+    up; while the database is unreachable or locked, events stay queued.
+    """
+
+    def __init__(self, path: Path, batch_size: int = 500, flush_ms: float = 50,
+                 session_factory: Callable = SessionLocal, fsync: bool = True,
+                 worker_id: Optional[str] = None):
+        """
+        Initialize queue.
+
+        Args:
+            path: Base log file; each worker's log sits next to it (created
+                with its directory if missing)
+            batch_size: Most events per database transaction
+            flush_ms: How long the writer lets events gather before a batch
+            session_factory: Creates the writer's database sessions
+            fsync: Sync the log to disk before acknowledging a write
+            worker_id: Names this worker's log (defaults to the process id)
+        """
+        self.base_path = Path(path)
+        worker_id = worker_id if worker_id is not None else str(os.getpid())
+        self.path = self.base_path.with_name(f"{self.base_path.stem}.{worker_id}{self.base_path.suffix}")
+        self.checkpoint_path = self._checkpoint_of(self.path)
+        self.dead_letter_path = self.path.with_name(self.path.name + '.dead')
+        self.batch_size = batch_size
+        self.flush_ms = flush_ms
+        self.session_factory = session_factory
+        self.fsync = fsync
+        self._file = None
+        self._lock = threading.Lock()
+        self._changed = threading.Condition(self._lock)
+        # (seq, event, timestamp, monotonic enqueue time) not yet in the database
+        self._pending: Deque[Tuple[int, RatingEvent, str, float]] = deque()
+        # (user_id, movie_id) -> (seq, rating) of the latest pending event
+        self._latest: Dict[Tuple[int, int], Tuple[int, Optional[float]]] = {}
+        self._next_seq = 1
+        self._applied_seq = 0
+        self._thread: Optional[threading.Thread] = None
+        self._stop = threading.Event()
+        self.appended = 0
+        self.applied = 0
+        self.batches = 0
+        self.recovered = 0
+        self.adopted = 0
+        self.dead_lettered = 0
+        self.last_batch: Optional[Dict] = None
+        self.last_error: Optional[str] = None
+
+    def start(self):
+        """
+        Open and lock this worker's log, queue events left from the last
+        run and from workers that are gone, and start the writer.
+
+        Raises:
+            RuntimeError: If another running queue holds this worker's log
+        """
+        if self._thread is not None:
+            return
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        with self._lock:
+            log = open(self.path, 'a', encoding='utf-8')
+            try:
+                fcntl.flock(log.fileno(), fcntl.LOCK_EX | fcntl.LOCK_NB)
+            except BlockingIOError:
+                log.close()
+                raise RuntimeError(f"Rating queue log {self.path} is in use by another worker")
+            self._file = log
+            self._recover()
+            self._adopt_orphans()
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._loop, name='rating-queue-writer', daemon=True)
+        self._thread.start()
+        if self.recovered or self.adopted:
+            print(f"✓ Rating queue: replaying {self.recovered} events from {self.path} "
+                  f"and {self.adopted} from stopped workers")
+
+    def stop(self, timeout: float = 30.0):
+        """
+        Apply every queued event, then stop the writer.
+
+        Events that cannot be written stay in the log and are replayed by
+        the next ``start``.
+        """
+        if self._thread is None:
+            return
+        self._stop.set()
+        with self._changed:
+            self._changed.notify_all()
+        self._thread.join(timeout=timeout)
+        self._thread = None
+        with self._lock:
+            if self._file is not None:
+                if not self._pending:
+                    # Nothing left to replay: leave no log behind for this worker
+                    self.path.unlink(missing_ok=True)
+                    self.checkpoint_path.unlink(missing_ok=True)
+                # Closing releases the lock; other workers may now take the log over
+                self._file.close()
+                self._file = None
+        if self._pending:
+            print(f"❌ Rating queue stopped with {len(self._pending)} events unapplied; "
+                  f"they are replayed on next start")
+
+    def append(self, events: Sequence[RatingEvent]):
+        """
+        Durably queue rating writes.
+
+        Args:
+            events: (user_id, movie_id, rating or None to delete), in order
+
+        Raises:
+            RuntimeError: If the queue has not been started
+        """
+        timestamp = datetime.now(timezone.utc).isoformat()
+        with self._lock:
+            if self._file is None:
+                raise RuntimeError("Rating queue is not running")
+            self._log([(event, timestamp) for event in events])
+            self.appended += len(events)
+            self._changed.notify_all()
+
+    def _log(self, events: List[Tuple[RatingEvent, str]]):
+        """Number, write and sync events to this worker's log, and queue them (lock held)."""
+        if not events:
+            return
+        lines = []
+        now = time.monotonic()
+        for (user_id, movie_id, rating), timestamp in events:
+            seq = self._next_seq
+            self._next_seq += 1
+            lines.append(json.dumps({'seq': seq, 'user_id': user_id, 'movie_id': movie_id,
+                                     'rating': rating, 'ts': timestamp}))
+            self._pending.append((seq, (user_id, movie_id, rating), timestamp, now))
+            self._latest[(user_id, movie_id)] = (seq, rating)
+        self._file.write('\n'.join(lines) + '\n')
+        self._file.flush()
+        if self.fsync:
+            os.fsync(self._file.fileno())
+
+    def pending_rating(self, user_id: int, movie_id: int) -> Tuple[bool, Optional[float]]:
+        """
+        Latest queued rating of a pair, which the database does not show yet.
+
+        Returns:
+            (True, rating or None if deleted) when a write is queued, else (False, None)
+        """
+        with self._lock:
+            latest = self._latest.get((user_id, movie_id))
+        return (True, latest[1]) if latest is not None else (False, None)
+
+    def flush(self, timeout: float = 30.0) -> bool:
+        """Wait until every event queued so far is applied; False on timeout."""
+        deadline = time.monotonic() + timeout
+        with self._changed:
+            target = self._next_seq - 1
+            while self._applied_seq < target:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0 or self._thread is None:
+                    return False
+                self._changed.wait(min(remaining, 0.1))
+        return True
+
+    def lag_seconds(self) -> float:
+        """Age of the oldest event not yet in the database."""
+        with self._lock:
+            return time.monotonic() - self._pending[0][3] if self._pending else 0.0
+
+    @staticmethod
+    def _checkpoint_of(log_path: Path) -> Path:
+        return log_path.with_name(log_path.name + '.checkpoint')
+
+    @staticmethod
+    def _read_checkpoint(checkpoint_path: Path) -> int:
+        if not checkpoint_path.exists():
+            return 0
+        return int(checkpoint_path.read_text().strip() or 0)
+
+    @staticmethod
+    def _read_events(f: IO[str]) -> Iterator[Dict]:
+        for line in f:
+            try:
+                yield json.loads(line)
+            except ValueError:
+                # A write torn by a crash was never acknowledged
+                continue
+
+    def _recover(self):
+        """Load the checkpoint and queue the logged events after it (lock held)."""
+        self._applied_seq = self._read_checkpoint(self.checkpoint_path)
+        self._next_seq = self._applied_seq + 1
+        now = time.monotonic()
+        with open(self.path, encoding='utf-8') as f:
+            for event in self._read_events(f):
+                seq = event['seq']
+                self._next_seq = max(self._next_seq, seq + 1)
+                if seq <= self._applied_seq:
+                    continue
+                pair = (event['user_id'], event['movie_id'])
+                self._pending.append((seq, pair + (event['rating'],), event['ts'], now))
+                self._latest[pair] = (seq, event['rating'])
+                self.recovered += 1
+
+    def _orphan_candidates(self) -> List[Path]:
+        """Other workers' logs, and a log written before logs were per worker."""
+        base = self.base_path
+        logs = sorted(base.parent.glob(f"{base.stem}.*{base.suffix}")) + [base]
+        return [
+            log for log in logs
+            if log != self.path and not log.name.endswith(('.checkpoint', '.tmp', '.dead'))
+        ]
+
+    def _adopt_orphans(self):
+        """
+        Move the unapplied events of stopped workers' logs into this one (lock held).
+
+        A log whose lock can be taken has no running worker. Its events past
+        its checkpoint are re-logged here (and synced) before it is deleted,
+        so a crash in between replays them twice at worst, which is harmless.
+        """
+        for log_path in self._orphan_candidates():
+            try:
+                log = open(log_path, encoding='utf-8')
+            except (FileNotFoundError, IsADirectoryError):
+                continue
+            with log:
+                try:
+                    fcntl.flock(log.fileno(), fcntl.LOCK_EX | fcntl.LOCK_NB)
+                except BlockingIOError:
+                    # Its worker is still running
+                    continue
+                if os.fstat(log.fileno()).st_nlink == 0:
+                    # Taken over by another worker while we waited for the lock
+                    continue
+                checkpoint_path = self._checkpoint_of(log_path)
+                applied_seq = self._read_checkpoint(checkpoint_path)
+                events = [
+                    ((event['user_id'], event['movie_id'], event['rating']), event['ts'])
+                    for event in self._read_events(log) if event['seq'] > applied_seq
+                ]
+                self._log(events)
+                self.adopted += len(events)
+                log_path.unlink()
+                checkpoint_path.unlink(missing_ok=True)
+
+    def _loop(self):
+        while True:
+            with self._changed:
+                while not self._pending and not self._stop.is_set():
+                    self._changed.wait()
+                if not self._pending:
+                    return
+            if not self._stop.is_set() and len(self._pending) < self.batch_size:
+                # Let concurrent writes join the batch
+                self._stop.wait(self.flush_ms / 1000)
+            with self._lock:
+                batch = [self._pending[i] for i in range(min(self.batch_size, len(self._pending)))]
+            try:
+                self._apply(batch)
+                self.last_error = None
+            except Exception as e:
+                self.last_error = f"{type(e).__name__}: {e}"
+                print(f"❌ Rating queue batch of {len(batch)} events failed: {e}")
+                try:
+                    self._apply_one_by_one(batch)
+                except Exception as e:
+                    self.last_error = f"{type(e).__name__}: {e}"
+                    if self._stop.is_set():
+                        return
+                    self._stop.wait(1.0)
+
+    def _apply_one_by_one(self, batch: List[Tuple[int, RatingEvent, str, float]]):
+        """
+        Apply a failed batch event by event, dead-lettering the events the database rejects.
+
+        Raises:
+            Exception: The error of the first event that failed while the
+                database was unavailable; it and the events after it stay queued
+        """
+        for entry in batch:
+            try:
+                self._apply([entry])
+            except Exception as e:
+                if isinstance(e, OperationalError) or not self._database_reachable():
+                    raise
+                self._dead_letter(entry, e)
+
+    def _database_reachable(self) -> bool:
+        """Whether the writer can open a session and run a query."""
+        try:
+            db = self.session_factory()
+            try:
+                db.execute(text("SELECT 1"))
+            finally:
+                db.close()
+        except Exception:
+            return False
+        return True
+
+    def _dead_letter(self, entry: Tuple[int, RatingEvent, str, float], error: Exception):
+        """Move an event the database rejects out of the queue, into the dead-letter file."""
+        seq, (user_id, movie_id, rating), timestamp, _ = entry
+        with open(self.dead_letter_path, 'a', encoding='utf-8') as f:
+            f.write(json.dumps({'seq': seq, 'user_id': user_id, 'movie_id': movie_id, 'rating': rating,
+                                'ts': timestamp, 'error': f"{type(error).__name__}: {error}"}) + '\n')
+            f.flush()
+            if self.fsync:
+                os.fsync(f.fileno())
+        self._write_checkpoint(seq)
+        self._mark_applied([entry], [(user_id, movie_id)])
+        self.dead_lettered += 1
+        print(f"❌ Rating queue: moved write of user {user_id} to movie {movie_id} "
+              f"to {self.dead_letter_path}: {error}")
+
+    def _mark_applied(self, batch: List[Tuple[int, RatingEvent, str, float]], pairs: Iterable[Tuple[int, int]]):
+        """Take checkpointed events off the queue, and start the log over once it is drained."""
+        last_seq = batch[-1][0]
+        with self._changed:
+            for _ in batch:
+                self._pending.popleft()
+            for pair in pairs:
+                if self._latest.get(pair, (last_seq + 1,))[0] <= last_seq:
+                    del self._latest[pair]
+            self._applied_seq = last_seq
+            if not self._pending and self._file is not None:
+                # Everything logged is applied: start the log over
+                self._file.truncate(0)
+            self._changed.notify_all()
+
+    def _apply(self, batch: List[Tuple[int, RatingEvent, str, float]]):
+        """Write a batch in one transaction, checkpoint it, then publish it."""
+        start = time.perf_counter()
+        writes: RatingWrites = {}
+        for _, (user_id, movie_id, rating), timestamp, _ in batch:
+            writes[(user_id, movie_id)] = (rating, datetime.fromisoformat(timestamp))
+        last_seq = batch[-1][0]
+
+        db = self.session_factory()
+        try:
+            _, _, stats = apply_ratings(db, writes)
+            db.commit()
+            self._write_checkpoint(last_seq)
+            self._mark_applied(batch, writes)
+            self.applied += len(batch)
+            self.batches += 1
+            commit_ms = (time.perf_counter() - start) * 1000
+            try:
+                publish_ratings(db, stats, {user_id for user_id, _ in writes})
+            except Exception as e:
+                print(f"Warning: Could not publish {len(batch)} queued rating writes: {e}")
+        finally:
+            db.close()
+        self.last_batch = {
+            'events': len(batch),
+            'pairs': len(writes),
+            'commit_ms': round(commit_ms, 2),
+            'total_ms': round((time.perf_counter() - start) * 1000, 2)
+        }
+
+    def _write_checkpoint(self, seq: int):
+        tmp = self.checkpoint_path.with_name(self.checkpoint_path.name + '.tmp')
+        with open(tmp, 'w') as f:
+            f.write(str(seq))
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp, self.checkpoint_path)
+
+    def stats(self) -> Dict:
+        """Queue depth, lag and writer counters."""
+        return {
+            'running': self._thread is not None,
+            'path': str(self.path),
+            'pending': len(self._pending),
+            'lag_seconds': round(self.lag_seconds(), 3),
+            'appended': self.appended,
+            'applied': self.applied,
+            'batches': self.batches,
+            'avg_batch_size': round(self.applied / self.batches, 1) if self.batches else 0.0,
+            'recovered': self.recovered,
+            'adopted': self.adopted,
+            'dead_lettered': self.dead_lettered,
+            'dead_letter_path': str(self.dead_letter_path),
+            'last_batch': self.last_batch,
+            'last_error': self.last_error
+        }
+
+
+# Singleton instance
+_queue_instance: Optional[RatingQueue] = None
+
+
+def get_rating_queue() -> RatingQueue:
+    """Get or create the rating write queue (singleton pattern)."""
+    global _queue_instance
+    if _queue_instance is None:
+        _queue_instance = RatingQueue(
+            Path(settings.RATING_QUEUE_PATH),
+            batch_size=settings.RATING_QUEUE_BATCH_SIZE,
+            flush_ms=settings.RATING_QUEUE_FLUSH_MS
+        )
+    return _queue_instance
+
+
+def rating_queue_stats() -> Optional[Dict]:
+    """Stats of the rating queue, or None if write-behind is off."""
+    if _queue_instance is None:
+        return None
+    return _queue_instance.stats()
+
+
+def _collect_metrics():
+    """Queue depth and lag, for ``/metrics``."""
+    if _queue_instance is None:
+        return []
+    stats = _queue_instance.stats()
+    return [
+        ('rating_queue_pending_events', 'gauge', 'Rating writes acknowledged but not yet in the database',
+         [({}, stats['pending'])]),
+        ('rating_queue_lag_seconds', 'gauge', 'Age of the oldest rating write not yet in the database',
+         [({}, stats['lag_seconds'])]),
+        ('rating_queue_applied_events_total', 'counter', 'Rating writes applied to the database',
+         [({}, stats['applied'])]),
+        ('rating_queue_batches_total', 'counter', 'Write transactions of the rating queue',
+         [({}, stats['batches'])]),
+        ('rating_queue_dead_letter_events_total', 'counter',
+         'Rating writes the database rejected, moved to the dead-letter file', [({}, stats['dead_lettered'])]),
+    ]
+
+
+metrics_registry.add_collector(_collect_metrics)
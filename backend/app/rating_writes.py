@@ -0,0 +1,93 @@
+"""Set-based rating writes shared by the bulk endpoint and the write-behind queue."""
+from datetime import datetime
+from typing import Dict, Iterable, List, Optional, Tuple
+from sqlalchemy import tuple_
+from sqlalchemy.orm import Session
+from app.catalog import get_catalog
+from app.ml.recommender import invalidate_user_recommendations, update_user_model
+from app.models.rating import Rating
+from app.movie_stats import apply_rating_changes
+
+# (user_id, movie_id) -> (new rating, or None to delete it; timestamp for new rows)
+RatingWrites = Dict[Tuple[int, int], Tuple[Optional[float], datetime]]
+
+
+def apply_ratings(db: Session, writes: RatingWrites) -> Tuple[List[Rating], int, Dict[int, Tuple[float, int]]]:
+    """
+    Insert, update and delete many ratings in the caller's transaction.
+
+    Existing ratings are read with one query, rows are written in batches
+    at flush, and movie stats change by one batched ``apply_rating_changes``.
+    Writes hold the final state of a pair, so applying them twice is a no-op.
+
+    Args:
+        db: Session to write in (the caller commits)
+        writes: Final rating per (user_id, movie_id) pair
+
+    Returns:
+        (inserted and updated ratings, number inserted, new movie stats by movie_id)
+    """
+    existing = {
+        (rating.user_id, rating.movie_id): rating
+        for rating in db.query(Rating).filter(tuple_(Rating.user_id, Rating.movie_id).in_(list(writes)))
+    }
+
+    # movie_id -> (rating sum delta, count delta) over all writes
+    changes: Dict[int, Tuple[float, int]] = {}
+    ratings, created = [], []
+    for (user_id, movie_id), (value, timestamp) in writes.items():
+        rating = existing.get((user_id, movie_id))
+        rating_delta, count_delta = changes.get(movie_id, (0.0, 0))
+        if value is None:
+            if rating is not None:
+                db.delete(rating)
+                changes[movie_id] = (rating_delta - rating.rating, count_delta - 1)
+            continue
+        if rating is None:
+            rating = Rating(user_id=user_id, movie_id=movie_id, rating=value, timestamp=timestamp)
+            created.append(rating)
+            changes[movie_id] = (rating_delta + value, count_delta + 1)
+        else:
+            changes[movie_id] = (rating_delta + value - rating.rating, count_delta)
+            rating.rating = value
+        ratings.append(rating)
+
+    db.add_all(created)
+    stats = apply_rating_changes(db, changes)
+    db.flush()
+    return ratings, len(created), stats
+
+
+def publish_ratings(db: Session, stats: Dict[int, Tuple[float, int]], user_ids: Iterable[int]):
+    """
+    Apply committed rating writes to the in-memory catalog and the recommender.
+
+    Args:
+        db: Session to read the users' ratings with
+        stats: New (avg_rating, rating_count) by movie_id
+        user_ids: Users whose ratings changed; their models are refreshed
+    """
+    catalog = get_catalog()
+    for movie_id, (avg_rating, rating_count) in stats.items():
+        catalog.update_movie_stats(movie_id, avg_rating, rating_count)
+    refresh_user_models(db, user_ids)
+
+
+def refresh_user_models(db: Session, user_ids: Iterable[int]):
+    """Fold many users' ratings into the recommender, reading them in one query."""
+    ratings_by_user: Dict[int, List[Tuple[int, float]]] = {user_id: [] for user_id in user_ids}
+    if not ratings_by_user:
+        return
+    try:
+        rows = db.query(Rating.user_id, Rating.movie_id, Rating.rating)\
+            .filter(Rating.user_id.in_(list(ratings_by_user))).all()
+    except Exception as e:
+        # The writes are committed; stale recommendations are better than a failed request
+        print(f"Warning: Could not read ratings of {len(ratings_by_user)} users: {e}")
+        for user_id in ratings_by_user:
+            invalidate_user_recommendations(user_id)
+        return
+    for user_id, movie_id, rating in rows:
+        ratings_by_user[user_id].append((movie_id, rating))
+    for user_id, ratings in ratings_by_user.items():
+        update_user_model(user_id, ratings)
@@ -39,6 +39,7 @@ class MovieListResponse(BaseModel):
     total: int
     page: int
     limit: int
+    next_cursor: Optional[str] = None  # Pass as ``cursor`` for the next page
 
 
 class MovieRecommendation(BaseModel):
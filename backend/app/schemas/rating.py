@@ -1,7 +1,7 @@
 """Rating Pydantic schemas for API requests/responses."""
-from pydantic import BaseModel, Field
+from pydantic import BaseModel, Field, field_validator
 from typing import List, Optional
-from datetime import datetime
+from datetime import datetime, timezone
 
 
 class RatingCreate(BaseModel):
@@ -18,7 +18,7 @@ class RatingUpdate(BaseModel):
 
 class RatingResponse(BaseModel):
     """Schema for rating API responses."""
-    rating_id: int
+    rating_id: Optional[int] = None  # None while a write-behind insert is queued
     user_id: int
     movie_id: int
     rating: float
@@ -26,6 +26,26 @@ class RatingResponse(BaseModel):
     
     class Config:
         from_attributes = True
+    
+    @field_validator('timestamp')
+    @classmethod
+    def as_stored(cls, value: datetime) -> datetime:
+        """Naive UTC, as SQLite returns stored timestamps, whether or not the row was read back."""
+        if value.tzinfo is not None:
+            value = value.astimezone(timezone.utc).replace(tzinfo=None)
+        return value
+
+
+class RatingBulkCreate(BaseModel):
+    """Schema for creating or updating many ratings at once."""
+    ratings: List[RatingCreate] = Field(..., min_length=1, max_length=1000)
+
+
+class RatingBulkResponse(BaseModel):
+    """Schema for bulk rating responses."""
+    created: int
+    updated: int
+    ratings: List[RatingResponse]
 
 
 class UserRatingResponse(BaseModel):
@@ -34,7 +54,7 @@ class UserRatingResponse(BaseModel):
     movie_id: int
     title: str
     rating: float
-    timestamp: datetime
+    timestamp: Optional[datetime] = None  # None for undated imported ratings
 
 
 class RatingListResponse(BaseModel):
@@ -42,3 +62,4 @@ class RatingListResponse(BaseModel):
     ratings: List[UserRatingResponse]
     total: int
     page: int
+    next_cursor: Optional[str] = None  # Pass as ``cursor`` for the next page
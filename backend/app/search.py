@@ -0,0 +1,146 @@
+"""Inverted index for movie search over title, summary, director, actors and tags."""
+import bisect
+import math
+import re
+import time
+from collections import Counter
+from typing import Dict, List, Optional, Sequence, Tuple
+import numpy as np
+
+TOKEN_PATTERN = re.compile(r"\w+", re.UNICODE)
+
+# Relevance weight of a term occurrence per field
+FIELD_WEIGHTS = {'title': 3.0, 'director': 2.0, 'actors': 1.5, 'tags': 1.5, 'summary': 1.0}
+
+
+def tokenize(text: Optional[str]) -> List[str]:
+    """Lowercased word tokens of a text."""
+    return TOKEN_PATTERN.findall(text.lower()) if text else []
+
+
+class SearchIndex:
+    """
+    Inverted index from terms to movie positions, with prefix matching.
+
+    Postings are kept in CSR form: for the term at ``i`` in the sorted
+    vocabulary, ``docs[offsets[i]:offsets[i+1]]`` are the positions of the
+    movies containing it and ``weights`` their precomputed relevance (a
+    field-weighted, saturated term frequency times the term's IDF, as in
+    BM25 without length normalization). A query only touches the postings
+    of its own terms, so its cost depends on how many movies match rather
+    than on the size of the catalog.
+
+    Every query token also matches the terms it is a prefix of ("termin"
+    finds "terminator"), at half the weight of an exact match; all tokens
+    must match for a movie to be returned.
+    """
+
+    def __init__(self, fields: Dict[str, Sequence[Optional[str]]],
+                 field_weights: Dict[str, float] = FIELD_WEIGHTS,
+                 k1: float = 1.2, prefix_weight: float = 0.5, max_expansions: int = 256):
+        """
+        Build the index.
+
+        Args:
+            fields: Text column per field name, aligned by movie position
+            field_weights: Weight of an occurrence per field
+            k1: Term-frequency saturation (BM25 ``k1``)
+            prefix_weight: Score factor for terms matched by prefix only
+            max_expansions: Most terms a prefix expands to (most frequent first)
+        """
+        start = time.perf_counter()
+        self.prefix_weight = prefix_weight
+        self.max_expansions = max_expansions
+        self.n_docs = max((len(column) for column in fields.values()), default=0)
+
+        # term -> {position: weighted term frequency}
+        postings: Dict[str, Dict[int, float]] = {}
+        for field, column in fields.items():
+            weight = field_weights.get(field, 1.0)
+            for pos, text in enumerate(column):
+                for term, tf in Counter(tokenize(text)).items():
+                    docs = postings.setdefault(term, {})
+                    docs[pos] = docs.get(pos, 0.0) + weight * tf
+
+        self.terms: List[str] = sorted(postings)
+        offsets = np.zeros(len(self.terms) + 1, dtype=np.int64)
+        docs_parts, weight_parts = [], []
+        for i, term in enumerate(self.terms):
+            term_docs = postings[term]
+            positions = np.fromiter(term_docs.keys(), dtype=np.int32, count=len(term_docs))
+            tf = np.fromiter(term_docs.values(), dtype=np.float64, count=len(term_docs))
+            df = len(term_docs)
+            idf = math.log(1 + (self.n_docs - df + 0.5) / (df + 0.5))
+            order = np.argsort(positions)
+            docs_parts.append(positions[order])
+            weight_parts.append((idf * tf * (k1 + 1) / (tf + k1))[order].astype(np.float32))
+            offsets[i + 1] = offsets[i] + df
+        self.offsets = offsets
+        self.docs = np.concatenate(docs_parts) if docs_parts else np.zeros(0, dtype=np.int32)
+        self.weights = np.concatenate(weight_parts) if weight_parts else np.zeros(0, dtype=np.float32)
+        self.build_ms = round((time.perf_counter() - start) * 1000, 2)
+
+    def __len__(self) -> int:
+        return len(self.terms)
+
+    def _expand(self, token: str) -> List[Tuple[int, float]]:
+        """(term index, score factor) of the terms a query token matches."""
+        lo = bisect.bisect_left(self.terms, token)
+        hi = bisect.bisect_left(self.terms, token + '\U0010ffff', lo)
+        matches = []
+        if lo < hi and self.terms[lo] == token:
+            matches.append((lo, 1.0))
+            lo += 1
+        prefixed = range(lo, hi)
+        if len(prefixed) > self.max_expansions:
+            df = self.offsets[lo + 1:hi + 1] - self.offsets[lo:hi]
+            prefixed = (lo + np.argsort(-df, kind='stable')[:self.max_expansions]).tolist()
+        matches.extend((i, self.prefix_weight) for i in prefixed)
+        return matches
+
+    def search(self, query: str) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        Movies matching every token of a query.
+
+        Args:
+            query: Free text; tokens match whole terms or term prefixes
+
+        Returns:
+            (positions, scores) of the matching movies in position order;
+            both empty when nothing matches or the query has no tokens
+        """
+        empty = np.zeros(0, dtype=np.int64), np.zeros(0)
+        tokens = list(dict.fromkeys(tokenize(query)))
+        if not tokens:
+            return empty
+        positions, scores = None, None
+        for token in tokens:
+            parts = [
+                (self.docs[self.offsets[term]:self.offsets[term + 1]],
+                 self.weights[self.offsets[term]:self.offsets[term + 1]] * factor)
+                for term, factor in self._expand(token)
+            ]
+            if not parts:
+                return empty
+            docs = np.concatenate([docs for docs, _ in parts]).astype(np.int64)
+            weights = np.concatenate([weights for _, weights in parts]).astype(np.float64)
+            # Best matching term per movie, not the sum over all expansions
+            order = np.lexsort((-weights, docs))
+            docs, first = np.unique(docs[order], return_index=True)
+            weights = weights[order][first]
+            if positions is None:
+                positions, scores = docs, weights
+            else:
+                positions, left, right = np.intersect1d(positions, docs, assume_unique=True, return_indices=True)
+                scores = scores[left] + weights[right]
+            if len(positions) == 0:
+                return empty
+        return positions, scores
+
+    def stats(self) -> Dict:
+        """Vocabulary and postings sizes and build time."""
+        return {
+            'terms': len(self.terms),
+            'postings': int(len(self.docs)),
+            'build_ms': self.build_ms
+        }
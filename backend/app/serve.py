@@ -0,0 +1,52 @@
+"""Run the API with several worker processes sharing one copy of the model."""
+import argparse
+import sys
+from pathlib import Path
+
+# Add parent directory to path
+sys.path.append(str(Path(__file__).parent.parent))
+
+import uvicorn
+from app.config import settings
+from app.ml.artifacts import load_scorer
+from app.ml.shared_model import SharedModel
+
+
+def serve(host: str = '0.0.0.0', port: int = 8000, workers: int = 4):
+    """
+    Load the model once, publish it in shared memory and start the workers.
+
+    Every worker attaches the published factor matrices read-only instead
+    of loading its own copy, so an extra worker costs next to no model
+    memory and needs no unpickling at startup. The blocks are unlinked
+    when the server stops.
+
+    Args:
+        host: Interface to bind
+        port: Port to bind
+        workers: Number of uvicorn worker processes
+    """
+    base_dir = Path(__file__).parent.parent
+    try:
+        scorer, info = load_scorer(base_dir / settings.MODEL_ARTIFACT_DIR, base_dir / settings.MODEL_PATH)
+    except FileNotFoundError as e:
+        print(f"❌ {e}")
+        print("Starting without a shared model; workers load it on first use")
+        uvicorn.run('app.main:app', host=host, port=port, workers=workers)
+        return
+
+    with SharedModel(scorer, info) as shared:
+        del scorer
+        shared.export()
+        print(f"✓ Model {info['version']} ({info['source']}) published in shared memory "
+              f"({shared.nbytes / 1024 / 1024:.1f} MB) for {workers} workers")
+        uvicorn.run('app.main:app', host=host, port=port, workers=workers)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Serve the API from several workers sharing one model")
+    parser.add_argument('--host', default='0.0.0.0')
+    parser.add_argument('--port', type=int, default=8000)
+    parser.add_argument('--workers', type=int, default=4)
+    args = parser.parse_args()
+    serve(args.host, args.port, args.workers)
@@ -0,0 +1,43 @@
+"""Opaque cursor tokens for keyset pagination."""
+import base64
+import json
+from typing import Any, Dict
+
+
+def encode_cursor(position: Dict[str, Any]) -> str:
+    """
+    Encode the position after the last item of a page as a cursor token.
+
+    Args:
+        position: JSON-serializable sort key of the last item (and any
+            state to carry to the next page, such as the total count)
+
+    Returns:
+        URL-safe token for the ``cursor`` query parameter
+    """
+    raw = json.dumps(position, separators=(',', ':')).encode()
+    return base64.urlsafe_b64encode(raw).rstrip(b'=').decode()
+
+
+def decode_cursor(token: str, *required: str) -> Dict[str, Any]:
+    """
+    Decode a cursor token from ``encode_cursor``.
+
+    Args:
+        token: Cursor token
+        required: Keys the position must contain
+
+    Returns:
+        The encoded position
+
+    Raises:
+        ValueError: If the token is malformed or lacks a required key
+    """
+    try:
+        raw = base64.urlsafe_b64decode(token + '=' * (-len(token) % 4))
+        position = json.loads(raw)
+    except (ValueError, UnicodeDecodeError):
+        raise ValueError("Invalid cursor")
+    if not isinstance(position, dict) or any(key not in position for key in required):
+        raise ValueError("Invalid cursor")
+    return position
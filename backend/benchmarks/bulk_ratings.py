@@ -0,0 +1,126 @@
+"""Per-rating cost of bulk rating ingestion vs. one POST /ratings per rating."""
+import argparse
+import asyncio
+import random
+import sys
+import time
+from pathlib import Path
+from typing import Dict, List, Tuple
+
+# Add parent directory to path
+sys.path.append(str(Path(__file__).parent.parent))
+
+import httpx
+from sqlalchemy import event
+from app.catalog import get_catalog
+from app.database import engine
+from app.main import app
+from app.ml.recommender import get_recommender
+
+
+class StatementCounter:
+    """Counts SQL statements executed on the engine while enabled."""
+
+    def __init__(self):
+        self.count = 0
+        event.listen(engine, 'before_cursor_execute', self._on_execute)
+
+    def _on_execute(self, *args):
+        self.count += 1
+
+
+def pick_ratings(n_users: int, per_user: int, seed: int) -> Tuple[List[Dict], List[Dict]]:
+    """
+    Two disjoint sets of new ratings (one per path) for ``n_users`` users.
+
+    Returns:
+        (single, bulk) lists of {user_id, movie_id, rating} for movies the
+        users have not rated
+    """
+    rng = random.Random(seed)
+    db = get_recommender().db
+    user_ids = [row[0] for row in db.fetchall('users', "SELECT user_id FROM users")]
+    movie_ids = get_catalog().snapshot.movie_ids.tolist()
+    single, bulk = [], []
+    for user_id in rng.sample(user_ids, min(n_users, len(user_ids))):
+        rated = {row[0] for row in db.fetchall(
+            'ratings', "SELECT movie_id FROM ratings WHERE user_id = ?", (user_id,)
+        )}
+        candidates = [movie_id for movie_id in movie_ids if movie_id not in rated]
+        chosen = rng.sample(candidates, min(2 * per_user, len(candidates)))
+        for i, movie_id in enumerate(chosen):
+            rating = {'user_id': user_id, 'movie_id': movie_id, 'rating': rng.randint(1, 5)}
+            (single if i % 2 == 0 else bulk).append(rating)
+    return single, bulk
+
+
+def _result(elapsed: float, statements: int, n_ratings: int, n_requests: int) -> Dict:
+    return {
+        'ratings': n_ratings,
+        'requests': n_requests,
+        'seconds': round(elapsed, 3),
+        'ms_per_rating': round(elapsed * 1000 / n_ratings, 3),
+        'statements_per_rating': round(statements / n_ratings, 2)
+    }
+
+
+async def run(single: List[Dict], bulk: List[Dict], batch_size: int, counter: StatementCounter) -> Dict:
+    """
+    Write ``single`` one rating per request and ``bulk`` in batches, then delete both.
+
+    Bulk batches hold one user's ratings each (up to ``batch_size``), like
+    an onboarding flow; both paths fold the same number of users into the model.
+    """
+    created_ids = []
+    async with httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://bench") as client:
+        counter.count = 0
+        start = time.perf_counter()
+        for rating in single:
+            response = await client.post("/api/v1/ratings", json=rating)
+            response.raise_for_status()
+            created_ids.append(response.json()['rating_id'])
+        single_result = _result(time.perf_counter() - start, counter.count, len(single), len(single))
+
+        batches: List[List[Dict]] = []
+        for rating in bulk:
+            if not batches or len(batches[-1]) >= batch_size or batches[-1][0]['user_id'] != rating['user_id']:
+                batches.append([])
+            batches[-1].append(rating)
+        counter.count = 0
+        start = time.perf_counter()
+        for batch in batches:
+            response = await client.post("/api/v1/ratings/bulk", json={'ratings': batch})
+            response.raise_for_status()
+            created_ids.extend(rating['rating_id'] for rating in response.json()['ratings'])
+        bulk_result = _result(time.perf_counter() - start, counter.count, len(bulk), len(batches))
+
+        # Leave the database as it was
+        for rating_id in created_ids:
+            (await client.delete(f"/api/v1/ratings/{rating_id}")).raise_for_status()
+
+    return {'single': single_result, 'bulk': bulk_result}
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Compare bulk rating ingestion with single-rating writes")
+    parser.add_argument('--users', type=int, default=5)
+    parser.add_argument('--per-user', type=int, default=40, help="New ratings per user and path")
+    parser.add_argument('--batch-size', type=int, default=100, help="Most ratings per bulk request")
+    parser.add_argument('--seed', type=int, default=42)
+    args = parser.parse_args()
+
+    single, bulk = pick_ratings(args.users, args.per_user, args.seed)
+    get_recommender().get_recommendations(single[0]['user_id'], 10)  # load the model before timing
+    counter = StatementCounter()
+    result = asyncio.run(run(single, bulk, args.batch_size, counter))
+
+    print(f"📦 {len(single)} + {len(bulk)} new ratings from {args.users} users "
+          f"(rows are deleted afterwards)")
+    print("=" * 72)
+    print(f"{'path':<22} {'requests':>9} {'seconds':>9} {'ms/rating':>10} {'SQL/rating':>11}")
+    for path, label in (('single', 'POST /ratings'), ('bulk', 'POST /ratings/bulk')):
+        row = result[path]
+        print(f"{label:<22} {row['requests']:>9} {row['seconds']:>9} {row['ms_per_rating']:>10} "
+              f"{row['statements_per_rating']:>11}")
+    speedup = result['single']['ms_per_rating'] / max(result['bulk']['ms_per_rating'], 1e-9)
+    print(f"\nBulk ingestion is {speedup:.1f}x cheaper per rating")
@@ -0,0 +1,147 @@
+"""Throughput under concurrent load: executors and micro-batching vs. blocking calls on the event loop."""
+import argparse
+import asyncio
+import random
+import sys
+import time
+from pathlib import Path
+from typing import Dict, List
+
+# Add parent directory to path
+sys.path.append(str(Path(__file__).parent.parent))
+
+import httpx
+import numpy as np
+from app.catalog import get_catalog
+from app.concurrency import db_executor, model_executor
+from app.database import engine
+from app.main import app
+from app.ml.batching import get_batcher
+from app.ml.recommender import get_recommender
+
+
+def _summary(latencies: List[float]) -> Dict[str, float]:
+    if not latencies:
+        return {'count': 0, 'p50_ms': 0.0, 'p95_ms': 0.0, 'max_ms': 0.0}
+    values = np.array(latencies) * 1000
+    return {
+        'count': len(values),
+        'p50_ms': round(float(np.percentile(values, 50)), 2),
+        'p95_ms': round(float(np.percentile(values, 95)), 2),
+        'max_ms': round(float(values.max()), 2)
+    }
+
+
+async def run_load(n_requests: int, concurrency: int, recommendation_share: float,
+                   user_ids: List[int], movie_ids: List[int], seed: int = 42) -> Dict:
+    """
+    Fire a mix of recommendation and movie-detail requests from concurrent clients.
+
+    Returns:
+        Throughput and latency percentiles per request kind
+    """
+    rng = random.Random(seed)
+    plan = [
+        ('recommendations', f"/api/v1/recommendations/{rng.choice(user_ids)}?limit=10")
+        if rng.random() < recommendation_share
+        else ('movie', f"/api/v1/movies/{rng.choice(movie_ids)}")
+        for _ in range(n_requests)
+    ]
+    latencies = {'recommendations': [], 'movie': []}
+    errors = 0
+    queue: asyncio.Queue = asyncio.Queue()
+    for item in plan:
+        queue.put_nowait(item)
+
+    async with httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://bench") as client:
+        async def client_loop():
+            nonlocal errors
+            while not queue.empty():
+                kind, url = queue.get_nowait()
+                start = time.perf_counter()
+                try:
+                    response = await client.get(url)
+                except Exception:
+                    errors += 1
+                    continue
+                latencies[kind].append(time.perf_counter() - start)
+                if response.status_code >= 500:
+                    errors += 1
+
+        start = time.perf_counter()
+        await asyncio.gather(*(client_loop() for _ in range(concurrency)))
+        elapsed = time.perf_counter() - start
+
+    return {
+        'requests': n_requests,
+        'errors': errors,
+        'seconds': round(elapsed, 2),
+        'throughput_rps': round(n_requests / elapsed, 1),
+        'recommendations': _summary(latencies['recommendations']),
+        'movie': _summary(latencies['movie'])
+    }
+
+
+def set_executor_threads(db_threads: int, model_threads: int):
+    """Resize both executors (0 runs calls inline on the event loop)."""
+    for executor, threads in ((db_executor, db_threads), (model_executor, model_threads)):
+        executor.shutdown()
+        executor.max_workers = threads
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark API throughput under concurrent load")
+    parser.add_argument('--requests', type=int, default=400)
+    parser.add_argument('--concurrency', type=int, default=32, help="Concurrent clients")
+    parser.add_argument('--recommendation-share', type=float, default=0.5,
+                        help="Fraction of requests that are recommendations (the rest are movie details)")
+    parser.add_argument('--db-threads', type=int, default=db_executor.max_workers)
+    parser.add_argument('--model-threads', type=int, default=model_executor.max_workers)
+    parser.add_argument('--batch-window', type=float, default=get_batcher().window_ms,
+                        help="Micro-batching window in ms for the batched run")
+    parser.add_argument('--cached', action='store_true',
+                        help="Keep the recommendation cache and precomputed snapshot (default: score every request)")
+    args = parser.parse_args()
+
+    recommender = get_recommender()
+    if not args.cached:
+        recommender.cache.max_size = 0
+        recommender.model.precomputed = None
+    catalog = get_catalog().snapshot
+    movie_ids = catalog.movie_ids.tolist()
+    user_ids = [row[0] for row in recommender.db.fetchall('users', "SELECT user_id FROM users")]
+    recommender.get_recommendations(user_ids[0], 10)  # load the model before timing
+
+    pool_capacity = engine.pool.size() + getattr(engine.pool, '_max_overflow', 0)
+    print(f"🚦 {args.requests} requests, {args.concurrency} concurrent clients, "
+          f"{args.recommendation_share:.0%} recommendations")
+    print("=" * 72)
+    print(f"{'mode':<22} {'req/s':>8} {'rec p50':>9} {'rec p95':>9} {'movie p50':>10} {'movie p95':>10}")
+    batcher = get_batcher()
+    for mode, db_threads, model_threads, window_ms in (
+        ('inline (event loop)', 0, 0, 0),
+        (f'executors ({args.db_threads}/{args.model_threads})', args.db_threads, args.model_threads, 0),
+        (f'+ batching ({args.batch_window:g}ms)', args.db_threads, args.model_threads, args.batch_window),
+    ):
+        if db_threads == 0 and args.concurrency > pool_capacity:
+            # A request blocking the loop on a pool checkout also blocks the
+            # session teardowns that would return connections: it deadlocks
+            # until SQLAlchemy's 30s checkout timeout
+            print(f"{mode:<22} skipped: {args.concurrency} clients > {pool_capacity} pooled connections "
+                  f"(blocks the event loop on checkout)")
+            continue
+        set_executor_threads(db_threads, model_threads)
+        batcher.window_ms = window_ms
+        batcher.reset_stats()
+        result = asyncio.run(run_load(args.requests, args.concurrency, args.recommendation_share,
+                                      user_ids, movie_ids))
+        rec, movie = result['recommendations'], result['movie']
+        print(f"{mode:<22} {result['throughput_rps']:>8} {rec['p50_ms']:>8}ms {rec['p95_ms']:>8}ms "
+              f"{movie['p50_ms']:>9}ms {movie['p95_ms']:>9}ms"
+              + (f"  ({result['errors']} errors)" if result['errors'] else ""))
+    set_executor_threads(0, 0)
+
+    stats = batcher.stats()
+    print(f"\nBatching: {stats['batches']} batches, mean size {stats['avg_batch_size']}, "
+          f"sizes {stats['batch_sizes']}, queue delay p50 {stats['queue_delay_ms']['p50']}ms "
+          f"p95 {stats['queue_delay_ms']['p95']}ms")
@@ -0,0 +1,308 @@
+"""HTTP load test: simulated users replaying a browse/detail/rate/recommend/similar traffic mix."""
+import argparse
+import asyncio
+import json
+import random
+import sys
+import time
+import uuid
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple
+
+# Add parent directory to path
+sys.path.append(str(Path(__file__).parent.parent))
+
+import httpx
+import numpy as np
+
+API = "/api/v1"
+
+# action -> share of requests
+DEFAULT_MIX = {'browse': 30, 'detail': 25, 'rate': 10, 'recommend': 25, 'similar': 10}
+
+# Upper bounds (ms) of the latency histogram buckets
+BUCKETS_MS = [5, 10, 25, 50, 100, 250, 500, 1000, 2500]
+
+
+def parse_mix(text: str) -> Dict[str, float]:
+    """Parse ``browse=30,detail=25,...`` into normalized action shares."""
+    mix = {}
+    for part in text.split(','):
+        name, _, weight = part.partition('=')
+        name = name.strip()
+        if name not in DEFAULT_MIX:
+            raise ValueError(f"Unknown action '{name}' (expected one of {', '.join(DEFAULT_MIX)})")
+        mix[name] = float(weight)
+    total = sum(mix.values())
+    if total <= 0:
+        raise ValueError("Traffic mix weights must add up to more than 0")
+    return {name: weight / total for name, weight in mix.items() if weight > 0}
+
+
+class EndpointStats:
+    """Latencies, status codes and errors of one endpoint."""
+
+    def __init__(self):
+        self.latencies: List[float] = []
+        self.statuses: Dict[int, int] = {}
+        self.errors = 0
+
+    def record(self, seconds: float, status: Optional[int], ok: bool):
+        self.latencies.append(seconds * 1000)
+        if status is not None:
+            self.statuses[status] = self.statuses.get(status, 0) + 1
+        if not ok:
+            self.errors += 1
+
+    def summary(self) -> Dict:
+        values = np.array(self.latencies) if self.latencies else np.zeros(1)
+        counts = np.histogram(values, bins=[0] + BUCKETS_MS + [np.inf])[0] if self.latencies else []
+        return {
+            'count': len(self.latencies),
+            'errors': self.errors,
+            'error_rate': round(self.errors / len(self.latencies), 4) if self.latencies else 0.0,
+            'statuses': {str(code): n for code, n in sorted(self.statuses.items())},
+            'p50_ms': round(float(np.percentile(values, 50)), 2),
+            'p95_ms': round(float(np.percentile(values, 95)), 2),
+            'p99_ms': round(float(np.percentile(values, 99)), 2),
+            'max_ms': round(float(values.max()), 2),
+            'histogram_ms': {
+                f"<={bound}" if bound != np.inf else f">{BUCKETS_MS[-1]}": int(n)
+                for bound, n in zip(BUCKETS_MS + [np.inf], counts)
+            }
+        }
+
+
+class LoadTest:
+    """
+    Simulated users against the API, in-process or over HTTP.
+
+    Every simulated user registers and logs in through ``/auth``, then
+    draws actions from the traffic mix until the request budget is spent:
+    browsing ``/movies`` (paging, title searches and genre filters), movie
+    details, rating movies (``POST /ratings``, or ``PUT`` when the user has
+    rated the movie already), their own recommendations and similar movies.
+    """
+
+    def __init__(self, client: httpx.AsyncClient, mix: Dict[str, float], n_users: int,
+                 think_ms: float = 0.0, seed: int = 42):
+        """
+        Initialize load test.
+
+        Args:
+            client: Client for the app (base URL of a server, or an ASGI transport)
+            mix: Action shares (see ``parse_mix``)
+            n_users: Simulated users, each running one request at a time
+            think_ms: Mean pause between a user's requests (exponential)
+            seed: Random seed for the traffic plan
+        """
+        self.client = client
+        self.mix = mix
+        self.n_users = n_users
+        self.think_ms = think_ms
+        self.rng = random.Random(seed)
+        self.run_id = uuid.uuid4().hex[:8]
+        self.stats: Dict[str, EndpointStats] = {}
+        self.movie_ids: List[int] = []
+        self.search_terms: List[str] = []
+        self.genres: List[str] = []
+        # (user_id, rating_id) of every rating created, for cleanup
+        self.created_ratings: List[Tuple[int, int]] = []
+
+    async def _call(self, endpoint: str, method: str, url: str, expected=(200,), **kwargs) -> Optional[httpx.Response]:
+        start = time.perf_counter()
+        try:
+            response = await self.client.request(method, url, **kwargs)
+        except Exception:
+            self.stats.setdefault(endpoint, EndpointStats()).record(time.perf_counter() - start, None, False)
+            return None
+        elapsed = time.perf_counter() - start
+        ok = response.status_code in expected
+        self.stats.setdefault(endpoint, EndpointStats()).record(elapsed, response.status_code, ok)
+        return response if ok else None
+
+    async def discover(self, pages: int = 5):
+        """Collect movie ids, title words and genres from the listing to build requests from."""
+        for page in range(1, pages + 1):
+            response = await self.client.get(f"{API}/movies", params={'page': page, 'limit': 100})
+            response.raise_for_status()
+            movies = response.json()['movies']
+            if not movies:
+                break
+            for movie in movies:
+                self.movie_ids.append(movie['movie_id'])
+                self.search_terms.extend(word for word in movie['title'].split() if len(word) >= 4)
+                self.genres.extend(genre for genre in movie['genres'] if genre)
+        if not self.movie_ids:
+            raise RuntimeError("The movie listing is empty; nothing to load-test against")
+        self.search_terms = sorted(set(self.search_terms)) or ['the']
+        self.genres = sorted(set(self.genres))
+
+    async def sign_up(self, index: int) -> Optional[int]:
+        """Register and log in one simulated user; returns its user id."""
+        credentials = {'username': f"load-{self.run_id}-{index}", 'password': 'load-test'}
+        if await self._call('auth/register', 'POST', f"{API}/auth/register", expected=(201,),
+                            json=credentials) is None:
+            return None
+        response = await self._call('auth/login', 'POST', f"{API}/auth/login", json=credentials)
+        return response.json()['user_id'] if response is not None else None
+
+    async def _browse(self, user: Dict):
+        params = {'page': self.rng.choice([1, 1, 1, 2, 3]), 'limit': 20}
+        kind = self.rng.random()
+        if kind < 0.3:
+            params['search'] = self.rng.choice(self.search_terms)
+            endpoint = 'movies (search)'
+        elif kind < 0.5 and self.genres:
+            params['genre'] = self.rng.choice(self.genres)
+            endpoint = 'movies (genre)'
+        else:
+            endpoint = 'movies'
+        await self._call(endpoint, 'GET', f"{API}/movies", params=params)
+
+    async def _detail(self, user: Dict):
+        await self._call('movie detail', 'GET', f"{API}/movies/{self.rng.choice(self.movie_ids)}")
+
+    async def _rate(self, user: Dict):
+        movie_id = self.rng.choice(self.movie_ids)
+        value = round(self.rng.uniform(1, 5), 1)
+        rating_id = user['ratings'].get(movie_id)
+        if rating_id is not None:
+            await self._call('rating update', 'PUT', f"{API}/ratings/{rating_id}", json={'rating': value})
+            return
+        response = await self._call('rating create', 'POST', f"{API}/ratings", expected=(201,),
+                                    json={'user_id': user['user_id'], 'movie_id': movie_id, 'rating': value})
+        if response is not None:
+            rating_id = response.json()['rating_id']
+            user['ratings'][movie_id] = rating_id
+            self.created_ratings.append((user['user_id'], rating_id))
+
+    async def _recommend(self, user: Dict):
+        await self._call('recommendations', 'GET', f"{API}/recommendations/{user['user_id']}",
+                         params={'limit': 10})
+
+    async def _similar(self, user: Dict):
+        # Movies without factors (no ratings at training time) answer 404
+        await self._call('similar', 'GET', f"{API}/recommendations/similar/{self.rng.choice(self.movie_ids)}",
+                         expected=(200, 404), params={'limit': 10})
+
+    async def run(self, n_requests: int) -> Dict:
+        """
+        Sign up the simulated users, then replay ``n_requests`` requests of the mix.
+
+        Returns:
+            Sign-up time, throughput and a summary per endpoint
+        """
+        start = time.perf_counter()
+        user_ids = await asyncio.gather(*(self.sign_up(i) for i in range(self.n_users)))
+        users = [{'user_id': user_id, 'ratings': {}} for user_id in user_ids if user_id is not None]
+        signup_seconds = time.perf_counter() - start
+        if not users:
+            raise RuntimeError("No simulated user could sign up")
+
+        actions = {'browse': self._browse, 'detail': self._detail, 'rate': self._rate,
+                   'recommend': self._recommend, 'similar': self._similar}
+        names, weights = zip(*self.mix.items())
+        plan = self.rng.choices(names, weights=weights, k=n_requests)
+        queue: asyncio.Queue = asyncio.Queue()
+        for name in plan:
+            queue.put_nowait(name)
+        signup_stats = {name: self.stats.pop(name) for name in list(self.stats)}
+
+        async def user_loop(user: Dict):
+            while not queue.empty():
+                await actions[queue.get_nowait()](user)
+                if self.think_ms > 0:
+                    await asyncio.sleep(self.rng.expovariate(1000 / self.think_ms))
+
+        start = time.perf_counter()
+        await asyncio.gather(*(user_loop(user) for user in users))
+        elapsed = time.perf_counter() - start
+
+        completed = sum(len(stats.latencies) for stats in self.stats.values())
+        errors = sum(stats.errors for stats in self.stats.values())
+        return {
+            'users': len(users),
+            'signup_seconds': round(signup_seconds, 2),
+            'signup': {name: stats.summary() for name, stats in signup_stats.items()},
+            'requests': completed,
+            'errors': errors,
+            'error_rate': round(errors / completed, 4) if completed else 0.0,
+            'seconds': round(elapsed, 2),
+            'throughput_rps': round(completed / elapsed, 1) if elapsed > 0 else 0.0,
+            'endpoints': {name: self.stats[name].summary() for name in sorted(self.stats)}
+        }
+
+    async def cleanup(self):
+        """Delete the ratings created by the run (the simulated users stay registered)."""
+        for _, rating_id in self.created_ratings:
+            await self.client.delete(f"{API}/ratings/{rating_id}")
+
+
+def print_report(result: Dict):
+    print(f"\n{result['users']} users signed up in {result['signup_seconds']}s; "
+          f"{result['requests']} requests in {result['seconds']}s → {result['throughput_rps']} req/s, "
+          f"{result['errors']} errors ({result['error_rate']:.2%})")
+    print("=" * 84)
+    print(f"{'endpoint':<20} {'count':>6} {'errors':>7} {'p50':>9} {'p95':>9} {'p99':>9} {'max':>9}")
+    for name, stats in result['endpoints'].items():
+        print(f"{name:<20} {stats['count']:>6} {stats['errors']:>7} {stats['p50_ms']:>7}ms "
+              f"{stats['p95_ms']:>7}ms {stats['p99_ms']:>7}ms {stats['max_ms']:>7}ms")
+    print("\nLatency histogram (requests per bucket, ms)")
+    header = list(next(iter(result['endpoints'].values()))['histogram_ms'])
+    print(f"{'endpoint':<20} " + ' '.join(f"{bucket:>7}" for bucket in header))
+    for name, stats in result['endpoints'].items():
+        print(f"{name:<20} " + ' '.join(f"{n:>7}" for n in stats['histogram_ms'].values()))
+
+
+async def main(args) -> Dict:
+    mix = parse_mix(args.mix)
+    if args.url:
+        client = httpx.AsyncClient(base_url=args.url, timeout=args.timeout,
+                                   limits=httpx.Limits(max_connections=args.users))
+    else:
+        from app.database import init_db
+        from app.main import app
+        init_db()
+        client = httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://load",
+                                   timeout=args.timeout)
+    async with client:
+        test = LoadTest(client, mix, args.users, think_ms=args.think_ms, seed=args.seed)
+        await test.discover()
+        result = await test.run(args.requests)
+        if args.cleanup:
+            await test.cleanup()
+    result['target'] = args.url or 'in-process'
+    result['mix'] = {name: round(share, 3) for name, share in mix.items()}
+    return result
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Load-test the API with simulated users and a realistic traffic mix")
+    parser.add_argument('--url', help="Base URL of a running server, e.g. http://localhost:8000 "
+                                      "(default: call the app in-process)")
+    parser.add_argument('--users', type=int, default=20, help="Simulated users (concurrent clients)")
+    parser.add_argument('--requests', type=int, default=1000, help="Requests after sign-up")
+    parser.add_argument('--mix', default=','.join(f"{name}={share}" for name, share in DEFAULT_MIX.items()),
+                        help="Action weights (browse, detail, rate, recommend, similar)")
+    parser.add_argument('--think-ms', type=float, default=0.0, help="Mean pause between a user's requests")
+    parser.add_argument('--timeout', type=float, default=30.0, help="Request timeout in seconds")
+    parser.add_argument('--seed', type=int, default=42)
+    parser.add_argument('--cleanup', action='store_true', help="Delete the ratings created by the run")
+    parser.add_argument('--output', type=Path, help="Write the report as JSON")
+    args = parser.parse_args()
+    try:
+        parse_mix(args.mix)
+    except ValueError as e:
+        parser.error(str(e))
+
+    print(f"🚦 Load test: {args.users} users, {args.requests} requests against {args.url or 'the app in-process'}")
+    result = asyncio.run(main(args))
+    print_report(result)
+    if args.output is not None:
+        args.output.parent.mkdir(parents=True, exist_ok=True)
+        with open(args.output, 'w') as f:
+            json.dump(result, f, indent=2)
+        print(f"\n✓ Report saved to {args.output}")
+    if result['errors']:
+        sys.exit(1)
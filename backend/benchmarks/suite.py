@@ -0,0 +1,255 @@
+"""Latency and memory benchmarks for the recommendation, similarity and training hot paths."""
+import argparse
+import contextlib
+import io
+import json
+import os
+import platform
+import subprocess
+import time
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Callable, Dict, List, Optional, Sequence
+import sys
+
+# Add parent directory to path
+sys.path.append(str(Path(__file__).parent.parent))
+
+import numpy as np
+from benchmarks.synthetic import SIZES, generate_database
+from app.ml.artifacts import current_rss_mb, load_scorer
+from app.ml.recommender import RecommendationEngine
+from app.ml.train_model import train_native_model, train_svd_model
+
+BASE_DIR = Path(__file__).parent.parent
+
+
+def _reset_peak_rss() -> bool:
+    """Reset the kernel's peak-RSS counter for this process (Linux only)."""
+    try:
+        with open('/proc/self/clear_refs', 'w') as f:
+            f.write('5')
+        return True
+    except OSError:
+        return False
+
+
+def _peak_rss_mb() -> float:
+    """Peak resident set size in MB since the last reset."""
+    try:
+        with open('/proc/self/status') as f:
+            for line in f:
+                if line.startswith('VmHWM:'):
+                    return round(int(line.split()[1]) / 1024, 1)
+    except OSError:
+        pass
+    import resource
+    return round(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024, 1)
+
+
+def _quiet():
+    """Swallow the progress output of training and loading; only timings are reported."""
+    return contextlib.redirect_stdout(io.StringIO())
+
+
+def measure(calls: Sequence[Callable], warmup: int = 1) -> Dict:
+    """
+    Time each call and record the memory high-water mark over all of them.
+
+    Args:
+        calls: Zero-argument callables, one timed sample each
+        warmup: Calls run first without timing (from the start of ``calls``)
+
+    Returns:
+        Sample count, mean/p50/p95/p99/max latency in ms, peak RSS and its
+        increase over the RSS before the first call (MB)
+    """
+    for call in calls[:warmup]:
+        call()
+    start_rss = current_rss_mb()
+    _reset_peak_rss()
+    latencies = []
+    for call in calls:
+        start = time.perf_counter()
+        call()
+        latencies.append((time.perf_counter() - start) * 1000)
+    peak = _peak_rss_mb()
+    values = np.array(latencies)
+    return {
+        'count': len(values),
+        'mean_ms': round(float(values.mean()), 3),
+        'p50_ms': round(float(np.percentile(values, 50)), 3),
+        'p95_ms': round(float(np.percentile(values, 95)), 3),
+        'p99_ms': round(float(np.percentile(values, 99)), 3),
+        'max_ms': round(float(values.max()), 3),
+        'peak_rss_mb': peak,
+        'peak_rss_delta_mb': round(max(peak - start_rss, 0.0), 1)
+    }
+
+
+def prepare_dataset(size: str, data_dir: Path, regenerate: bool = False, seed: int = 42) -> Dict:
+    """Generate the database for a size, reusing one built with the same parameters."""
+    n_movies, n_users, ratings_per_user = SIZES[size]
+    params = {'movies': n_movies, 'users': n_users, 'ratings_per_user': ratings_per_user, 'seed': seed}
+    manifest_path = data_dir / 'dataset.json'
+    if not regenerate and manifest_path.exists() and (data_dir / 'database.db').exists():
+        with open(manifest_path) as f:
+            manifest = json.load(f)
+        if manifest.get('params') == params:
+            return manifest
+    summary = generate_database(data_dir / 'database.db', n_movies, n_users, ratings_per_user, seed=seed)
+    manifest = {'params': params, **summary}
+    with open(manifest_path, 'w') as f:
+        json.dump(manifest, f, indent=2)
+    return manifest
+
+
+def run_size(size: str, data_dir: Path, n_queries: int = 200, with_cv: bool = False,
+             skip_training: bool = False, regenerate: bool = False) -> Dict:
+    """
+    Benchmark every hot path on one synthetic dataset size.
+
+    Returns:
+        {'dataset': summary, 'benchmarks': {name: measurement}}
+    """
+    print(f"\n📦 {size}: preparing dataset in {data_dir}...")
+    dataset = prepare_dataset(size, data_dir, regenerate)
+    print(f"   ✓ {dataset['movies']:,} movies, {dataset['users']:,} users, {dataset['ratings']:,} ratings")
+    db_path = data_dir / 'database.db'
+    model_path = data_dir / 'trained_model.pkl'
+    artifact_dir = data_dir / 'model'
+    results = {}
+
+    def record(name: str, result: Dict):
+        results[name] = result
+        print(f"   {name:<32} p50 {result['p50_ms']:>10.3f}ms  p95 {result['p95_ms']:>10.3f}ms  "
+              f"p99 {result['p99_ms']:>10.3f}ms  peak +{result['peak_rss_delta_mb']}MB")
+
+    if not skip_training or not model_path.exists():
+        cv_metrics = None if with_cv else {'rmse': float('nan'), 'mae': float('nan')}
+
+        def train_svd():
+            with _quiet():
+                train_svd_model(db_path=db_path, model_path=model_path, artifact_dir=artifact_dir,
+                                cv_metrics=cv_metrics)
+
+        def train_als():
+            with _quiet():
+                train_native_model('als', db_path=db_path, artifact_dir=data_dir / 'model_als',
+                                   matrix_dir=data_dir / 'training')
+
+        record('train_svd_model' + ('' if with_cv else ' (no CV)'), measure([train_svd], warmup=0))
+        record('train_native_model (als)', measure([train_als], warmup=0))
+
+    record('model_load (artifact)', measure([lambda: load_scorer(artifact_dir)] * 20))
+    record('model_load (pickle)', measure([lambda: load_scorer(data_dir / 'missing', model_path)] * 5))
+
+    # Cache and precompute off: every call scores the catalog
+    with _quiet():
+        engine = RecommendationEngine(
+            model_path=model_path, db_path=db_path, artifact_dir=artifact_dir,
+            precomputed_dir=data_dir / 'precomputed', cache_size=0
+        )
+        engine.get_recommendations(1, 10)
+    rng = np.random.default_rng(0)
+    user_ids = rng.choice(engine.scorer.user_ids, size=n_queries).tolist()
+    movie_ids = rng.choice(engine.scorer.item_ids, size=n_queries).tolist()
+    record('get_recommendations', measure([lambda u=u: engine.get_recommendations(u, 10) for u in user_ids]))
+    record('get_similar_movies', measure([lambda m=m: engine.get_similar_movies(m, 10) for m in movie_ids]))
+    record('get_popular_movies', measure([lambda: engine.get_popular_movies(10)] * n_queries))
+    engine.db.close()
+
+    return {'dataset': dataset, 'benchmarks': results}
+
+
+def _git_commit() -> Optional[str]:
+    try:
+        return subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], cwd=BASE_DIR, capture_output=True,
+                              text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def compare(current: Dict, baseline: Dict, threshold: float = 0.2) -> List[str]:
+    """
+    Compare p50/p95 latencies with a baseline run.
+
+    Args:
+        current: Results of this run
+        baseline: Results of an earlier run (e.g. the previous commit)
+        threshold: Relative slowdown reported as a regression
+
+    Returns:
+        Descriptions of the regressions found
+    """
+    regressions = []
+    print(f"\n📈 Compared with {baseline['meta'].get('commit')} ({baseline['meta']['created_at']})")
+    for size, result in current['sizes'].items():
+        old_size = baseline['sizes'].get(size)
+        if old_size is None:
+            continue
+        for name, stats in result['benchmarks'].items():
+            old = old_size['benchmarks'].get(name)
+            if old is None:
+                continue
+            ratios = {key: stats[key] / old[key] if old[key] else 1.0 for key in ('p50_ms', 'p95_ms')}
+            flag = ''
+            if any(ratio > 1 + threshold for ratio in ratios.values()):
+                flag = '  ❌ regression'
+                regressions.append(f"{size}/{name}: p50 x{ratios['p50_ms']:.2f}, p95 x{ratios['p95_ms']:.2f}")
+            print(f"   {size:<7} {name:<32} p50 x{ratios['p50_ms']:.2f}  p95 x{ratios['p95_ms']:.2f}{flag}")
+    return regressions
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark recommendation, similarity and training hot paths")
+    parser.add_argument('--sizes', default='small', help=f"Comma-separated dataset sizes ({', '.join(SIZES)})")
+    parser.add_argument('--queries', type=int, default=200, help="Timed calls per serving benchmark")
+    parser.add_argument('--data-dir', type=Path, default=BASE_DIR / 'data' / 'benchmarks',
+                        help="Where the synthetic datasets and models are kept between runs")
+    parser.add_argument('--output', type=Path, help="Results JSON (default: <data-dir>/results-<commit>.json)")
+    parser.add_argument('--compare', type=Path, help="Earlier results JSON to compare against")
+    parser.add_argument('--threshold', type=float, default=0.2, help="Slowdown counted as a regression")
+    parser.add_argument('--cv', action='store_true', help="Include 5-fold cross-validation in train_svd_model")
+    parser.add_argument('--skip-training', action='store_true', help="Reuse the trained models of an earlier run")
+    parser.add_argument('--regenerate', action='store_true', help="Rebuild the synthetic databases")
+    args = parser.parse_args()
+
+    sizes = [size.strip() for size in args.sizes.split(',')]
+    unknown = [size for size in sizes if size not in SIZES]
+    if unknown:
+        parser.error(f"Unknown sizes: {', '.join(unknown)}")
+
+    print("⏱️  Running benchmark suite...")
+    print("=" * 60)
+    commit = _git_commit()
+    report = {
+        'meta': {
+            'commit': commit,
+            'created_at': datetime.now(timezone.utc).isoformat(),
+            'python': platform.python_version(),
+            'numpy': np.__version__,
+            'platform': platform.platform(),
+            'cpu_count': os.cpu_count(),
+            'queries': args.queries,
+            'cv': args.cv
+        },
+        'sizes': {}
+    }
+    for size in sizes:
+        report['sizes'][size] = run_size(size, args.data_dir / size, args.queries, args.cv,
+                                         args.skip_training, args.regenerate)
+
+    output = args.output or args.data_dir / f"results-{commit or datetime.now().strftime('%Y%m%dT%H%M%S')}.json"
+    output.parent.mkdir(parents=True, exist_ok=True)
+    with open(output, 'w') as f:
+        json.dump(report, f, indent=2)
+    print(f"\n✓ Results saved to {output}")
+
+    if args.compare is not None:
+        with open(args.compare) as f:
+            regressions = compare(report, json.load(f), args.threshold)
+        if regressions:
+            print(f"\n❌ {len(regressions)} regression(s) over {args.threshold:.0%}")
+            sys.exit(1)
+        print("\n✅ No regressions")
@@ -0,0 +1,120 @@
+"""Synthetic movie catalogs and rating matrices for benchmarks."""
+import sqlite3
+import time
+import numpy as np
+from datetime import datetime, timedelta
+from pathlib import Path
+from typing import Dict
+import sys
+
+# Add parent directory to path
+sys.path.append(str(Path(__file__).parent.parent))
+
+from sqlalchemy import create_engine
+from app.database import Base
+from app.models import movie, rating, user  # noqa: F401  (register the tables)
+
+GENRES = [
+    'Action', 'Adventure', 'Animation', 'Comedy', 'Crime', 'Documentary', 'Drama', 'Family',
+    'Fantasy', 'Film-Noir', 'History', 'Horror', 'Musical', 'Mystery', 'Romance', 'Sci-Fi',
+    'Sport', 'Thriller', 'War', 'Western',
+]
+
+# name -> (movies, users, average ratings per user)
+SIZES = {
+    'small': (1_000, 500, 50),
+    'medium': (5_000, 5_000, 100),
+    'large': (20_000, 50_000, 100),
+}
+
+
+def generate_database(db_path: Path, n_movies: int, n_users: int, ratings_per_user: int,
+                      image_share: float = 0.7, seed: int = 42) -> Dict:
+    """
+    Write a synthetic database with the application schema.
+
+    Ratings follow ``scripts/generate_ratings.py``: each movie gets an IMDb
+    score and users rate it around ``imdb_score / 10 * 5`` with Gaussian
+    noise (sd 0.5), clipped to 1-5 and rounded to 0.1. Users rate
+    ``ratings_per_user`` +/- 20 movies, drawn with a long-tailed popularity
+    so some movies collect far more ratings than others.
+
+    Args:
+        db_path: Database file to create (replaced if it exists)
+        n_movies: Number of movies
+        n_users: Number of users
+        ratings_per_user: Average number of ratings per user
+        image_share: Fraction of movies with an image (recommendable)
+        seed: Random seed
+
+    Returns:
+        Dataset summary (sizes and generation time)
+    """
+    start = time.perf_counter()
+    rng = np.random.default_rng(seed)
+    db_path = Path(db_path)
+    db_path.parent.mkdir(parents=True, exist_ok=True)
+    if db_path.exists():
+        db_path.unlink()
+    engine = create_engine(f"sqlite:///{db_path}")
+    Base.metadata.create_all(bind=engine)
+    engine.dispose()
+
+    # Movies
+    imdb_scores = np.clip(rng.normal(6.5, 1.2, n_movies), 1.0, 10.0).round(1)
+    n_genres = rng.integers(1, 4, n_movies)
+    has_image = rng.random(n_movies) < image_share
+    movies = [
+        (
+            movie_id,
+            f"Movie {movie_id}",
+            str(1970 + int(rng.integers(0, 55))),
+            ','.join(rng.choice(GENRES, n_genres[movie_id - 1], replace=False)),
+            f"/img/{movie_id}.jpg" if has_image[movie_id - 1] else None,
+            float(imdb_scores[movie_id - 1]),
+        )
+        for movie_id in range(1, n_movies + 1)
+    ]
+
+    # Ratings: long-tailed movie popularity, duplicates per user dropped
+    counts = np.maximum(1, rng.integers(ratings_per_user - 20, ratings_per_user + 21, n_users))
+    counts = np.minimum(counts, n_movies)
+    popularity = 1.0 / (np.arange(n_movies) + 10.0)
+    popularity = rng.permutation(popularity / popularity.sum())
+    user_idx = np.repeat(np.arange(n_users, dtype=np.int64), counts)
+    movie_idx = rng.choice(n_movies, size=len(user_idx), p=popularity)
+    pairs = np.unique(user_idx * n_movies + movie_idx)
+    user_idx, movie_idx = pairs // n_movies, pairs % n_movies
+    values = np.clip(imdb_scores[movie_idx] / 10 * 5 + rng.normal(0, 0.5, len(pairs)), 1.0, 5.0).round(1)
+    now = datetime(2025, 1, 1)
+    offsets = rng.integers(0, 2 * 365 * 24 * 3600, len(pairs))
+
+    conn = sqlite3.connect(db_path)
+    conn.executemany(
+        "INSERT INTO movies (movie_id, title, release_date, genres, image_url, imdb_score) "
+        "VALUES (?, ?, ?, ?, ?, ?)", movies
+    )
+    conn.executemany(
+        "INSERT INTO users (user_id, username, hashed_password) VALUES (?, ?, 'x')",
+        ((user_id, f"user{user_id}") for user_id in range(1, n_users + 1))
+    )
+    conn.executemany(
+        "INSERT INTO ratings (user_id, movie_id, rating, timestamp) VALUES (?, ?, ?, ?)",
+        zip((user_idx + 1).tolist(), (movie_idx + 1).tolist(), values.tolist(),
+            ((now - timedelta(seconds=int(s))).isoformat() for s in offsets))
+    )
+    conn.execute("""
+        UPDATE movies SET
+            avg_rating = (SELECT AVG(rating) FROM ratings WHERE ratings.movie_id = movies.movie_id),
+            rating_count = (SELECT COUNT(*) FROM ratings WHERE ratings.movie_id = movies.movie_id)
+    """)
+    conn.commit()
+    conn.close()
+
+    return {
+        'movies': n_movies,
+        'users': n_users,
+        'ratings': int(len(pairs)),
+        'movies_with_image': int(has_image.sum()),
+        'generate_seconds': round(time.perf_counter() - start, 2)
+    }
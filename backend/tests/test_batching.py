@@ -0,0 +1,38 @@
+"""Micro-batching of recommendation requests."""
+import asyncio
+
+from app.ml.batching import RecommendationBatcher
+
+BAD_USER = 9223372036854775808
+
+
+def handler(requests):
+    """Fails the whole batch when any user is bad, like a SQLite overflow would."""
+    if any(user_id == BAD_USER for user_id, _ in requests):
+        raise OverflowError("Python int too large to convert to SQLite INTEGER")
+    return [[{'movie_id': user_id, 'n': n}] for user_id, n in requests]
+
+
+async def submit_all(batcher, requests):
+    return await asyncio.gather(
+        *(batcher.submit(user_id, n) for user_id, n in requests), return_exceptions=True
+    )
+
+
+def test_requests_share_a_batch():
+    batcher = RecommendationBatcher(handler, window_ms=20, max_batch_size=32)
+    results = asyncio.run(submit_all(batcher, [(1, 5), (2, 3)]))
+    assert results == [[{'movie_id': 1, 'n': 5}], [{'movie_id': 2, 'n': 3}]]
+    assert batcher.batch_sizes == {2: 1}
+
+
+def test_one_bad_request_fails_alone():
+    batcher = RecommendationBatcher(handler, window_ms=20, max_batch_size=32)
+    requests = [(1, 5), (2, 5), (BAD_USER, 5), (3, 5), (4, 5), (5, 5)]
+    results = asyncio.run(submit_all(batcher, requests))
+
+    assert isinstance(results[2], OverflowError)
+    assert [result for i, result in enumerate(results) if i != 2] == [
+        [{'movie_id': user_id, 'n': 5}] for user_id in (1, 2, 3, 4, 5)
+    ]
+    assert batcher.split_batches == 1
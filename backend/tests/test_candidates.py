@@ -0,0 +1,39 @@
+"""Candidate generation: a user's rated movies never come back as candidates."""
+import numpy as np
+
+from app.catalog import CatalogSnapshot
+from app.ml.candidates import CandidateSpace, UserHistory
+from app.ml.scoring import FactorScorer
+
+
+def make_space():
+    # Movie 4 has no image and is never a candidate
+    rows = [
+        (movie_id, f"Movie {movie_id}", None, 'Drama', 3.0, 10,
+         None if movie_id == 4 else f"{movie_id}.jpg", None, None, None, None, None)
+        for movie_id in range(1, 8)
+    ]
+    rng = np.random.default_rng(3)
+    scorer = FactorScorer(3.5, rng.normal(size=2), rng.normal(size=5), rng.normal(size=(2, 4)),
+                          rng.normal(size=(5, 4)), user_ids=[1, 2], item_ids=[1, 2, 3, 4, 5])
+    return CandidateSpace(CatalogSnapshot(rows), scorer)
+
+
+def test_rated_movies_are_excluded_from_candidates():
+    space = make_space()
+    histories = [
+        UserHistory.from_rows([(2, 5.0), (4, 3.0), (6, 1.0), (99, 4.0)]),  # 99 is not in the catalog
+        UserHistory.from_rows([])
+    ]
+    mask = space.unrated_mask(histories)
+
+    assert space.movie_ids.tolist() == [1, 2, 3, 5, 6, 7]
+    assert space.movie_ids[mask[0]].tolist() == [1, 3, 5, 7]
+    assert mask[1].all()
+
+
+def test_recent_positive_ratings_are_newest_first():
+    history = UserHistory.from_rows([(6, 4.0), (2, 5.0), (3, 2.0), (1, 4.5)])
+    assert history.movie_ids.tolist() == [1, 2, 3, 6]
+    assert history.ratings.tolist() == [4.5, 5.0, 2.0, 4.0]
+    assert history.recent_positive == (6, 2, 1)
@@ -0,0 +1,48 @@
+"""Catalog listings stay consistent with rating stats that change while they are built."""
+import numpy as np
+
+from app.catalog import CatalogSnapshot
+
+
+def make_snapshot():
+    rows = [
+        (movie_id, f"Movie {movie_id}", None, 'Drama', avg_rating, 10, None, None, None, None, None, None)
+        for movie_id, avg_rating in [(1, 3.0), (2, 4.0), (3, 2.0)]
+    ]
+    return CatalogSnapshot(rows)
+
+
+def listed_ids(snapshot, genre=None):
+    return snapshot.movie_ids[snapshot.listing(genre).positions].tolist()
+
+
+def test_listing_follows_stats_updates():
+    snapshot = make_snapshot()
+    assert listed_ids(snapshot) == [2, 1, 3]
+    snapshot.update_stats(2, 5.0, 11)
+    assert listed_ids(snapshot) == [3, 2, 1]
+    assert snapshot.rating_counts[2] == 11
+
+
+def test_listing_built_during_an_update_is_not_cached():
+    snapshot = make_snapshot()
+    rating_order = snapshot._rating_order
+
+    def order_then_update(ratings, counts=None):
+        # A rating write lands after the listing read the old averages
+        snapshot._rating_order = rating_order
+        snapshot.update_stats(2, 5.0, 11)
+        return rating_order(ratings, counts)
+
+    snapshot._rating_order = order_then_update
+    assert listed_ids(snapshot) == [2, 1, 3]
+    assert listed_ids(snapshot) == [3, 2, 1]
+
+
+def test_popular_orders_by_average_then_count():
+    snapshot = make_snapshot()
+    snapshot.update_stats(0, 4.0, 50)
+    assert snapshot.movie_ids[snapshot.popular(3, min_ratings=0)].tolist() == [1, 2, 3]
+    snapshot.update_stats(1, None, 0)
+    assert np.isnan(snapshot.avg_ratings[1])
+    assert snapshot.movie_ids[snapshot.popular(3, min_ratings=0)].tolist() == [1, 3, 2]
@@ -0,0 +1,52 @@
+"""Two-stage re-ranking returns what full scoring does whenever it sees the full top N."""
+import numpy as np
+
+from app.catalog import CatalogSnapshot
+from app.metrics import StageTimer, recommendation_stage_seconds
+from app.ml.candidates import CandidateSpace, UserHistory
+from app.ml.pipeline import ReRanker
+from app.ml.recommender import RecommendationEngine
+from app.ml.registry import ModelVersion
+from app.ml.scoring import FactorScorer
+
+GENRES = ['Drama', 'Comedy', 'Drama, Comedy', 'Horror', '']
+GENRE_BOOST = {'Drama': 0.4, 'Comedy': 0.2}
+
+
+def make_model_and_space(n_movies=300):
+    rows = [
+        (movie_id, f"Movie {movie_id}", None, GENRES[movie_id % len(GENRES)], 3.0, 10,
+         None if movie_id % 17 == 0 else f"{movie_id}.jpg", None, None, None, None, None)
+        for movie_id in range(1, n_movies + 1)
+    ]
+    rng = np.random.default_rng(11)
+    # The model misses the last movies, which score on the baselines alone
+    item_ids = list(range(1, n_movies - 9))
+    scorer = FactorScorer(3.5, rng.normal(scale=0.3, size=3), rng.normal(scale=0.5, size=len(item_ids)),
+                          rng.normal(scale=0.5, size=(3, 8)), rng.normal(scale=0.5, size=(len(item_ids), 8)),
+                          user_ids=[1, 2, 3], item_ids=item_ids)
+    snapshot = CatalogSnapshot(rows)
+    return ModelVersion(scorer, {'version': 'test'}), snapshot, CandidateSpace(snapshot, scorer)
+
+
+def test_reranked_candidates_containing_the_top_n_equal_full_scoring():
+    model, snapshot, space = make_model_and_space()
+    history = UserHistory.from_rows([(movie_id, 4.0) for movie_id in range(5, 60, 3)])
+    allowed = space.unrated_mask([history])[0]
+    rng = np.random.default_rng(5)
+
+    for user_id in (1, 2, 3, 42):  # 42 is unknown to the model
+        for n in (1, 10, 25):
+            stages = StageTimer(recommendation_stage_seconds)
+            full_positions, full_scores = RecommendationEngine._rank_all(
+                model, snapshot, space, [user_id], [n], allowed[None], [GENRE_BOOST], stages)[0]
+
+            # The full top N plus some other unrated movies, as a retriever would find them
+            top_columns = space.column_of[full_positions]
+            others = rng.choice(np.flatnonzero(allowed), 40, replace=False)
+            columns = np.unique(np.concatenate([top_columns, others]))
+
+            _, positions, scores = ReRanker().rank(snapshot, space, model.scorer, user_id, columns,
+                                                   GENRE_BOOST, n, stages)
+            assert positions.tolist() == full_positions.tolist()
+            assert np.array_equal(scores, full_scores)
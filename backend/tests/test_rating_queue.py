@@ -0,0 +1,167 @@
+"""Durability of the rating write-behind queue: crash replay, several workers and rejected writes."""
+import json
+
+import pytest
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+
+import app.rating_queue as rating_queue
+from app.database import Base
+from app.models.movie import Movie
+from app.models.rating import Rating
+from app.models.user import User  # noqa: F401 (ratings reference users)
+from app.rating_queue import RatingQueue
+
+
+class Database:
+    """Session factory over a scratch SQLite file; fails while ``down``, like a lost database."""
+
+    def __init__(self, path):
+        engine = create_engine(f"sqlite:///{path}")
+        Base.metadata.create_all(engine)
+        self.sessions = sessionmaker(bind=engine)
+        self.down = False
+        with self.sessions() as db:
+            db.add_all([Movie(movie_id=movie_id, title=f"Movie {movie_id}") for movie_id in (10, 11, 12)])
+            db.commit()
+
+    def __call__(self):
+        if self.down:
+            raise RuntimeError("database unavailable")
+        return self.sessions()
+
+    def ratings(self):
+        with self.sessions() as db:
+            return {(r.user_id, r.movie_id): r.rating for r in db.query(Rating)}
+
+
+@pytest.fixture
+def database(tmp_path, monkeypatch):
+    # Keep the app's catalog and model out of it
+    monkeypatch.setattr(rating_queue, 'publish_ratings', lambda db, stats, user_ids: None)
+    return Database(tmp_path / 'ratings.db')
+
+
+def make_queue(tmp_path, session_factory, worker_id):
+    return RatingQueue(tmp_path / 'queue' / 'ratings.log', flush_ms=1, session_factory=session_factory,
+                       fsync=False, worker_id=worker_id)
+
+
+def unreachable_database():
+    raise RuntimeError("database unavailable")
+
+
+def crash(queue):
+    """Stop a queue whose writes cannot be applied: its log stays behind, unlocked, like after a crash."""
+    queue.stop(timeout=5)
+    assert queue.stats()['pending'] > 0
+
+
+def test_crash_replays_unapplied_writes(tmp_path, database):
+    database.down = True
+    queue = make_queue(tmp_path, database, '1')
+    queue.start()
+    queue.append([(1, 10, 4.0), (1, 11, 3.0), (1, 10, 5.0)])
+    crash(queue)
+    with open(queue.path, 'a') as f:
+        f.write('{"seq": 4, "user_id": 1')  # torn by the crash, never acknowledged
+
+    database.down = False
+    restarted = make_queue(tmp_path, database, '1')
+    restarted.start()
+    assert restarted.recovered == 3
+    assert restarted.flush(timeout=5)
+    restarted.stop()
+
+    assert database.ratings() == {(1, 10): 5.0, (1, 11): 3.0}
+    assert not restarted.path.exists()
+
+
+def test_applied_writes_are_not_replayed(tmp_path, database):
+    queue = make_queue(tmp_path, database, '1')
+    queue.start()
+    queue.append([(1, 10, 4.0)])
+    assert queue.flush(timeout=5)
+    database.down = True
+    queue.append([(1, 11, 2.0)])
+    crash(queue)
+
+    database.down = False
+    restarted = make_queue(tmp_path, database, '1')
+    restarted.start()
+    assert restarted.recovered == 1
+    assert restarted.flush(timeout=5)
+    restarted.stop()
+    assert database.ratings() == {(1, 10): 4.0, (1, 11): 2.0}
+
+
+def test_workers_do_not_lose_each_others_writes(tmp_path, database):
+    worker_a = make_queue(tmp_path, database, 'a')
+    # B cannot reach the database; A drains (and truncates) its own log meanwhile
+    worker_b = make_queue(tmp_path, unreachable_database, 'b')
+    worker_a.start()
+    worker_b.start()
+    assert worker_a.path != worker_b.path
+
+    worker_b.append([(2, 10, 5.0), (2, 11, 1.0)])
+    worker_a.append([(1, 10, 4.0)])
+    assert worker_a.flush(timeout=5)
+    assert worker_a.path.read_text() == ''
+    assert len(worker_b.path.read_text().splitlines()) == 2
+    crash(worker_b)
+
+    # A new worker takes over B's log, not the log of A, which is still running
+    worker_c = make_queue(tmp_path, database, 'c')
+    worker_c.start()
+    assert worker_c.adopted == 2
+    assert worker_c.flush(timeout=5)
+    assert not worker_b.path.exists()
+    assert worker_a.path.exists()
+
+    worker_a.append([(1, 12, 3.0)])
+    assert worker_a.flush(timeout=5)
+    worker_a.stop()
+    worker_c.stop()
+    assert database.ratings() == {(1, 10): 4.0, (1, 12): 3.0, (2, 10): 5.0, (2, 11): 1.0}
+
+
+def test_log_of_a_running_worker_cannot_be_opened_twice(tmp_path, database):
+    queue = make_queue(tmp_path, database, '1')
+    queue.start()
+    try:
+        with pytest.raises(RuntimeError):
+            make_queue(tmp_path, database, '1').start()
+    finally:
+        queue.stop()
+
+
+def test_rejected_write_is_dead_lettered_and_the_rest_drains(tmp_path, database):
+    queue = make_queue(tmp_path, database, '1')
+    queue.start()
+    # Not a number: the database session rejects it whenever it is retried
+    queue.append([(1, 10, 4.0), (1, 11, 'four'), (1, 12, 3.0)])
+    assert queue.flush(timeout=5)
+    queue.append([(2, 10, 5.0)])
+    assert queue.flush(timeout=5)
+    queue.stop()
+
+    assert database.ratings() == {(1, 10): 4.0, (1, 12): 3.0, (2, 10): 5.0}
+    assert queue.stats()['dead_lettered'] == 1
+    dead = [json.loads(line) for line in queue.dead_letter_path.read_text().splitlines()]
+    assert [(event['user_id'], event['movie_id'], event['rating']) for event in dead] == [(1, 11, 'four')]
+    assert not queue.path.exists()
+
+
+def test_writes_stay_queued_while_the_database_is_down(tmp_path, database):
+    database.down = True
+    queue = make_queue(tmp_path, database, '1')
+    queue.start()
+    queue.append([(1, 10, 4.0), (1, 11, 3.0)])
+    assert not queue.flush(timeout=0.5)
+    assert queue.stats()['dead_lettered'] == 0
+
+    database.down = False
+    assert queue.flush(timeout=5)
+    queue.stop()
+    assert database.ratings() == {(1, 10): 4.0, (1, 11): 3.0}
+    assert not queue.dead_letter_path.exists()
@@ -0,0 +1,37 @@
+"""Per-user rating versions, which tell whether a precompute snapshot is stale for a user."""
+from sqlalchemy import create_engine, text
+
+from app.database import Base
+from app.models.movie import Movie  # noqa: F401 (ratings reference movies)
+from app.models.rating import Rating  # noqa: F401
+from app.models.user import User  # noqa: F401 (ratings reference users)
+
+
+def versions(conn):
+    return dict(conn.execute(text("SELECT user_id, version FROM user_rating_versions")).fetchall())
+
+
+def test_every_rating_change_bumps_the_users_version(tmp_path):
+    engine = create_engine(f"sqlite:///{tmp_path / 'ratings.db'}")
+    Base.metadata.create_all(engine)
+    with engine.begin() as conn:
+        conn.execute(text("INSERT INTO ratings (user_id, movie_id, rating) VALUES (1, 10, 3), (2, 10, 4)"))
+        snapshot = max(versions(conn).values())
+
+        # An in-place update keeps rating_id, a delete lowers MAX(rating_id); both must count
+        conn.execute(text("UPDATE ratings SET rating = 5 WHERE user_id = 1"))
+        assert versions(conn)[1] > snapshot
+        assert versions(conn)[2] <= snapshot
+        conn.execute(text("DELETE FROM ratings WHERE user_id = 2"))
+        assert versions(conn)[2] > snapshot
+
+
+def test_triggers_are_added_to_existing_databases(tmp_path):
+    engine = create_engine(f"sqlite:///{tmp_path / 'ratings.db'}")
+    Base.metadata.create_all(engine)
+    with engine.begin() as conn:
+        conn.execute(text("DROP TRIGGER ratings_version_insert"))
+    Base.metadata.create_all(engine)
+    with engine.begin() as conn:
+        conn.execute(text("INSERT INTO ratings (user_id, movie_id, rating) VALUES (1, 10, 3)"))
+        assert 1 in versions(conn)
@@ -0,0 +1,90 @@
+"""Rating endpoints over a scratch database: keyset pages and bulk upserts."""
+from datetime import datetime
+
+import pytest
+from fastapi import HTTPException
+from sqlalchemy import create_engine, text
+from sqlalchemy.orm import sessionmaker
+
+import app.api.ratings as ratings_api
+from app.api.ratings import _bulk_upsert_ratings, _create_rating, _get_user_ratings
+from app.database import Base
+from app.models.movie import Movie
+from app.models.rating import Rating
+from app.models.user import User
+from app.schemas.rating import RatingCreate, RatingResponse
+
+
+@pytest.fixture
+def db(tmp_path, monkeypatch):
+    # Keep the app's catalog and model out of it
+    monkeypatch.setattr(ratings_api, 'publish_ratings', lambda db, stats, user_ids: None)
+    monkeypatch.setattr(ratings_api, '_publish_movie_stats', lambda movie_id, stats: None)
+    monkeypatch.setattr(ratings_api, '_refresh_user_model', lambda db, user_id: None)
+    engine = create_engine(f"sqlite:///{tmp_path / 'ratings.db'}")
+    Base.metadata.create_all(engine)
+    session = sessionmaker(bind=engine)()
+    session.add(User(user_id=1, username='user1', hashed_password='x'))
+    session.add_all([Movie(movie_id=movie_id, title=f"Movie {movie_id}") for movie_id in range(1, 13)])
+    session.commit()
+    yield session
+    session.close()
+
+
+def test_keyset_pages_neither_overlap_nor_skip_rows(db):
+    # Import-script and ORM timestamp formats, ties, and undated rows
+    timestamps = ['2001-01-01 10:00:00', '2001-01-01 10:00:00', '2003-05-01 08:00:00.000000',
+                  None, '2002-02-02 12:00:00', None, '2003-05-01 08:00:00.000000', '2000-12-31 23:59:59',
+                  None, '2004-01-01 00:00:00', '2002-02-02 12:00:00', '1999-09-09 09:09:09']
+    for movie_id, timestamp in enumerate(timestamps, start=1):
+        db.execute(text("INSERT INTO ratings (user_id, movie_id, rating, timestamp) VALUES (1, :movie, 3, :ts)"),
+                   {'movie': movie_id, 'ts': timestamp})
+    db.commit()
+
+    seen, cursor = [], None
+    while True:
+        page = _get_user_ratings(db, 1, 1, 5, cursor)
+        assert page['total'] == len(timestamps)
+        seen += [rating.rating_id for rating in page['ratings']]
+        cursor = page['next_cursor']
+        if cursor is None:
+            break
+
+    everything = [rating.rating_id for rating in _get_user_ratings(db, 1, 1, 100)['ratings']]
+    assert seen == everything
+    assert sorted(seen) == sorted(set(seen)) and len(seen) == len(timestamps)
+
+
+def test_malformed_cursor_is_rejected(db):
+    with pytest.raises(HTTPException) as error:
+        _get_user_ratings(db, 1, 1, 5, 'not-a-cursor')
+    assert error.value.status_code == 400
+
+
+def test_bulk_upsert_counts_created_and_updated_ratings(db):
+    _bulk_upsert_ratings(db, [RatingCreate(user_id=1, movie_id=1, rating=2)])
+    result = _bulk_upsert_ratings(db, [
+        RatingCreate(user_id=1, movie_id=1, rating=4),
+        RatingCreate(user_id=1, movie_id=2, rating=3),
+        RatingCreate(user_id=1, movie_id=2, rating=5)  # the last one of a pair wins
+    ])
+    assert (result['created'], result['updated']) == (1, 1)
+    assert {(r.movie_id, r.rating) for r in db.query(Rating)} == {(1, 4.0), (2, 5.0)}
+    assert db.get(Movie, 2).rating_count == 1
+
+
+def test_bulk_upsert_of_an_unknown_movie_writes_nothing(db):
+    with pytest.raises(HTTPException) as error:
+        _bulk_upsert_ratings(db, [RatingCreate(user_id=1, movie_id=1, rating=4),
+                                  RatingCreate(user_id=1, movie_id=999, rating=4)])
+    assert error.value.status_code == 404
+    assert '999' in error.value.detail
+    assert db.query(Rating).count() == 0
+
+
+def test_bulk_and_single_ratings_serialize_timestamps_alike(db):
+    single = RatingResponse.model_validate(_create_rating(db, RatingCreate(user_id=1, movie_id=1, rating=4)))
+    bulk = _bulk_upsert_ratings(db, [RatingCreate(user_id=1, movie_id=2, rating=4)])['ratings'][0]
+    for response in (single, bulk):
+        timestamp = response.model_dump(mode='json')['timestamp']
+        assert datetime.fromisoformat(timestamp).tzinfo is None
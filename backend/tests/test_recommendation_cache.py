@@ -0,0 +1,45 @@
+"""Cached recommendations are dropped when the user's ratings change."""
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+
+import app.ml.recommender as recommender
+from app.database import Base
+from app.ml.recommender import RecommendationCache, RecommendationEngine
+from app.models.movie import Movie
+from app.models.rating import Rating
+from app.models.user import User  # noqa: F401 (ratings reference users)
+from app.rating_writes import refresh_user_models
+
+RECOMMENDATIONS = [{'movie_id': movie_id, 'predicted_rating': 4.0} for movie_id in (1, 2, 3)]
+
+
+def test_invalidated_user_misses_the_cache():
+    cache = RecommendationCache()
+    cache.put(1, 3, RECOMMENDATIONS)
+    cache.put(2, 3, RECOMMENDATIONS)
+    assert cache.get(1, 2) == RECOMMENDATIONS[:2]
+
+    cache.invalidate(1)
+    assert cache.get(1, 3) is None
+    assert cache.get(2, 3) == RECOMMENDATIONS
+    assert cache.stats()['invalidations'] == 1
+
+
+def test_rating_write_invalidates_the_users_recommendations(tmp_path, monkeypatch):
+    bind = create_engine(f"sqlite:///{tmp_path / 'ratings.db'}")
+    Base.metadata.create_all(bind)
+    db = sessionmaker(bind=bind)()
+    db.add(Movie(movie_id=1, title="Movie 1"))
+    db.add(Rating(user_id=1, movie_id=1, rating=4.0))
+    db.commit()
+
+    # The model is not loaded: refreshing a user only drops their cached results
+    engine = RecommendationEngine(db_path=tmp_path / 'ratings.db')
+    monkeypatch.setattr(recommender, '_recommender_instance', engine)
+    engine.cache.put(1, 3, RECOMMENDATIONS)
+    engine.cache.put(2, 3, RECOMMENDATIONS)
+
+    refresh_user_models(db, [1])
+    db.close()
+    assert engine.cache.get(1, 3) is None
+    assert engine.cache.get(2, 3) == RECOMMENDATIONS
@@ -0,0 +1,70 @@
+"""Vectorized factor scoring against the surprise model it was extracted from, and online fold-in."""
+import numpy as np
+import pandas as pd
+import pytest
+from surprise import SVD, Dataset, Reader
+
+from app.ml.scoring import FactorScorer
+
+
+@pytest.fixture(scope='module')
+def svd():
+    rng = np.random.default_rng(7)
+    ratings = pd.DataFrame({
+        'user_id': rng.integers(1, 40, 600),
+        'movie_id': rng.integers(100, 160, 600),
+        'rating': rng.integers(1, 6, 600).astype(float)
+    }).drop_duplicates(['user_id', 'movie_id'])
+    data = Dataset.load_from_df(ratings, Reader(rating_scale=(1, 5)))
+    model = SVD(n_factors=8, n_epochs=5, random_state=7)
+    model.fit(data.build_full_trainset())
+    return model
+
+
+def test_scores_equal_svd_predict(svd):
+    scorer = FactorScorer.from_svd(svd)
+    # Known and unknown users and movies
+    user_ids = [int(user_id) for user_id in scorer.user_ids[:5]] + [999]
+    movie_ids = np.array([int(movie_id) for movie_id in scorer.item_ids] + [5000, 5001])
+    expected = np.array([[svd.predict(user_id, movie_id).est for movie_id in movie_ids] for user_id in user_ids])
+
+    for scores in (scorer.score_many(user_ids, movie_ids),
+                   np.array([scorer.score(user_id, movie_ids) for user_id in user_ids])):
+        # Without a dot product (unknown user or movie) the sums are the same, term by term
+        assert np.array_equal(scores[-1], expected[-1])
+        assert np.array_equal(scores[:, -2:], expected[:, -2:])
+        # A matrix product may sum the factors in another order than np.dot: a few ulps at most
+        assert np.allclose(scores, expected, rtol=0, atol=1e-12)
+        assert np.array_equal(np.round(scores, 2), np.round(expected, 2))
+
+
+def test_fold_in_solves_the_regularized_least_squares_for_a_new_user(svd):
+    scorer = FactorScorer.from_svd(svd)
+    user_id = 999
+    movie_ids = [int(movie_id) for movie_id in scorer.item_ids[:6]] + [5000]  # the last one is unknown
+    ratings = [5.0, 4.0, 1.0, 2.0, 5.0, 3.0, 4.0]
+    assert scorer.user_vector(user_id) is None
+
+    assert scorer.fold_in_user(user_id, movie_ids, ratings, reg=0.02)
+    bias, factors = scorer.user_vector(user_id)
+
+    # Same problem as a ridge regression on the known movies: [qi 1] x = r - mu - bi
+    items = scorer.inner_item_ids(movie_ids[:-1])
+    design = np.hstack([scorer.qi[items], np.ones((len(items), 1))])
+    residuals = np.array(ratings[:-1]) - scorer.global_mean - scorer.bi[items]
+    penalty = np.sqrt(0.02 * len(items)) * np.eye(design.shape[1])
+    expected = np.linalg.lstsq(np.vstack([design, penalty]),
+                               np.concatenate([residuals, np.zeros(design.shape[1])]), rcond=None)[0]
+    assert np.allclose(factors, expected[:-1]) and np.isclose(bias, expected[-1])
+
+    # The new user now gets personal scores, not the movie baselines
+    scores = scorer.score(user_id, movie_ids[:-1])
+    baseline = np.clip(scorer.global_mean + scorer.bi[items], 1, 5)
+    assert np.abs(scores - ratings[:-1]).sum() < np.abs(baseline - ratings[:-1]).sum()
+    assert scorer.fold_in_stats()['users'] == 1
+
+
+def test_fold_in_without_known_movies_keeps_the_user_unknown(svd):
+    scorer = FactorScorer.from_svd(svd)
+    assert not scorer.fold_in_user(999, [5000, 5001], [4.0, 2.0])
+    assert scorer.user_vector(999) is None
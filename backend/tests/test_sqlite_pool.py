@@ -0,0 +1,19 @@
+"""Raw sqlite3 connection pool: reuse and exhaustion."""
+import sqlite3
+
+import pytest
+
+from app.database import SQLitePool
+
+
+def test_exhausted_pool_raises_a_clear_error(tmp_path):
+    pool = SQLitePool(tmp_path / 'pool.db', size=1, timeout=0.05)
+    with pool.connection():
+        with pytest.raises(sqlite3.OperationalError, match="connection pool exhausted"):
+            with pool.connection():
+                pass
+    # The borrowed connection went back; the pool still works
+    assert pool.fetchone('one', "SELECT 1") == (1,)
+    assert pool.stats()['open'] == 1
+    assert pool.stats()['waits'] == 1
+    pool.close()
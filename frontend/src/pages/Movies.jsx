@@ -14,12 +14,15 @@ const Movies = () => {
     const [search, setSearch] = useState('');
     const [page, setPage] = useState(1);
     const [total, setTotal] = useState(0);
+    // cursors[i] fetches page i + 1; known once the page before it has loaded
+    const [cursors, setCursors] = useState([null]);
 
     // Debounced search effect
     useEffect(() => {
         const delayDebounceFn = setTimeout(() => {
             setPage(1); // Reset to page 1 on new search
-            fetchMovies();
+            setCursors([null]);
+            fetchMovies(1, null);
         }, 500);
 
         return () => clearTimeout(delayDebounceFn);
@@ -27,15 +30,20 @@ const Movies = () => {
 
     // Pagination effect
     useEffect(() => {
-        fetchMovies();
+        fetchMovies(page, cursors[page - 1] ?? null);
     }, [page]);
 
-    const fetchMovies = async () => {
+    const fetchMovies = async (pageToLoad, cursor) => {
         setLoading(true);
         try {
-            const data = await movieService.getMovies(page, 20, search);
+            const data = await movieService.getMovies(pageToLoad, 20, search, '', cursor);
             setMovies(data.movies);
             setTotal(data.total);
+            setCursors(prev => {
+                const next = prev.slice(0, pageToLoad);
+                next[pageToLoad] = data.next_cursor;
+                return next;
+            });
         } catch (error) {
             console.error('Error fetching movies:', error);
         } finally {
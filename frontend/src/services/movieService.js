@@ -4,8 +4,9 @@
 import api from './api';
 
 export const movieService = {
-    async getMovies(page = 1, limit = 20, search = '', genre = '') {
-        const params = { page, limit };
+    async getMovies(page = 1, limit = 20, search = '', genre = '', cursor = null) {
+        // A cursor (next_cursor of the previous page) replaces the page number
+        const params = cursor ? { cursor, limit } : { page, limit };
         if (search) params.search = search;
         if (genre) params.genre = genre;
 
@@ -13,10 +13,10 @@ export const ratingService = {
         return response.data;
     },
 
-    async getUserRatings(userId, page = 1, limit = 20) {
-        const response = await api.get(`/ratings/user/${userId}`, {
-            params: { page, limit },
-        });
+    async getUserRatings(userId, page = 1, limit = 20, cursor = null) {
+        // A cursor (next_cursor of the previous page) replaces the page number
+        const params = cursor ? { cursor, limit } : { page, limit };
+        const response = await api.get(`/ratings/user/${userId}`, { params });
         return response.data;
     },
 